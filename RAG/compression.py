@@ -0,0 +1,96 @@
+import os
+import re
+import math
+import threading
+from collections import OrderedDict
+import numpy as np
+from RAG.embeddings import embedding_backend_id
+
+# -------------------
+# Query-focused extractive compression (no LLM calls)
+# -------------------
+# Off by default: sentences not seen before are embedded at query time, one
+# embed_documents batch per retrieval, so a cold page costs an extra
+# embedding round-trip. Repeat pages are served from the sentence cache.
+COMPRESS_CONTEXT = os.getenv("RAG_COMPRESS_CONTEXT", "false").lower() == "true"
+# Sentence vectors kept across queries, keyed by embedding backend and text
+SENTENCE_CACHE_SIZE = int(os.getenv("RAG_SENTENCE_CACHE_SIZE", "5000"))
+# Fraction of each chunk's sentences that is kept
+KEEP_RATIO = 0.4
+# Chunks this short are passed through unchanged
+MIN_SENTENCES = 3
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+
+
+_sentence_vectors: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+_sentence_lock = threading.Lock()
+
+
+def split_sentences(text: str):
+    return [s.strip() for s in SENTENCE_SPLIT.split(text) if s.strip()]
+
+
+def embed_sentences(sentences, embeddings) -> np.ndarray:
+    """Sentence vectors; only sentences missing from the cache are sent to the embedding model."""
+    backend = embedding_backend_id(embeddings)
+    keys = [(backend, sentence) for sentence in sentences]
+    with _sentence_lock:
+        cached = {key: _sentence_vectors[key] for key in keys if key in _sentence_vectors}
+        for key in cached:
+            _sentence_vectors.move_to_end(key)
+
+    missing = list(dict.fromkeys(key for key in keys if key not in cached))
+    if missing:
+        vectors = np.asarray(embeddings.embed_documents([sentence for _, sentence in missing]), dtype="float32")
+        cached.update(zip(missing, vectors))
+        with _sentence_lock:
+            _sentence_vectors.update(zip(missing, vectors))
+            while len(_sentence_vectors) > SENTENCE_CACHE_SIZE:
+                _sentence_vectors.popitem(last=False)
+    return np.stack([cached[key] for key in keys])
+
+
+def compress_chunks(query_vector, docs, embeddings, keep_ratio: float = KEEP_RATIO):
+    """
+    Keeps the sentences of each chunk most similar to the query.
+
+    Sentences are scored by cosine similarity against the query vector
+    (uncached ones are embedded in a single batch, see embed_sentences);
+    the best ones per chunk are kept in their original order. Metadata (source, page) is untouched, so the
+    [File | Page] citation headers survive.
+    """
+    chunk_sentences = []
+    flat = []
+    for doc in docs:
+        sentences = split_sentences(doc.metadata.get("original_content", doc.page_content))
+        chunk_sentences.append(sentences)
+        if len(sentences) >= MIN_SENTENCES:
+            flat.extend(sentences)
+
+    if not flat:
+        return docs
+
+    vectors = embed_sentences(flat, embeddings)
+    query = np.asarray(query_vector, dtype="float32")
+    norms = np.linalg.norm(vectors, axis=1) * (np.linalg.norm(query) or 1)
+    scores = (vectors @ query) / np.where(norms == 0, 1, norms)
+
+    compressed = []
+    cursor = 0
+    for doc, sentences in zip(docs, chunk_sentences):
+        if len(sentences) < MIN_SENTENCES:
+            compressed.append(doc)
+            continue
+
+        chunk_scores = scores[cursor:cursor + len(sentences)]
+        cursor += len(sentences)
+
+        keep = max(1, math.ceil(len(sentences) * keep_ratio))
+        kept = sorted(np.argsort(-chunk_scores)[:keep])
+
+        new_doc = doc.model_copy(deep=True)
+        new_doc.metadata["original_content"] = " ".join(sentences[i] for i in kept)
+        compressed.append(new_doc)
+
+    return compressed
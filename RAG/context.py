@@ -0,0 +1,212 @@
+import os
+import re
+import numpy as np
+from RAG.tokens import count_tokens
+
+# -------------------
+# Prompt token budgets for document context, per calling node
+# -------------------
+NODE_CONTEXT_BUDGETS = {
+    "quiz": 2500,
+    "explainer": 2000,
+    "summarizer": 3000,
+}
+
+# Candidates fetched from the index before MMR selection
+FETCH_K = 20
+# 1.0 = pure relevance, 0.0 = pure diversity
+MMR_LAMBDA = 0.6
+# Shortest shared text accepted as splitter overlap when start_index is missing
+MIN_TEXT_OVERLAP = 40
+
+
+def format_chunk(doc) -> str:
+    """Chunk text with its [File | Page] citation header."""
+    return (
+        f"[File: {os.path.basename(doc.metadata.get('source', 'N/A'))} | "
+        f"Page {doc.metadata.get('page', 'N/A')}] "
+        f"{doc.metadata.get('original_content', doc.page_content)}"
+    )
+
+
+CITATION_PATTERN = re.compile(r"\[File: (.*?) \| Page (.*?)\]")
+
+
+def context_sources(context: str) -> list:
+    """Sorted (file, page) citations of a formatted context string."""
+    return sorted(set(CITATION_PATTERN.findall(context or "")))
+
+
+def fetch_candidates_batch(vectorstore, query_vectors, fetch_k: int = FETCH_K, queries=None):
+    """
+    Runs one multi-query search; returns [(doc, vector)] per query.
+
+    Sharded stores route each query (by its text) to the matching shards.
+    """
+    if hasattr(vectorstore, "fetch_candidates_batch"):
+        return vectorstore.fetch_candidates_batch(query_vectors, fetch_k, queries)
+
+    matrix = np.asarray(query_vectors, dtype="float32")
+    _, indices = vectorstore.index.search(matrix, min(fetch_k, vectorstore.index.ntotal))
+
+    results = []
+    for row in indices:
+        candidates = []
+        for i in row:
+            if i == -1:
+                continue
+            doc = vectorstore.docstore.search(vectorstore.index_to_docstore_id[int(i)])
+            if isinstance(doc, str):
+                continue
+            candidates.append((doc, vectorstore.index.reconstruct(int(i))))
+        results.append(candidates)
+    return results
+
+
+def fetch_candidates(vectorstore, query_vector, fetch_k: int = FETCH_K, query: str = None):
+    """Returns [(doc, vector)] for the fetch_k nearest chunks."""
+    return fetch_candidates_batch(vectorstore, [query_vector], fetch_k, [query] if query else None)[0]
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def pack_context(query_vector, candidates, budget_tokens: int, lambda_mult: float = MMR_LAMBDA):
+    """
+    Greedy MMR selection of chunks until the token budget is filled.
+
+    Each step picks the chunk with the best trade-off between similarity to
+    the query and dissimilarity to the chunks already picked; chunks that no
+    longer fit in the remaining budget are skipped.
+    Returns the selected documents in selection order.
+    """
+    if not candidates:
+        return []
+
+    docs = [doc for doc, _ in candidates]
+    vectors = _normalize(np.asarray([vec for _, vec in candidates], dtype="float32"))
+    query = _normalize(np.asarray(query_vector, dtype="float32"))
+
+    relevance = vectors @ query
+    pairwise = vectors @ vectors.T
+    costs = [count_tokens(format_chunk(doc)) for doc in docs]
+
+    selected = []
+    remaining = set(range(len(docs)))
+    used = 0
+
+    while remaining:
+        best, best_score = None, -np.inf
+        for i in remaining:
+            if used + costs[i] > budget_tokens:
+                continue
+            redundancy = max((pairwise[i, j] for j in selected), default=0.0)
+            score = lambda_mult * relevance[i] - (1 - lambda_mult) * redundancy
+            if score > best_score:
+                best, best_score = i, score
+        if best is None:
+            break
+        selected.append(best)
+        remaining.discard(best)
+        used += costs[best]
+
+    return [docs[i] for i in selected]
+
+
+# -------------------
+# Overlap-aware merging
+# -------------------
+def _chunk_text(doc) -> str:
+    return doc.metadata.get("original_content", doc.page_content)
+
+
+def _text_overlap(left: str, right: str) -> int:
+    """Length of the longest suffix of left that is a prefix of right."""
+    if len(left) < MIN_TEXT_OVERLAP or len(right) < MIN_TEXT_OVERLAP:
+        return 0
+    probe = right[:MIN_TEXT_OVERLAP]
+    pos = left.find(probe, max(0, len(left) - len(right)))
+    while pos != -1:
+        if right.startswith(left[pos:]):
+            return len(left) - pos
+        pos = left.find(probe, pos + 1)
+    return 0
+
+
+def _merge_pair(left, right):
+    """Returns the merged document, or None if the chunks are not adjacent."""
+    left_text, right_text = _chunk_text(left), _chunk_text(right)
+    left_start = left.metadata.get("start_index")
+    right_start = right.metadata.get("start_index")
+
+    if left_start is not None and right_start is not None:
+        left_end = left_start + len(left_text)
+        if right_start > left_end:
+            return None
+        merged_text = left_text + right_text[left_end - right_start:]
+    else:
+        overlap = _text_overlap(left_text, right_text)
+        if not overlap:
+            return None
+        merged_text = left_text + right_text[overlap:]
+
+    merged = left.model_copy(deep=True)
+    merged.metadata["original_content"] = merged_text
+    return merged
+
+
+def _merge_group(members):
+    """Merges (rank, doc) pairs of one source/page into non-overlapping spans."""
+    if all("start_index" in doc.metadata for _, doc in members):
+        members = sorted(members, key=lambda m: m[1].metadata["start_index"])
+        spans = [members[0]]
+        for rank, doc in members[1:]:
+            last_rank, last = spans[-1]
+            merged = _merge_pair(last, doc)
+            if merged is None:
+                spans.append((rank, doc))
+            else:
+                spans[-1] = (min(last_rank, rank), merged)
+        return spans
+
+    # Legacy chunks without offsets: order is unknown, merge any pair until stable
+    spans = list(members)
+    merged_any = True
+    while merged_any:
+        merged_any = False
+        for i in range(len(spans)):
+            for j in range(len(spans)):
+                if i == j:
+                    continue
+                merged = _merge_pair(spans[i][1], spans[j][1])
+                if merged is not None:
+                    rank = min(spans[i][0], spans[j][0])
+                    spans = [s for k, s in enumerate(spans) if k not in (i, j)] + [(rank, merged)]
+                    merged_any = True
+                    break
+            if merged_any:
+                break
+    return spans
+
+
+def merge_adjacent_chunks(docs):
+    """
+    Merges retrieved chunks of the same source and page that touch or overlap.
+
+    The splitter repeats chunk_overlap tokens between neighbours, so pasting
+    both chunks would send that text twice. Merged spans keep the position of
+    their best-ranked chunk.
+    """
+    groups = {}
+    for rank, doc in enumerate(docs):
+        key = (doc.metadata.get("source"), doc.metadata.get("page"))
+        groups.setdefault(key, []).append((rank, doc))
+
+    spans = []
+    for members in groups.values():
+        spans.extend(_merge_group(members))
+
+    spans.sort(key=lambda m: m[0])
+    return [doc for _, doc in spans]
@@ -0,0 +1,154 @@
+import os
+import json
+import mmap
+import threading
+from typing import Dict, List, Union
+import numpy as np
+from langchain_core.documents import Document
+from langchain_community.docstore.base import AddableMixin, Docstore
+
+# -------------------
+# On-disk layout (all files live in the vector store folder)
+# -------------------
+# chunks.bin : append-only JSON records {"page_content", "metadata"}
+# chunks.idx : uint64 pairs (offset, length) per record, in row order
+# chunks.ids : one docstore ID per line, in row order
+# chunks.del : IDs removed with delete(), one per line
+DATA_FILE = "chunks.bin"
+OFFSETS_FILE = "chunks.idx"
+IDS_FILE = "chunks.ids"
+DELETED_FILE = "chunks.del"
+
+
+class MmapDocstore(Docstore, AddableMixin):
+    """
+    Docstore that keeps chunk text in a memory-mapped sidecar file.
+
+    Only the ID -> row table is held in memory; text and metadata are read
+    from the mapped file on access, so the OS pages them in lazily and no
+    pickle has to be deserialized at load time.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._lock = threading.RLock()
+        self._rows: Dict[str, int] = {}
+        self._offsets = None
+        self._data = None
+        self._data_file = None
+        self._load()
+
+    # -------------------
+    # Loading / mapping
+    # -------------------
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _load(self):
+        ids_path = self._file(IDS_FILE)
+        if os.path.exists(ids_path):
+            with open(ids_path, encoding="utf-8") as f:
+                for row, line in enumerate(f):
+                    self._rows[line.rstrip("\n")] = row
+
+        deleted_path = self._file(DELETED_FILE)
+        if os.path.exists(deleted_path):
+            with open(deleted_path, encoding="utf-8") as f:
+                for line in f:
+                    self._rows.pop(line.rstrip("\n"), None)
+
+        self._remap()
+
+    def _remap(self):
+        """(Re)maps the data and offset files after they grew."""
+        self.close()
+        offsets_path = self._file(OFFSETS_FILE)
+        data_path = self._file(DATA_FILE)
+        if os.path.exists(offsets_path) and os.path.getsize(offsets_path) > 0:
+            self._offsets = np.memmap(offsets_path, dtype="<u8", mode="r").reshape(-1, 2)
+        if os.path.exists(data_path) and os.path.getsize(data_path) > 0:
+            self._data_file = open(data_path, "rb")
+            self._data = mmap.mmap(self._data_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+        if self._data_file is not None:
+            self._data_file.close()
+            self._data_file = None
+        self._offsets = None
+
+    # -------------------
+    # Docstore interface
+    # -------------------
+    def search(self, search: str) -> Union[str, Document]:
+        with self._lock:
+            row = self._rows.get(search)
+            if row is None:
+                return f"ID {search} not found."
+            offset, length = self._offsets[row]
+            record = json.loads(self._data[int(offset):int(offset + length)].decode("utf-8"))
+        return Document(id=search, page_content=record["page_content"], metadata=record["metadata"])
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        overlapping = set(texts).intersection(self._rows)
+        if overlapping:
+            raise ValueError(f"Tried to add ids that already exist: {overlapping}")
+
+        with self._lock:
+            data_path = self._file(DATA_FILE)
+            start = os.path.getsize(data_path) if os.path.exists(data_path) else 0
+            row = 0 if self._offsets is None else len(self._offsets)
+
+            offsets = []
+            with open(data_path, "ab") as data_f, open(self._file(IDS_FILE), "a", encoding="utf-8") as ids_f:
+                for doc_id, doc in texts.items():
+                    record = json.dumps(
+                        {"page_content": doc.page_content, "metadata": doc.metadata},
+                        ensure_ascii=False
+                    ).encode("utf-8")
+                    data_f.write(record)
+                    ids_f.write(f"{doc_id}\n")
+                    offsets.append((start, len(record)))
+                    self._rows[doc_id] = row
+                    start += len(record)
+                    row += 1
+
+            with open(self._file(OFFSETS_FILE), "ab") as idx_f:
+                idx_f.write(np.asarray(offsets, dtype="<u8").tobytes())
+
+            self._remap()
+
+    def delete(self, ids: List) -> None:
+        """Drops IDs from the lookup table; the records stay in the append-only file."""
+        with self._lock:
+            with open(self._file(DELETED_FILE), "a", encoding="utf-8") as f:
+                for doc_id in ids:
+                    if self._rows.pop(doc_id, None) is not None:
+                        f.write(f"{doc_id}\n")
+
+    def ids(self) -> List[str]:
+        with self._lock:
+            return list(self._rows.keys())
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._rows
+
+    # The store is already persisted; pickling only needs to remember where
+    def __getstate__(self):
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+    def disk_size(self) -> int:
+        return sum(
+            os.path.getsize(self._file(name))
+            for name in (DATA_FILE, OFFSETS_FILE, IDS_FILE, DELETED_FILE)
+            if os.path.exists(self._file(name))
+        )
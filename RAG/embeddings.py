@@ -0,0 +1,112 @@
+import os
+import logging
+import threading
+from functools import lru_cache
+from typing import List
+from langchain_core.embeddings import Embeddings
+from RAG.tokens import TOKENIZER_NAME, get_tokenizer
+from rate_limiter import RateLimitedEmbeddings, rate_limited_embeddings
+
+logger = logging.getLogger(__name__)
+
+# -------------------
+# Embedding backend
+# -------------------
+# "ollama": nomic-embed-text over HTTP (default, matches existing indexes)
+# "local":  sentence-transformer run in-process on CPU
+EMBEDDING_BACKEND = os.getenv("RAG_EMBEDDING_BACKEND", "ollama")
+OLLAMA_EMBED_MODEL = "nomic-embed-text"
+OLLAMA_BASE_URL = "http://localhost:11434"
+LOCAL_EMBED_MODEL = os.getenv("RAG_LOCAL_EMBED_MODEL", TOKENIZER_NAME)
+EMBED_BATCH_SIZE = 32
+# Indexes saved before the backend was recorded were all built with Ollama
+LEGACY_BACKEND_ID = f"ollama:{OLLAMA_EMBED_MODEL}"
+
+EMBEDDING_BACKENDS = ("ollama", "local")
+
+
+class LocalEmbeddings(Embeddings):
+    """
+    Sentence-transformer embeddings computed in-process with transformers.
+
+    Texts are encoded in batches of batch_size, mean-pooled over the
+    attention mask and L2-normalized (the sentence-transformers recipe).
+    The model is loaded lazily from the local Hugging Face cache.
+    """
+
+    def __init__(self, model_name: str = LOCAL_EMBED_MODEL, batch_size: int = EMBED_BATCH_SIZE):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self._model = None
+        self._tokenizer = None
+        self._lock = threading.Lock()
+
+    @property
+    def backend_id(self) -> str:
+        return f"local:{self.model_name}"
+
+    def _load(self):
+        with self._lock:
+            if self._model is None:
+                from transformers import AutoModel, AutoTokenizer
+
+                logger.info(f"Loading embedding model {self.model_name} on CPU...")
+                # Reuse the tokenizer already loaded for token counting
+                self._tokenizer = (
+                    get_tokenizer() if self.model_name == TOKENIZER_NAME
+                    else AutoTokenizer.from_pretrained(self.model_name)
+                )
+                model = AutoModel.from_pretrained(self.model_name)
+                model.eval()
+                self._model = model
+        return self._model, self._tokenizer
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        import torch
+
+        model, tokenizer = self._load()
+        vectors = []
+        with torch.inference_mode():
+            for start in range(0, len(texts), self.batch_size):
+                batch = tokenizer(
+                    texts[start:start + self.batch_size],
+                    padding=True,
+                    truncation=True,
+                    return_tensors="pt"
+                )
+                hidden = model(**batch).last_hidden_state
+                mask = batch["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+                pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+                vectors.extend(torch.nn.functional.normalize(pooled, dim=-1).tolist())
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def embedding_backend_id(embeddings) -> str:
+    """Identity stored with an index, e.g. "ollama:nomic-embed-text"."""
+    if isinstance(embeddings, RateLimitedEmbeddings):
+        embeddings = embeddings.embeddings
+    backend_id = getattr(embeddings, "backend_id", None)
+    if backend_id:
+        return backend_id
+    model = getattr(embeddings, "model", None) or getattr(embeddings, "model_name", None)
+    if "ollama" in type(embeddings).__module__:
+        return f"ollama:{model}"
+    return f"{type(embeddings).__name__}:{model}"
+
+
+@lru_cache(maxsize=None)
+def get_embeddings(backend: str = None) -> Embeddings:
+    """Shared embeddings client for a backend (default: RAG_EMBEDDING_BACKEND)."""
+    backend = backend or EMBEDDING_BACKEND
+    if backend == "ollama":
+        from langchain_ollama import OllamaEmbeddings
+        # Same Ollama server as the chat models, so the same limiter
+        return rate_limited_embeddings(
+            OllamaEmbeddings(model=OLLAMA_EMBED_MODEL, base_url=OLLAMA_BASE_URL), "ollama", OLLAMA_EMBED_MODEL
+        )
+    elif backend == "local":
+        return LocalEmbeddings()
+    raise ValueError(f"Unknown embedding backend: {backend}. Expected one of {EMBEDDING_BACKENDS}")
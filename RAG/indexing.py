@@ -0,0 +1,409 @@
+import os
+import json
+import uuid
+import shutil
+import logging
+import numpy as np
+import faiss
+from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from RAG.docstore import MmapDocstore
+from RAG.embeddings import LEGACY_BACKEND_ID, embedding_backend_id
+
+logger = logging.getLogger(__name__)
+
+# -------------------
+# Index configuration
+# -------------------
+# "auto" picks an index from the corpus size, see select_index_type()
+INDEX_TYPE = os.getenv("RAG_INDEX_TYPE", "auto")
+INDEX_INFO_FILE = "index_info.json"
+FAISS_INDEX_FILE = "index.faiss"
+INDEX_IDS_FILE = "index_ids.json"
+# Per-session knowledge bases built from the app (mmap docstores)
+SESSIONS_DIR = os.path.join("RAG", "vectorstore", "sessions")
+
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 80
+HNSW_EF_SEARCH = 64
+IVF_NPROBE = 16
+PQ_NBITS = 8
+TRAIN_SAMPLE_SIZE = 100_000
+
+INDEX_TYPES = ("flat", "flat_fp16", "hnsw", "hnsw_fp16", "ivf", "ivf_pq")
+
+# Optional dimensionality reduction stored inside the index (IndexPreTransform):
+# "none", "pca:<dim>" (fitted on the corpus) or "truncate:<dim>" (Matryoshka-style prefix)
+PROJECTION = os.getenv("RAG_PROJECTION", "none")
+PROJECTIONS = ("pca", "truncate")
+
+
+def select_index_type(num_vectors: int) -> str:
+    """Exact search stays cheapest for small knowledge bases."""
+    if num_vectors < 10_000:
+        return "flat"
+    elif num_vectors < 100_000:
+        return "hnsw"
+    elif num_vectors < 1_000_000:
+        return "ivf"
+    else:
+        return "ivf_pq"
+
+
+def compute_nlist(num_vectors: int) -> int:
+    # ~4*sqrt(n) lists, but keep at least 39 training points per centroid
+    nlist = int(4 * np.sqrt(num_vectors))
+    return max(1, min(nlist, num_vectors // 39))
+
+
+def compute_pq_subquantizers(dimension: int) -> int:
+    # Largest divisor of the dimension up to 64 sub-quantizers
+    for m in range(min(64, dimension), 0, -1):
+        if dimension % m == 0:
+            return m
+    return 1
+
+
+def parse_projection(spec: str):
+    """"pca:256" -> ("pca", 256); "none" / empty -> None."""
+    if not spec or spec == "none":
+        return None
+    kind, _, dim = spec.partition(":")
+    if kind not in PROJECTIONS or not dim.isdigit():
+        raise ValueError(f"Unknown projection: {spec}. Expected 'none' or one of {PROJECTIONS} as '<kind>:<dim>'")
+    return kind, int(dim)
+
+
+def fit_projection(spec: str, vectors: np.ndarray):
+    """Returns a trained faiss VectorTransform for spec, or None to keep full vectors."""
+    parsed = parse_projection(spec)
+    if parsed is None:
+        return None
+    kind, dim = parsed
+    num_vectors, dimension = vectors.shape
+    if dim >= dimension:
+        logger.warning(f"Projection {spec} does not reduce {dimension}-d vectors, skipping it.")
+        return None
+
+    if kind == "truncate":
+        # Keeps the leading components; meant for Matryoshka-trained models
+        return faiss.RemapDimensionsTransform(dimension, dim, False)
+
+    if num_vectors < dim:
+        logger.warning(f"Too few vectors ({num_vectors}) to fit {spec}, keeping full vectors.")
+        return None
+    if num_vectors > TRAIN_SAMPLE_SIZE:
+        rng = np.random.default_rng(0)
+        vectors = vectors[rng.choice(num_vectors, TRAIN_SAMPLE_SIZE, replace=False)]
+    pca = faiss.PCAMatrix(dimension, dim)
+    pca.train(vectors)
+    return pca
+
+
+def get_projection(index):
+    """
+    Copy of the projection an index applies to incoming vectors, or None.
+
+    The transform inside the index is freed with it, so shards that share a
+    projection each get their own copy.
+    """
+    index = faiss.downcast_index(index)
+    if not isinstance(index, faiss.IndexPreTransform):
+        return None
+    writer = faiss.VectorIOWriter()
+    faiss.write_VectorTransform(index.chain.at(0), writer)
+    reader = faiss.VectorIOReader()
+    reader.data = writer.data
+    owner = faiss.read_VectorTransform(reader)
+    transform = faiss.downcast_VectorTransform(owner)
+    # The downcast proxy does not own the C++ object; keep the owning one alive
+    transform.referenced_objects = [owner]
+    return transform
+
+
+def describe_projection(transform) -> str:
+    if transform is None:
+        return "none"
+    kind = "pca" if isinstance(transform, faiss.PCAMatrix) else "truncate"
+    return f"{kind}:{transform.d_out}"
+
+
+def inner_index(index):
+    """The index behind an optional projection."""
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexPreTransform):
+        return faiss.downcast_index(index.index)
+    return index
+
+
+def create_index(index_type: str, dimension: int, num_vectors: int, projection=None):
+    """
+    Returns (faiss index, description) for one of INDEX_TYPES.
+
+    projection: trained VectorTransform applied before the index; the index
+    is then built in the reduced dimension and stores the transform.
+    """
+    if projection is not None:
+        index, description = create_index(index_type, projection.d_out, num_vectors)
+        index = faiss.IndexPreTransform(projection, index)
+        return index, f"{describe_projection(projection).upper().replace(':', '')},{description}"
+
+    if index_type == "ivf_pq" and num_vectors < 39 * 2 ** PQ_NBITS:
+        logger.warning(f"Too few vectors ({num_vectors}) to train PQ codebooks, using ivf instead.")
+        index_type = "ivf"
+
+    if index_type == "hnsw_fp16":
+        index = faiss.IndexHNSWSQ(dimension, faiss.ScalarQuantizer.QT_fp16, HNSW_M)
+        description = f"HNSW{HNSW_M}_SQfp16"
+    else:
+        if index_type == "flat":
+            description = "Flat"
+        elif index_type == "flat_fp16":
+            description = "SQfp16"
+        elif index_type == "hnsw":
+            description = f"HNSW{HNSW_M}"
+        elif index_type == "ivf":
+            description = f"IVF{compute_nlist(num_vectors)},Flat"
+        elif index_type == "ivf_pq":
+            m = compute_pq_subquantizers(dimension)
+            description = f"IVF{compute_nlist(num_vectors)},PQ{m}x{PQ_NBITS}"
+        else:
+            raise ValueError(f"Unknown index type: {index_type}. Expected one of {INDEX_TYPES} or 'auto'")
+        index = faiss.index_factory(dimension, description, faiss.METRIC_L2)
+
+    if hasattr(index, "hnsw"):
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    return index, description
+
+
+def apply_search_params(index):
+    """Sets query-time knobs (efSearch / nprobe) on approximate indexes."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(IVF_NPROBE, ivf.nlist)
+        # Needed by reconstruct(), which LangChain's MMR search relies on
+        ivf.make_direct_map()
+    base = inner_index(index)
+    if hasattr(base, "hnsw"):
+        base.hnsw.efSearch = HNSW_EF_SEARCH
+    return index
+
+
+def train_index(index, vectors: np.ndarray):
+    """IVF / PQ indexes learn their centroids before any vector is added."""
+    if index.is_trained:
+        return
+    if len(vectors) > TRAIN_SAMPLE_SIZE:
+        rng = np.random.default_rng(0)
+        vectors = vectors[rng.choice(len(vectors), TRAIN_SAMPLE_SIZE, replace=False)]
+    logger.info(f"Training index on {len(vectors)} vectors...")
+    index.train(vectors)
+
+
+def build_vectorstore(documents, embeddings, index_type: str = None, path: str = None, projection=None) -> FAISS:
+    """
+    Drop-in replacement for FAISS.from_documents with a configurable index.
+
+    index_type: one of INDEX_TYPES or "auto" (default: RAG_INDEX_TYPE env).
+    path: when given, chunk text goes to a memory-mapped MmapDocstore in
+          that folder instead of the in-memory (pickled) docstore.
+    projection: spec such as "pca:256" (default: RAG_PROJECTION env) or an
+                already trained VectorTransform to reuse.
+    """
+    if not documents:
+        raise ValueError("Cannot build a vector store from an empty document list")
+    vectors = embeddings.embed_documents([doc.page_content for doc in documents])
+    return build_vectorstore_from_vectors(documents, vectors, embeddings, index_type, path, projection=projection)
+
+
+def build_vectorstore_from_vectors(
+    documents,
+    vectors,
+    embeddings,
+    index_type: str = None,
+    path: str = None,
+    ids=None,
+    projection=None
+) -> FAISS:
+    """Same as build_vectorstore for documents whose vectors are already known."""
+    if not documents:
+        raise ValueError("Cannot build a vector store from an empty document list")
+    if path and os.path.isdir(path) and os.listdir(path):
+        raise ValueError(f"Vector store folder is not empty: {path}")
+
+    index_type = index_type or INDEX_TYPE
+    texts = [doc.page_content for doc in documents]
+    metadatas = [doc.metadata for doc in documents]
+
+    vectors = np.asarray(vectors, dtype="float32")
+    num_vectors, dimension = vectors.shape
+
+    if index_type == "auto":
+        index_type = select_index_type(num_vectors)
+
+    if projection is None or isinstance(projection, str):
+        projection = fit_projection(projection or PROJECTION, vectors)
+
+    index, description = create_index(index_type, dimension, num_vectors, projection)
+    logger.info(f"Building FAISS index | type={index_type} | index={description} | vectors={num_vectors}")
+    train_index(index, vectors)
+
+    vectorstore = FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=MmapDocstore(path) if path else InMemoryDocstore(),
+        index_to_docstore_id={}
+    )
+    vectorstore.add_embeddings(zip(texts, vectors.tolist()), metadatas=metadatas, ids=ids)
+    apply_search_params(vectorstore.index)
+    vectorstore.index_info = {
+        "index_type": index_type,
+        "description": description,
+        "dimension": dimension,
+        "num_vectors": num_vectors,
+        "embedding": embedding_backend_id(embeddings),
+        "projection": describe_projection(projection),
+    }
+    return vectorstore
+
+
+def estimate_index_bytes(index) -> int:
+    """Approximate resident size of a faiss index: codes, graph / lists, projection."""
+    base = inner_index(index)
+    codec = faiss.downcast_index(base.storage) if hasattr(base, "hnsw") else base
+    try:
+        code_size = codec.sa_code_size()
+    except RuntimeError:
+        code_size = base.d * 4
+    size = base.ntotal * code_size
+
+    if hasattr(base, "hnsw"):
+        # Level-0 neighbour lists dominate the graph: 2*M int32 links per vector
+        size += base.ntotal * 2 * HNSW_M * 4
+    ivf = faiss.try_extract_index_ivf(base)
+    if ivf is not None:
+        # Stored IDs + direct map per vector, and the coarse centroids
+        size += base.ntotal * 16 + ivf.nlist * base.d * 4
+
+    projection = get_projection(index)
+    if isinstance(projection, faiss.PCAMatrix):
+        size += projection.d_in * projection.d_out * 4
+    return size
+
+
+def estimate_memory_bytes(vectorstore: FAISS) -> int:
+    """Approximate resident size of a vector store: index plus in-memory text."""
+    size = estimate_index_bytes(vectorstore.index)
+    # ID mapping (dict entry + uuid string)
+    size += len(vectorstore.index_to_docstore_id) * 120
+    if not isinstance(vectorstore.docstore, MmapDocstore):
+        size += sum(
+            len(doc.page_content) + len(str(doc.metadata))
+            for doc in getattr(vectorstore.docstore, "_dict", {}).values()
+        )
+    return size
+
+
+def new_session_build_path(session_id: str) -> str:
+    """Fresh folder for a rebuild; the previous build may still be mapped by readers."""
+    return os.path.join(SESSIONS_DIR, session_id, uuid.uuid4().hex[:12])
+
+
+def prune_session_builds(session_id: str, keep: str):
+    session_dir = os.path.join(SESSIONS_DIR, session_id)
+    if not os.path.isdir(session_dir):
+        return
+    for name in os.listdir(session_dir):
+        build_path = os.path.join(session_dir, name)
+        if os.path.abspath(build_path) != os.path.abspath(keep):
+            shutil.rmtree(build_path, ignore_errors=True)
+
+
+def save_vectorstore(vectorstore: FAISS, path: str):
+    info = dict(getattr(vectorstore, "index_info", None) or {
+        "index_type": "flat",
+        "dimension": vectorstore.index.d,
+    })
+    info["num_vectors"] = vectorstore.index.ntotal
+
+    if isinstance(vectorstore.docstore, MmapDocstore):
+        # Text already lives in the sidecar files; only the index and ID order are written
+        if os.path.abspath(vectorstore.docstore.path) != os.path.abspath(path):
+            raise ValueError(f"MmapDocstore lives in {vectorstore.docstore.path}, cannot save it to {path}")
+        faiss.write_index(vectorstore.index, os.path.join(path, FAISS_INDEX_FILE))
+        ids = [vectorstore.index_to_docstore_id[i] for i in range(vectorstore.index.ntotal)]
+        with open(os.path.join(path, INDEX_IDS_FILE), "w", encoding="utf-8") as f:
+            json.dump(ids, f)
+        info["docstore"] = "mmap"
+    else:
+        vectorstore.save_local(path)
+        info["docstore"] = "pickle"
+
+    with open(os.path.join(path, INDEX_INFO_FILE), "w", encoding="utf-8") as f:
+        json.dump(info, f, indent=2)
+
+
+def read_index_info(path: str) -> dict:
+    info_path = os.path.join(path, INDEX_INFO_FILE)
+    if not os.path.exists(info_path):
+        return {}
+    with open(info_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def check_embedding_backend(info: dict, embeddings, path: str):
+    """Vectors from different embedding models are not comparable; refuse to mix them."""
+    stored = info.get("embedding", LEGACY_BACKEND_ID)
+    current = embedding_backend_id(embeddings)
+    if stored != current:
+        raise ValueError(
+            f"Vector store {path} was built with embeddings '{stored}' but '{current}' is configured. "
+            f"Rebuild the index or set RAG_EMBEDDING_BACKEND to match."
+        )
+
+
+def load_vectorstore(path: str, embeddings) -> FAISS:
+    """embeddings=None opens the store for vector-only access (inspection, benchmarks)."""
+    info = read_index_info(path)
+    if embeddings is not None:
+        check_embedding_backend(info, embeddings, path)
+
+    if info.get("docstore") == "mmap":
+        index = faiss.read_index(os.path.join(path, FAISS_INDEX_FILE))
+        with open(os.path.join(path, INDEX_IDS_FILE), encoding="utf-8") as f:
+            ids = json.load(f)
+        vectorstore = FAISS(
+            embedding_function=embeddings,
+            index=index,
+            docstore=MmapDocstore(path),
+            index_to_docstore_id=dict(enumerate(ids))
+        )
+    else:
+        # Legacy layout: docstore pickled in index.pkl
+        vectorstore = FAISS.load_local(
+            path,
+            embeddings,
+            allow_dangerous_deserialization=True
+        )
+
+    apply_search_params(vectorstore.index)
+    vectorstore.index_info = info
+    return vectorstore
+
+
+def migrate_to_mmap(src_path: str, dst_path: str, embeddings):
+    """Rewrites a pickled (save_local) vector store into the mmap layout."""
+    legacy = FAISS.load_local(src_path, embeddings, allow_dangerous_deserialization=True)
+    docstore = MmapDocstore(dst_path)
+    ids = [legacy.index_to_docstore_id[i] for i in range(legacy.index.ntotal)]
+    docstore.add({doc_id: legacy.docstore.search(doc_id) for doc_id in ids})
+
+    vectorstore = FAISS(
+        embedding_function=embeddings,
+        index=legacy.index,
+        docstore=docstore,
+        index_to_docstore_id=dict(enumerate(ids))
+    )
+    vectorstore.index_info = read_index_info(src_path)
+    save_vectorstore(vectorstore, dst_path)
+    return vectorstore
@@ -1,15 +1,16 @@
 import os
+import time
 import logging
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 from langchain_community.vectorstores import FAISS
-from langchain_ollama import OllamaEmbeddings
 from langchain_ollama import ChatOllama
 from langchain_core.messages import HumanMessage
-from transformers import AutoTokenizer
 from RAG.prompts import CHUNK_SUMMARY_PROMPT, FILE_SUMMARY_PROMPT
 from RAG.OCR import extract_text_from_pdf, clean_text
+from RAG.tokens import count_tokens
+from rate_limiter import Priority, rate_limited
 
 VECTORSTORE_PATH = "RAG/vectorstore"
 
@@ -26,17 +27,8 @@ logger = logging.getLogger(__name__)
 # -------------------
 # LLM Setup
 # -------------------
-llm = ChatOllama(model="llama3", temperature=0.0)
-
-# -------------------
-# Tokenizer setup
-# -------------------
-tokenizer = AutoTokenizer.from_pretrained(
-    "sentence-transformers/all-MiniLM-L6-v2"
-)
-
-def count_tokens(text: str) -> int:
-    return len(tokenizer.encode(text, add_special_tokens=False))
+# Chunk summaries queue behind interactive calls on the shared Ollama server
+llm = rate_limited(ChatOllama(model="llama3", temperature=0.0), "ollama", "llama3", Priority.BACKGROUND)
 
 def compute_chunk_params(total_tokens: int):
     if total_tokens < 2_000:
@@ -62,17 +54,25 @@ def build_adaptive_splitter(documents):
     return RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap,
-        length_function=count_tokens
+        length_function=count_tokens,
+        # start_index lets retrieval merge neighbouring chunks of a page
+        add_start_index=True
     )
 
 # -------------------
 # PDF ingestion
 # -------------------
-def ingest_pdf(file_path: str):
+def ingest_pdf(file_path: str, timings: dict = None):
+    """
+    timings: optional dict filled with seconds spent per stage
+             (extraction, ocr, splitting, summarization).
+    """
     logger.info(f"Starting ingestion for: {file_path}")
+    timings = timings if timings is not None else {}
     all_documents = []
 
     # 1️⃣ Try native text extraction first
+    start = time.perf_counter()
     try:
         logger.info("Attempting text extraction using PyPDFLoader...")
         loader = PyPDFLoader(file_path)
@@ -96,11 +96,15 @@ def ingest_pdf(file_path: str):
             logger.info(f"PyPDFLoader text too short ({len(combined_text)} chars). Will fallback to OCR.")
     except Exception as e:
         logger.warning(f"PyPDFLoader failed: {e}. Will fallback to OCR.")
+    timings["extraction"] = time.perf_counter() - start
 
     # 2️⃣ OCR fallback if text extraction failed
+    timings["ocr"] = 0.0
     if not all_documents:
         logger.info("Running OCR fallback with DocTR...")
+        start = time.perf_counter()
         all_documents = extract_text_from_pdf(file_path)
+        timings["ocr"] = time.perf_counter() - start
         logger.info(f"OCR extracted {len(all_documents)} pages.")
 
     if not all_documents:
@@ -109,8 +113,10 @@ def ingest_pdf(file_path: str):
 
     # 3️⃣ Split per-page documents
     logger.info("Splitting documents into chunks...")
+    start = time.perf_counter()
     splitter = build_adaptive_splitter(all_documents)
     chunks = splitter.split_documents(all_documents)
+    timings["splitting"] = time.perf_counter() - start
     logger.info(f"Created {len(chunks)} chunks from {len(all_documents)} pages.")
 
     for chunk in chunks:
@@ -133,6 +139,7 @@ def ingest_pdf(file_path: str):
 
     chunk_summary_documents = []
     file_chunk_summaries = []
+    summarization_start = time.perf_counter()
 
     for idx, chunk in enumerate(chunks):
         prompt = CHUNK_SUMMARY_PROMPT.format(content=chunk.page_content)
@@ -154,7 +161,6 @@ def ingest_pdf(file_path: str):
         )
 
     logger.info("Storing chunk summary embeddings...")
-    embeddings = OllamaEmbeddings(model="nomic-embed-text")
 
 
 
@@ -164,6 +170,8 @@ def ingest_pdf(file_path: str):
 
     file_response = llm.invoke([HumanMessage(content=file_prompt)])
     file_summary_text = file_response.content.strip()
+    # Includes the per-chunk debug prints, like the live run
+    timings["summarization"] = time.perf_counter() - summarization_start
 
     # 🔍 DEBUG PRINT
     print(f"\n[DEBUG] File summary:\n{file_summary_text}\n")
@@ -0,0 +1,193 @@
+import os
+import json
+import time
+import hashlib
+from collections import Counter
+import numpy as np
+from RAG import indexing
+from RAG.shards import ShardedVectorStore, load_any_vectorstore
+from RAG.context import fetch_candidates
+from RAG.namespaces import estimate_store_bytes
+from RAG.projection_report import make_queries
+
+# -------------------
+# Knowledge base inspection (sizing servers, spotting bloated stores)
+# -------------------
+VECTORSTORE_PATH = "RAG/vectorstore/"
+NUM_QUERIES = 100
+TOP_K = 5
+
+
+def _indexes(store):
+    """(label, FAISS vector store, tombstoned rows) for every index of a store."""
+    if isinstance(store, ShardedVectorStore):
+        return [
+            (os.path.basename(shard.source), shard.vectorstore, shard.tombstones)
+            for shard in store.shards.values()
+        ]
+    return [("index", store, set())]
+
+
+def _live_docs(vectorstore, tombstones):
+    for i, doc_id in vectorstore.index_to_docstore_id.items():
+        if int(i) in tombstones:
+            continue
+        doc = vectorstore.docstore.search(doc_id)
+        if not isinstance(doc, str):
+            yield doc
+
+
+def _page_order(item):
+    (source, page), _ = item
+    return source, int(page) if page.isdigit() else float("inf"), page
+
+
+def disk_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def _percentiles(latencies) -> dict:
+    return {
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+    }
+
+
+def time_queries(store, num_queries: int = NUM_QUERIES, k: int = TOP_K) -> dict:
+    """
+    Times single-query retrieval on perturbed stored vectors.
+
+    "index" is the search a query takes before any document is read (for
+    sharded stores: routing, one search per shard and the merge);
+    "retrieval" is the full candidate fetch (tombstone skipping, docstore
+    reads, reconstruct).
+    """
+    vectors = []
+    for _, vectorstore, _ in _indexes(store):
+        if vectorstore.index.ntotal:
+            vectors.append(vectorstore.index.reconstruct_n(0, vectorstore.index.ntotal))
+    if not vectors:
+        return {}
+    queries = make_queries(np.concatenate(vectors).astype("float32"), num_queries)
+
+    index_latencies, retrieval_latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        if isinstance(store, ShardedVectorStore):
+            store.search_rows_batch(query[None], k)
+        else:
+            store.index.search(query[None], min(k, store.index.ntotal))
+        index_latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        fetch_candidates(store, query, k)
+        retrieval_latencies.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "queries": len(queries),
+        "k": k,
+        "index": _percentiles(index_latencies),
+        "retrieval": _percentiles(retrieval_latencies),
+    }
+
+
+def inspect_vectorstore(path: str, num_queries: int = NUM_QUERIES, k: int = TOP_K) -> dict:
+    store = load_any_vectorstore(path, None)
+
+    pages = Counter()
+    text_hashes = Counter()
+    indexes = []
+    total_vectors = 0
+    for label, vectorstore, tombstones in _indexes(store):
+        info = getattr(vectorstore, "index_info", None) or {}
+        size = indexing.estimate_memory_bytes(vectorstore)
+        total_vectors += vectorstore.index.ntotal
+        indexes.append({
+            "name": label,
+            "index_type": info.get("index_type", "flat"),
+            "description": info.get("description", type(indexing.inner_index(vectorstore.index)).__name__),
+            "dimension": vectorstore.index.d,
+            "projection": indexing.describe_projection(indexing.get_projection(vectorstore.index)),
+            "embedding": info.get("embedding"),
+            "docstore": info.get("docstore", "pickle"),
+            "vectors": vectorstore.index.ntotal,
+            "tombstones": len(tombstones),
+            "memory_mb": round(size / 1024 / 1024, 3),
+        })
+        for doc in _live_docs(vectorstore, tombstones):
+            pages[(os.path.basename(doc.metadata.get("source", "N/A")), str(doc.metadata.get("page", "N/A")))] += 1
+            text = doc.metadata.get("original_content", doc.page_content)
+            text_hashes[hashlib.sha1(" ".join(text.split()).lower().encode("utf-8")).hexdigest()] += 1
+
+    chunks = sum(text_hashes.values())
+    sources = Counter()
+    for (source, _), count in pages.items():
+        sources[source] += count
+
+    return {
+        "path": path,
+        "sharded": isinstance(store, ShardedVectorStore),
+        "chunks": chunks,
+        "vectors": total_vectors,
+        "sources": dict(sources.most_common()),
+        "pages": {
+            source: {page: count for (s, page), count in sorted(pages.items(), key=_page_order) if s == source}
+            for source in sources
+        },
+        "duplicate_ratio": round(1 - len(text_hashes) / chunks, 4) if chunks else 0.0,
+        # Same figure the session memory budget uses
+        "memory_mb": round(estimate_store_bytes(store) / 1024 / 1024, 3),
+        "disk_mb": round(disk_size(path) / 1024 / 1024, 3),
+        "indexes": indexes,
+        "latency": time_queries(store, num_queries, k),
+    }
+
+
+def print_inspection(report: dict):
+    print(f"Vector store: {report['path']} ({'sharded' if report['sharded'] else 'single index'})")
+    print(
+        f"  chunks={report['chunks']} | vectors={report['vectors']} | "
+        f"duplicates={report['duplicate_ratio']:.1%} | "
+        f"memory≈{report['memory_mb']:.2f} MB | disk={report['disk_mb']:.2f} MB"
+    )
+
+    print("\nIndexes:")
+    for index in report["indexes"]:
+        print(
+            f"  {index['name']:<32} {index['description']:<20} dim={index['dimension']} "
+            f"projection={index['projection']} vectors={index['vectors']} "
+            f"tombstones={index['tombstones']} docstore={index['docstore']} "
+            f"memory≈{index['memory_mb']:.2f} MB"
+        )
+
+    print("\nChunks per source / page:")
+    for source, count in report["sources"].items():
+        per_page = ", ".join(f"p{page}:{n}" for page, n in report["pages"][source].items())
+        print(f"  {source:<32} {count:>6}  [{per_page}]")
+
+    latency = report["latency"]
+    if latency:
+        print(f"\nSearch latency ({latency['queries']} queries, k={latency['k']}):")
+        for stage in ("index", "retrieval"):
+            print(f"  {stage:<10} p50={latency[stage]['p50_ms']:.3f} ms | p95={latency[stage]['p95_ms']:.3f} ms")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect a saved vector store")
+    parser.add_argument("path", nargs="?", default=VECTORSTORE_PATH, help="Saved vector store folder")
+    parser.add_argument("-n", "--queries", type=int, default=NUM_QUERIES, help="Sample queries to time")
+    parser.add_argument("-k", type=int, default=TOP_K)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    result = inspect_vectorstore(args.path, args.queries, args.k)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_inspection(result)
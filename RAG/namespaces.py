@@ -0,0 +1,243 @@
+import os
+import time
+import shutil
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+from RAG import indexing
+from RAG.shards import ShardedVectorStore, load_any_vectorstore
+
+logger = logging.getLogger(__name__)
+
+# -------------------
+# Memory budget for the per-session indexes kept resident
+# -------------------
+MEMORY_BUDGET_MB = int(os.getenv("RAG_MEMORY_BUDGET_MB", "1024"))
+# Sessions used more recently than this are never evicted
+MIN_IDLE_SECONDS = 60
+# Stores that have no folder of their own are saved under <session>/evicted/<name>
+EVICTED_DIR = "evicted"
+
+
+def estimate_store_bytes(store) -> int:
+    if store is None:
+        return 0
+    if isinstance(store, ShardedVectorStore):
+        with store._lock:
+            shards = list(store.shards.values())
+        return sum(indexing.estimate_memory_bytes(shard.vectorstore) for shard in shards)
+    return indexing.estimate_memory_bytes(store)
+
+
+class Namespace:
+    """The vector stores of one session, either resident or saved to disk."""
+
+    def __init__(self, session_id: str, stores: Dict[str, Any]):
+        self.session_id = session_id
+        self.stores = stores
+        # name -> (path, embeddings, index_type) while evicted
+        self.saved: Dict[str, Optional[tuple]] = {}
+        self.evicted = False
+        self.size_bytes = sum(estimate_store_bytes(store) for store in stores.values())
+        self.last_access = time.monotonic()
+        self.lock = threading.RLock()
+        # Callers holding the stores across a long operation, see NamespaceManager.pinned
+        self.pins = 0
+
+    @property
+    def busy(self) -> bool:
+        return self.pins > 0 or any(getattr(store, "busy", False) for store in self.stores.values())
+
+
+class NamespaceManager:
+    """
+    Keeps per-session vector stores under a shared memory budget.
+
+    When the resident stores outgrow the budget, the least recently used
+    idle sessions are written to disk (save_vectorstore / sharded manifest,
+    i.e. the FAISS.save_local layout) and dropped from memory. The next
+    get() for an evicted session loads it back transparently.
+    """
+
+    def __init__(self, budget_bytes: int = MEMORY_BUDGET_MB * 1024 * 1024, min_idle_seconds: float = MIN_IDLE_SECONDS):
+        self.budget_bytes = budget_bytes
+        self.min_idle_seconds = min_idle_seconds
+        self._lock = threading.RLock()
+        self._namespaces: "OrderedDict[str, Namespace]" = OrderedDict()
+        self.evictions = 0
+        self.reloads = 0
+
+    # -------------------
+    # Public API
+    # -------------------
+    def put(self, session_id: str, **stores):
+        """Registers (or replaces) the stores of a session."""
+        namespace = Namespace(session_id, stores)
+        with self._lock:
+            old = self._namespaces.pop(session_id, None)
+            self._namespaces[session_id] = namespace
+        if old is not None:
+            self._drop_evicted_copy(session_id)
+        self._enforce_budget(keep=session_id)
+
+    def get(self, session_id: str, name: str):
+        """Returns a store of a session (reloading it if evicted), or None."""
+        with self._lock:
+            namespace = self._namespaces.get(session_id)
+            if namespace is None:
+                return None
+            self._namespaces.move_to_end(session_id)
+            namespace.last_access = time.monotonic()
+
+        reloaded = False
+        with namespace.lock:
+            if namespace.evicted:
+                self._reload(namespace)
+                reloaded = True
+            store = namespace.stores.get(name)
+        if reloaded:
+            self._enforce_budget(keep=session_id)
+        return store
+
+    @contextmanager
+    def pinned(self, session_id: str):
+        """
+        Keeps a session resident for the duration of the block, so stores
+        fetched inside it are not saved and dropped while still being edited.
+        """
+        with self._lock:
+            namespace = self._namespaces.get(session_id)
+        if namespace is None:
+            yield
+            return
+        with namespace.lock:
+            namespace.pins += 1
+        try:
+            yield
+        finally:
+            with namespace.lock:
+                namespace.pins -= 1
+            self._enforce_budget(keep=session_id)
+
+    def remove(self, session_id: str):
+        with self._lock:
+            namespace = self._namespaces.pop(session_id, None)
+        if namespace is not None:
+            self._drop_evicted_copy(session_id)
+
+    def sessions(self):
+        with self._lock:
+            return list(self._namespaces.keys())
+
+    def resident_bytes(self) -> int:
+        with self._lock:
+            return sum(ns.size_bytes for ns in self._namespaces.values() if not ns.evicted)
+
+    def stats(self) -> dict:
+        with self._lock:
+            resident = [ns for ns in self._namespaces.values() if not ns.evicted]
+            return {
+                "sessions": len(self._namespaces),
+                "resident": len(resident),
+                "resident_mb": round(sum(ns.size_bytes for ns in resident) / 1024 / 1024, 2),
+                "budget_mb": round(self.budget_bytes / 1024 / 1024, 2),
+                "evictions": self.evictions,
+                "reloads": self.reloads,
+            }
+
+    # -------------------
+    # Eviction
+    # -------------------
+    def _enforce_budget(self, keep: Optional[str] = None):
+        with self._lock:
+            # Stores can grow after registration (replace_source), so re-measure
+            for namespace in self._namespaces.values():
+                if not namespace.evicted:
+                    namespace.size_bytes = sum(estimate_store_bytes(s) for s in namespace.stores.values())
+
+            excess = self.resident_bytes() - self.budget_bytes
+            if excess <= 0:
+                return
+
+            now = time.monotonic()
+            victims = []
+            # OrderedDict is kept in access order: least recently used first
+            for session_id, namespace in self._namespaces.items():
+                if excess <= 0:
+                    break
+                if (
+                    session_id == keep
+                    or namespace.evicted
+                    or namespace.busy
+                    or now - namespace.last_access < self.min_idle_seconds
+                ):
+                    continue
+                victims.append(namespace)
+                excess -= namespace.size_bytes
+
+        if excess > 0:
+            logger.warning(
+                f"Vector stores exceed the memory budget by {excess / 1024 / 1024:.1f} MB "
+                f"and no idle session is left to evict."
+            )
+
+        for namespace in victims:
+            self._evict(namespace)
+
+    def _evict(self, namespace: Namespace):
+        with namespace.lock:
+            if namespace.evicted or namespace.busy:
+                return
+            try:
+                saved = {
+                    name: self._save(namespace.session_id, name, store) if store is not None else None
+                    for name, store in namespace.stores.items()
+                }
+            except Exception as e:
+                logger.error(f"Could not evict session {namespace.session_id}: {e}")
+                return
+            namespace.saved = saved
+            namespace.stores = {name: None for name in saved}
+            namespace.evicted = True
+        self.evictions += 1
+        logger.info(f"Evicted session {namespace.session_id} ({namespace.size_bytes / 1024 / 1024:.1f} MB)")
+
+    def _save(self, session_id: str, name: str, store) -> tuple:
+        own_path = store.path if isinstance(store, ShardedVectorStore) else getattr(store.docstore, "path", None)
+        evicted_path = os.path.join(indexing.SESSIONS_DIR, session_id, EVICTED_DIR, name)
+        path = own_path or evicted_path
+        if path == evicted_path:
+            # Pickled copies are rewritten whole; stale shard folders would pile up
+            shutil.rmtree(path, ignore_errors=True)
+
+        if isinstance(store, ShardedVectorStore):
+            store.save(path)
+        else:
+            os.makedirs(path, exist_ok=True)
+            indexing.save_vectorstore(store, path)
+
+        return path, getattr(store, "embeddings", None) or store.embedding_function, getattr(store, "index_type", None)
+
+    def _reload(self, namespace: Namespace):
+        stores = {}
+        for name, saved in namespace.saved.items():
+            if saved is None:
+                stores[name] = None
+                continue
+            path, embeddings, index_type = saved
+            store = load_any_vectorstore(path, embeddings)
+            if isinstance(store, ShardedVectorStore):
+                store.index_type = index_type
+            stores[name] = store
+
+        namespace.stores = stores
+        namespace.saved = {}
+        namespace.evicted = False
+        namespace.size_bytes = sum(estimate_store_bytes(s) for s in stores.values())
+        self.reloads += 1
+        logger.info(f"Reloaded session {namespace.session_id} from disk")
+
+    def _drop_evicted_copy(self, session_id: str):
+        shutil.rmtree(os.path.join(indexing.SESSIONS_DIR, session_id, EVICTED_DIR), ignore_errors=True)
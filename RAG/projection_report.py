@@ -0,0 +1,122 @@
+import os
+import json
+import time
+import numpy as np
+import faiss
+from RAG import indexing
+from RAG.shards import SHARDS_MANIFEST, is_sharded
+
+# -------------------
+# Before / after report for RAG_PROJECTION
+# -------------------
+# Queries are perturbed corpus vectors, so no embedding server is needed
+NUM_QUERIES = 200
+QUERY_NOISE = 0.05
+TOP_K = 10
+
+
+def load_vectors(path: str) -> np.ndarray:
+    """All stored vectors of a saved (sharded or single) vector store."""
+    if is_sharded(path):
+        with open(os.path.join(path, SHARDS_MANIFEST), encoding="utf-8") as f:
+            folders = [os.path.join(path, entry["path"]) for entry in json.load(f)]
+    else:
+        folders = [path]
+
+    vectors = []
+    for folder in folders:
+        index = faiss.read_index(os.path.join(folder, indexing.FAISS_INDEX_FILE))
+        if index.ntotal:
+            indexing.apply_search_params(index)
+            vectors.append(index.reconstruct_n(0, index.ntotal))
+    if not vectors:
+        raise ValueError(f"No vectors found in {path}")
+    return np.concatenate(vectors).astype("float32")
+
+
+def make_queries(vectors: np.ndarray, num_queries: int = NUM_QUERIES, noise: float = QUERY_NOISE) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    picks = vectors[rng.choice(len(vectors), min(num_queries, len(vectors)), replace=False)]
+    scale = noise * np.linalg.norm(picks, axis=1, keepdims=True) / np.sqrt(vectors.shape[1])
+    return (picks + rng.normal(size=picks.shape) * scale).astype("float32")
+
+
+def measure(index, queries: np.ndarray, truth: np.ndarray, k: int) -> dict:
+    latencies = []
+    found = []
+    for query in queries:
+        start = time.perf_counter()
+        _, ids = index.search(query[None], k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found.append(ids[0])
+
+    recall = np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)])
+    return {
+        "description": None,
+        "memory_mb": round(indexing.estimate_index_bytes(index) / 1024 / 1024, 3),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+        f"recall@{k}": round(float(recall), 4),
+    }
+
+
+def projection_report(vectors: np.ndarray, spec: str, index_type: str = "auto", k: int = TOP_K) -> dict:
+    """
+    Builds the index with and without the projection and compares memory,
+    search latency and recall@k against exact full-dimension search.
+    """
+    num_vectors, dimension = vectors.shape
+    if index_type == "auto":
+        index_type = indexing.select_index_type(num_vectors)
+    k = min(k, num_vectors)
+    queries = make_queries(vectors)
+
+    exact = faiss.IndexFlatL2(dimension)
+    exact.add(vectors)
+    _, truth = exact.search(queries, k)
+
+    report = {"num_vectors": num_vectors, "dimension": dimension, "index_type": index_type}
+    for label, projection in (("before", None), ("after", indexing.fit_projection(spec, vectors))):
+        if label == "after" and projection is None:
+            report[label] = None
+            continue
+        index, description = indexing.create_index(index_type, dimension, num_vectors, projection)
+        indexing.train_index(index, vectors)
+        index.add(vectors)
+        indexing.apply_search_params(index)
+        report[label] = measure(index, queries, truth, k)
+        report[label]["description"] = description
+    return report
+
+
+def print_report(report: dict):
+    print(f"{report['num_vectors']} vectors | {report['dimension']}-d | index={report['index_type']}")
+    for label in ("before", "after"):
+        row = report[label]
+        if row is None:
+            print(f"  {label:<7} projection skipped")
+            continue
+        recall_key = next(key for key in row if key.startswith("recall@"))
+        print(
+            f"  {label:<7} {row['description']:<24} "
+            f"memory={row['memory_mb']:.3f} MB | p50={row['p50_ms']:.3f} ms | "
+            f"p95={row['p95_ms']:.3f} ms | {recall_key}={row[recall_key]:.3f}"
+        )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare an index with and without a projection")
+    parser.add_argument("path", nargs="?", default="RAG/vectorstore", help="Saved vector store folder")
+    parser.add_argument("-p", "--projection", default=indexing.PROJECTION, help='e.g. "pca:256" or "truncate:256"')
+    parser.add_argument("-t", "--index-type", default=indexing.INDEX_TYPE)
+    parser.add_argument("-k", type=int, default=TOP_K)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    result = projection_report(load_vectors(args.path), args.projection, args.index_type, args.k)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
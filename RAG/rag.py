@@ -1,47 +1,231 @@
 import os
-import streamlit as st
-from langchain_community.vectorstores import FAISS
-from langchain_ollama import OllamaEmbeddings
+import asyncio
+import logging
+import threading
+from typing import List, Optional
+import numpy as np
 from langchain_ollama import ChatOllama
 from RAG.prompts import (
     EXPLAIN_PROMPT,
     SUMMARY_PROMPT,
     RETRIEVE_PROMPT
 )
+from RAG.registry import retriever_registry, DEFAULT_SESSION
+from RAG.shards import load_any_vectorstore
+from RAG.embeddings import get_embeddings
+from RAG.context import (
+    FETCH_K,
+    fetch_candidates,
+    fetch_candidates_batch,
+    pack_context,
+    format_chunk,
+    merge_adjacent_chunks
+)
+from RAG.compression import COMPRESS_CONTEXT, compress_chunks
+from rate_limiter import rate_limited
 
 VECTORSTORE_PATH = "RAG/vectorstore/"
 OLLAMA_BASE_URL = "http://localhost:11434"
+# Seconds a query waits for the startup load before answering without documents
+READY_TIMEOUT = float(os.getenv("RAG_READY_TIMEOUT", "10"))
+
+logger = logging.getLogger(__name__)
+
+llm = rate_limited(ChatOllama(model="llama3", base_url=OLLAMA_BASE_URL, temperature=0.0), "ollama", "llama3")
+
+# Set once the persisted knowledge base is registered (or known to be missing)
+vectorstore_ready = threading.Event()
+_warm_load_lock = threading.Lock()
+_warm_load_thread: Optional[threading.Thread] = None
 
-llm = ChatOllama(model="llama3", base_url=OLLAMA_BASE_URL, temperature=0.0)
 
 def load_vectorstore():
-    embeddings = OllamaEmbeddings(model="nomic-embed-text")
-    return FAISS.load_local(
-        VECTORSTORE_PATH,
-        embeddings,
-        allow_dangerous_deserialization=True
-    )
+    return load_any_vectorstore(VECTORSTORE_PATH, get_embeddings())
+
+
+def _warm_load():
+    try:
+        if not os.path.isdir(VECTORSTORE_PATH):
+            logger.info(f"No persisted knowledge base at {VECTORSTORE_PATH}")
+            return
+        vectorstore = load_vectorstore()
+        # One throwaway search pages in the index so the first real query does not
+        # pay for the page faults
+        indexes = (
+            [shard.vectorstore.index for shard in vectorstore.shards.values()]
+            if hasattr(vectorstore, "shards") else [vectorstore.index]
+        )
+        dimension = next((index.d for index in indexes if index.ntotal), None)
+        if dimension:
+            fetch_candidates(vectorstore, np.zeros(dimension, dtype="float32"), 1)
+        retriever_registry.register(DEFAULT_SESSION, vectorstore)
+        logger.info(f"Persisted knowledge base loaded from {VECTORSTORE_PATH}")
+    except Exception as e:
+        logger.error(f"Loading the persisted knowledge base failed: {e}")
+    finally:
+        vectorstore_ready.set()
+
+    try:
+        # Loads the local model / wakes the Ollama embedding model ahead of the first query
+        get_embeddings().embed_query("warm-up")
+    except Exception as e:
+        logger.warning(f"Embedding warm-up failed: {e}")
+
+
+def start_background_load() -> threading.Thread:
+    """
+    Starts loading the persisted knowledge base on a daemon thread.
+
+    Safe to call on every Streamlit rerun: the load runs once per process.
+    """
+    global _warm_load_thread
+    with _warm_load_lock:
+        if _warm_load_thread is None:
+            _warm_load_thread = threading.Thread(target=_warm_load, name="rag-warm-load", daemon=True)
+            _warm_load_thread.start()
+        return _warm_load_thread
+
+
+def wait_until_ready(timeout: float = READY_TIMEOUT) -> bool:
+    """True once the startup load finished; False if it is still running after timeout."""
+    if _warm_load_thread is None:
+        return False
+    return vectorstore_ready.wait(timeout)
+
+
+def _get_vectorstore(session_id: str):
+    """The session's own knowledge base, else the persisted one loaded at startup."""
+    vectorstore = retriever_registry.get(session_id)
+    if vectorstore is None and wait_until_ready():
+        vectorstore = retriever_registry.get(DEFAULT_SESSION)
+    return vectorstore
+
+
+def knowledge_base_version(session_id: str = DEFAULT_SESSION) -> tuple:
+    """
+    (session, version) of the knowledge base a session retrieves from,
+    following the same fallback as _get_vectorstore without loading it.
+    """
+    session_id = session_id or DEFAULT_SESSION
+    if not retriever_registry.has(session_id):
+        session_id = DEFAULT_SESSION
+    return session_id, retriever_registry.version(session_id)
+
+
+def _assemble_context(vectorstore, query_vector, candidates, k, budget, compress) -> str:
+    if budget is None:
+        docs = [doc for doc, _ in candidates[:k]]
+    else:
+        docs = pack_context(query_vector, candidates, budget)
+    docs = merge_adjacent_chunks(docs)
+    if compress and docs:
+        docs = compress_chunks(query_vector, docs, vectorstore.embeddings)
+    return "\n\n".join(format_chunk(doc) for doc in docs)
+
+
+def get_context_chunks(
+    query: str,
+    k: int = 5,
+    session_id: str = DEFAULT_SESSION,
+    budget: int = None,
+    compress: bool = COMPRESS_CONTEXT
+):
+    """
+    Retrieves document context for a prompt.
 
-def get_context_chunks(query: str, k: int = 5):      
-    # vectorstore = load_vectorstore()               
-    vectorstore = st.session_state.vectorstore
+    Without a budget the k nearest chunks are returned. With a token budget
+    (see NODE_CONTEXT_BUDGETS) diverse chunks are packed with MMR until the
+    budget is filled. compress keeps only the sentences closest to the query.
+    """
+    vectorstore = _get_vectorstore(session_id)
     if vectorstore is None:
         return ""
-    docs = vectorstore.similarity_search(query, k=k)
-    context = "\n\n".join(
-        f"[File: {os.path.basename(doc.metadata.get('source', 'N/A'))} | "
-        f"Page {doc.metadata.get('page', 'N/A')}] "
-        f"{doc.metadata.get('original_content', doc.page_content)}"
-        for doc in docs
-    )
+    query_vector = vectorstore.embeddings.embed_query(query)
+    context = _retrieve(vectorstore, query, query_vector, k, budget, compress)
     # print("############################## Context ##############################:\n", context)
     # print('#' *70)
     return context
 
 
-def run_rag(query: str, mode: str):
+def _retrieve(vectorstore, query: str, query_vector, k: int, budget, compress) -> str:
+    candidates = fetch_candidates(vectorstore, query_vector, fetch_k=max(FETCH_K, k), query=query)
+    return _assemble_context(vectorstore, query_vector, candidates, k, budget, compress)
+
+
+async def aget_context_chunks(
+    query: str,
+    k: int = 5,
+    session_id: str = DEFAULT_SESSION,
+    budget: int = None,
+    compress: bool = COMPRESS_CONTEXT
+):
+    """
+    Async get_context_chunks: the embedding request is awaited, and the
+    store lookup (which may wait for the startup load or reload an evicted
+    session) and the CPU-bound search run on worker threads.
+    """
+    vectorstore = await asyncio.to_thread(_get_vectorstore, session_id)
+    if vectorstore is None:
+        return ""
+    query_vector = await vectorstore.embeddings.aembed_query(query)
+    return await asyncio.to_thread(_retrieve, vectorstore, query, query_vector, k, budget, compress)
+
+
+def get_context_batch(
+    queries: List[str],
+    k: int = 5,
+    session_id: str = DEFAULT_SESSION,
+    budgets: List[Optional[int]] = None,
+    compress: bool = COMPRESS_CONTEXT
+) -> List[str]:
+    """
+    Retrieves context for several instructions at once (e.g. a whole
+    orchestrator plan): one embedding request and one multi-query FAISS
+    search. Returns one context per query, packed for that query's budget;
+    a repeated query is searched once but packed per distinct budget.
+    """
+    vectorstore = _get_vectorstore(session_id)
+    unique = list(dict.fromkeys(queries))
+    if vectorstore is None or not unique:
+        return ["" for _ in queries]
+
+    query_vectors = vectorstore.embeddings.embed_documents(unique)
+    return _retrieve_batch(vectorstore, queries, unique, query_vectors, k, budgets, compress)
+
+
+def _retrieve_batch(vectorstore, queries, unique, query_vectors, k, budgets, compress) -> List[str]:
+    batch = fetch_candidates_batch(vectorstore, query_vectors, fetch_k=max(FETCH_K, k), queries=unique)
+    found = {query: (vector, candidates) for query, vector, candidates in zip(unique, query_vectors, batch)}
+
+    packed = {}
+    steps = list(zip(queries, budgets or [None] * len(queries)))
+    for query, budget in steps:
+        if (query, budget) not in packed:
+            vector, candidates = found[query]
+            packed[(query, budget)] = _assemble_context(vectorstore, vector, candidates, k, budget, compress)
+    return [packed[step] for step in steps]
+
+
+async def aget_context_batch(
+    queries: List[str],
+    k: int = 5,
+    session_id: str = DEFAULT_SESSION,
+    budgets: List[Optional[int]] = None,
+    compress: bool = COMPRESS_CONTEXT
+) -> List[str]:
+    """Async get_context_batch, see aget_context_chunks."""
+    vectorstore = await asyncio.to_thread(_get_vectorstore, session_id)
+    unique = list(dict.fromkeys(queries))
+    if vectorstore is None or not unique:
+        return ["" for _ in queries]
+
+    query_vectors = await vectorstore.embeddings.aembed_documents(unique)
+    return await asyncio.to_thread(_retrieve_batch, vectorstore, queries, unique, query_vectors, k, budgets, compress)
+
+
+def run_rag(query: str, mode: str, session_id: str = DEFAULT_SESSION):
     # 1. Retrieve context
-    context = get_context_chunks(query)
+    context = get_context_chunks(query, session_id=session_id)
     
     # 2. Select prompt
     if mode == "explain":
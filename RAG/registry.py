@@ -0,0 +1,66 @@
+import threading
+from typing import Dict, Optional
+from RAG.namespaces import NamespaceManager
+
+DEFAULT_SESSION = "default"
+
+
+class RetrieverRegistry:
+    """
+    Process-wide store of vector stores keyed by session / user ID.
+
+    Graph nodes look their knowledge base up here instead of reading
+    st.session_state, so retrieval also works from worker threads,
+    background jobs and the CLI. Idle sessions are evicted to disk by the
+    NamespaceManager once the memory budget is reached.
+
+    Every session also has a knowledge base version, bumped whenever its
+    stores are registered, removed or edited in place, so caches built on
+    retrieved context can tell when they went stale.
+    """
+
+    def __init__(self, namespaces: Optional[NamespaceManager] = None):
+        self.namespaces = namespaces or NamespaceManager()
+        self._versions_lock = threading.Lock()
+        self._versions: Dict[str, int] = {}
+
+    def register(self, session_id: str, vectorstore, file_vectorstore=None):
+        """Registers (or replaces) the knowledge base of a session."""
+        self.namespaces.put(session_id, vectorstore=vectorstore, file_vectorstore=file_vectorstore)
+        self.mark_changed(session_id)
+
+    def mark_changed(self, session_id: str):
+        """Call after editing a registered store in place (replace_source, delete_source)."""
+        with self._versions_lock:
+            self._versions[session_id] = self._versions.get(session_id, 0) + 1
+
+    def version(self, session_id: Optional[str] = None) -> int:
+        with self._versions_lock:
+            return self._versions.get(session_id or DEFAULT_SESSION, 0)
+
+    def has(self, session_id: Optional[str] = None) -> bool:
+        """True if the session registered a knowledge base (without reloading it)."""
+        return (session_id or DEFAULT_SESSION) in self.namespaces.sessions()
+
+    def get(self, session_id: Optional[str] = None):
+        """Returns the chunk vector store of a session, or None."""
+        return self.namespaces.get(session_id or DEFAULT_SESSION, "vectorstore")
+
+    def get_file_store(self, session_id: Optional[str] = None):
+        """Returns the file-summary vector store of a session, or None."""
+        return self.namespaces.get(session_id or DEFAULT_SESSION, "file_vectorstore")
+
+    def pinned(self, session_id: Optional[str] = None):
+        """Context manager that keeps a session from being evicted, e.g. for a whole upload."""
+        return self.namespaces.pinned(session_id or DEFAULT_SESSION)
+
+    def remove(self, session_id: str):
+        self.namespaces.remove(session_id)
+        self.mark_changed(session_id)
+
+    def sessions(self):
+        return self.namespaces.sessions()
+
+
+# Shared instance used by the app and the agent nodes
+retriever_registry = RetrieverRegistry()
@@ -0,0 +1,480 @@
+import os
+import re
+import json
+import uuid
+import shutil
+import logging
+import threading
+from typing import Dict, List, Optional
+import numpy as np
+from RAG import indexing
+
+logger = logging.getLogger(__name__)
+
+SHARDS_MANIFEST = "shards.json"
+PAGE_PATTERN = re.compile(r"\bpages?\s*(\d+)", re.IGNORECASE)
+# Share of tombstoned vectors in a shard that triggers a background rebuild
+COMPACTION_THRESHOLD = 0.3
+
+
+def _source_pattern(name: str):
+    """
+    Matches "notes.pdf" or "in / of / from (the) notes", but not "notes"
+    as an ordinary word of the question.
+    """
+    stem, ext = os.path.splitext(name)
+    forms = [rf"\b(?:in|of|from)\s+(?:the\s+)?{re.escape(stem)}\b"]
+    if ext:
+        forms.append(rf"\b{re.escape(stem)}{re.escape(ext)}\b")
+    return re.compile("|".join(forms))
+
+
+def _shard_dirname(source: str) -> str:
+    slug = re.sub(r"[^\w\-]+", "_", os.path.splitext(os.path.basename(source))[0])[:48]
+    return f"{slug}_{uuid.uuid4().hex[:8]}"
+
+
+class Shard:
+    """One FAISS index holding the chunks of a single source document."""
+
+    def __init__(self, source: str, vectorstore, page_ids: Dict[str, List[int]], tombstones=None):
+        self.source = source
+        self.name = os.path.basename(source).lower()
+        self.pattern = _source_pattern(self.name)
+        self.vectorstore = vectorstore
+        self.page_ids = page_ids
+        # FAISS row IDs that searches skip until the shard is compacted
+        self.tombstones = set(tombstones or [])
+        # True once the index files are on disk under path
+        self.saved = False
+        self._rows_by_doc_id = None
+
+    @classmethod
+    def from_vectorstore(cls, source: str, vectorstore):
+        page_ids = {}
+        for i, doc_id in vectorstore.index_to_docstore_id.items():
+            doc = vectorstore.docstore.search(doc_id)
+            if isinstance(doc, str):
+                continue
+            page_ids.setdefault(str(doc.metadata.get("page")), []).append(int(i))
+        return cls(source, vectorstore, page_ids)
+
+    @property
+    def path(self) -> Optional[str]:
+        return getattr(self.vectorstore.docstore, "path", None)
+
+    @property
+    def size(self) -> int:
+        return self.vectorstore.index.ntotal
+
+    @property
+    def tombstone_ratio(self) -> float:
+        return len(self.tombstones) / self.size if self.size else 1.0
+
+    def rows_for(self, doc_ids) -> List[int]:
+        if self._rows_by_doc_id is None:
+            self._rows_by_doc_id = {doc_id: i for i, doc_id in self.vectorstore.index_to_docstore_id.items()}
+        return [self._rows_by_doc_id[d] for d in doc_ids if d in self._rows_by_doc_id]
+
+    def _doc(self, i: int):
+        doc = self.vectorstore.docstore.search(self.vectorstore.index_to_docstore_id[int(i)])
+        return None if isinstance(doc, str) else doc
+
+    def search_rows(self, query_vectors: np.ndarray, fetch_k: int):
+        """
+        (distances, rows) arrays, one line per query, nearest first; no
+        docstore reads. Tombstoned and empty slots have distance inf.
+        """
+        index = self.vectorstore.index
+        # Over-fetch by the tombstone count so skipped rows do not shrink the result
+        distances, indices = index.search(query_vectors, min(fetch_k + len(self.tombstones), index.ntotal))
+        skip = indices == -1
+        if self.tombstones:
+            skip |= np.isin(indices, list(self.tombstones))
+        distances[skip] = np.inf
+        return distances, indices
+
+    def hit(self, distance: float, row: int):
+        """(distance, doc, vector) for a row, or None if its document is gone."""
+        doc = self._doc(row)
+        return None if doc is None else (distance, doc, self.vectorstore.index.reconstruct(row))
+
+    def search(self, query_vectors: np.ndarray, fetch_k: int):
+        """[[(distance, doc, vector)]] per query, nearest first."""
+        distances, indices = self.search_rows(query_vectors, fetch_k)
+        results = []
+        for row_d, row_i in zip(distances.tolist(), indices.tolist()):
+            hits = (self.hit(d, i) for d, i in zip(row_d, row_i) if d != np.inf)
+            results.append([hit for hit in hits if hit is not None][:fetch_k])
+        return results
+
+    def search_page(self, query_vector: np.ndarray, page: str, fetch_k: int):
+        """Exact search restricted to one page (a handful of vectors)."""
+        hits = []
+        for i in self.page_ids.get(page, []):
+            if i in self.tombstones:
+                continue
+            vector = self.vectorstore.index.reconstruct(i)
+            doc = self._doc(i)
+            if doc is not None:
+                hits.append((float(np.sum((vector - query_vector) ** 2)), doc, vector))
+        hits.sort(key=lambda h: h[0])
+        return hits[:fetch_k]
+
+
+class ShardedVectorStore:
+    """
+    Knowledge base split into one index per source document.
+
+    A router reads source / page references from the query ("page 5 of
+    lecture3.pdf") and only searches the matching shards, so filtered
+    requests never have to over-fetch from the whole corpus. Other
+    queries search every shard by row ID only and merge on distance, so
+    documents and vectors are read for the final top-k alone.
+
+    Documents can be deleted or replaced in place: their chunks are
+    tombstoned at once, and shards whose tombstone ratio passes
+    COMPACTION_THRESHOLD are rebuilt on a background thread.
+    """
+
+    def __init__(
+        self,
+        embeddings,
+        shards: Optional[List[Shard]] = None,
+        path: str = None,
+        index_type: str = None,
+        projection=None
+    ):
+        self.embeddings = embeddings
+        self.path = path
+        self.index_type = index_type
+        self._lock = threading.RLock()
+        self._compacting = set()
+        self.shards: Dict[str, Shard] = {shard.source: shard for shard in shards or []}
+        # All shards share one projection so a query vector fits every shard
+        if projection is None and self.shards:
+            projection = indexing.get_projection(next(iter(self.shards.values())).vectorstore.index)
+        self.projection = projection
+
+    @property
+    def busy(self) -> bool:
+        """True while a background compaction is rebuilding a shard."""
+        with self._lock:
+            return bool(self._compacting)
+
+    def sources(self) -> List[str]:
+        with self._lock:
+            return list(self.shards.keys())
+
+    # -------------------
+    # Routing
+    # -------------------
+    def parse_filter(self, query: str) -> dict:
+        lowered = query.lower()
+        sources = [shard.source for shard in self.shards.values() if shard.pattern.search(lowered)]
+        page = PAGE_PATTERN.search(query)
+        return {"sources": sources, "page": page.group(1) if page else None}
+
+    def route(self, query: str):
+        """Returns (shards to search, page filter or None); no shards means the whole corpus."""
+        with self._lock:
+            query_filter = self.parse_filter(query)
+            shards = [self.shards[s] for s in query_filter["sources"]]
+            page = query_filter["page"]
+            if page is not None and not any(page in shard.page_ids for shard in shards or self.shards.values()):
+                # Unknown page: ignore the page filter rather than return nothing
+                page = None
+            if not shards and page is not None:
+                shards = list(self.shards.values())
+            return shards, page
+
+    # -------------------
+    # Search
+    # -------------------
+    def search_rows_batch(self, query_vectors, fetch_k: int, queries: Optional[List[str]] = None):
+        """
+        ([[(distance, shard, row)]] merged nearest first, [[(distance, doc, vector)]]
+        page hits) per query. Each shard is searched once for all queries routed to it.
+        """
+        query_vectors = np.asarray(query_vectors, dtype="float32")
+        queries = queries or [""] * len(query_vectors)
+        parts = [[] for _ in queries]
+        page_hits = [[] for _ in queries]
+
+        shard_queries: Dict[str, List[int]] = {}
+        shards_by_source: Dict[str, Shard] = {}
+        with self._lock:
+            every_shard = list(self.shards.values())
+        for q, query in enumerate(queries):
+            shards, page = self.route(query)
+            for shard in shards or every_shard:
+                if page is None:
+                    shard_queries.setdefault(shard.source, []).append(q)
+                    shards_by_source[shard.source] = shard
+                else:
+                    page_hits[q].extend(shard.search_page(query_vectors[q], page, fetch_k))
+
+        for source, positions in shard_queries.items():
+            shard = shards_by_source[source]
+            distances, indices = shard.search_rows(query_vectors[positions], fetch_k)
+            for line, q in enumerate(positions):
+                parts[q].append((distances[line], indices[line], shard))
+
+        # Merged on distance with numpy; only the winners become (doc, vector)
+        merged = []
+        for query_parts in parts:
+            if not query_parts:
+                merged.append([])
+                continue
+            distances = np.concatenate([d for d, _, _ in query_parts])
+            indices = np.concatenate([i for _, i, _ in query_parts])
+            bounds = np.cumsum([len(d) for d, _, _ in query_parts])
+            top = np.argsort(distances, kind="stable")[:fetch_k]
+            top = top[distances[top] != np.inf]
+            owners = np.searchsorted(bounds, top, side="right")
+            merged.append([
+                (float(distances[t]), query_parts[o][2], int(indices[t]))
+                for t, o in zip(top.tolist(), owners.tolist())
+            ])
+        return merged, page_hits
+
+    def fetch_candidates_batch(self, query_vectors, fetch_k: int, queries: Optional[List[str]] = None):
+        """Returns [(doc, vector)] per query, merged across the routed shards."""
+        merged, page_hits = self.search_rows_batch(query_vectors, fetch_k, queries)
+        candidates = []
+        for query_rows, query_hits in zip(merged, page_hits):
+            query_hits.extend(hit for hit in (shard.hit(d, i) for d, shard, i in query_rows) if hit is not None)
+            query_hits.sort(key=lambda h: h[0])
+            candidates.append([(doc, vector) for _, doc, vector in query_hits[:fetch_k]])
+        return candidates
+
+    def similarity_search(self, query: str, k: int = 4):
+        vector = self.embeddings.embed_query(query)
+        return [doc for doc, _ in self.fetch_candidates_batch([vector], k, [query])[0]]
+
+    # -------------------
+    # Delete / replace
+    # -------------------
+    def _new_shard_path(self, source: str) -> Optional[str]:
+        return os.path.join(self.path, _shard_dirname(source)) if self.path else None
+
+    def delete(self, ids: List[str]):
+        """Tombstones chunks by docstore ID; searches skip them immediately."""
+        with self._lock:
+            touched = []
+            for shard in self.shards.values():
+                rows = shard.rows_for(ids)
+                if rows:
+                    shard.tombstones.update(rows)
+                    touched.append(shard.source)
+        if touched:
+            self._persist_tombstones()
+        for source in touched:
+            self.maybe_compact(source)
+
+    def delete_source(self, source: str):
+        """Tombstones every chunk of a document; compaction then drops the shard."""
+        with self._lock:
+            shard = self.shards.get(source)
+            if shard is None:
+                return
+            shard.tombstones.update(range(shard.size))
+        self._persist_tombstones()
+        self.maybe_compact(source)
+
+    def replace_source(self, source: str, documents):
+        """
+        Replaces (or adds) a document. The old chunks are hidden right away;
+        the new shard is embedded outside the lock and swapped in when ready.
+        """
+        with self._lock:
+            old = self.shards.get(source)
+            if old is not None:
+                old.tombstones.update(range(old.size))
+
+        if not documents:
+            self._persist_tombstones()
+            self.maybe_compact(source)
+            return
+
+        vectorstore = indexing.build_vectorstore(
+            documents, self.embeddings, index_type=self.index_type,
+            path=self._new_shard_path(source), projection=self.projection or "none"
+        )
+        with self._lock:
+            self.shards[source] = Shard.from_vectorstore(source, vectorstore)
+        # Manifest first: a reload must never see a shard folder that is gone
+        self._persist_if_saved()
+        self._discard(old)
+
+    # -------------------
+    # Compaction
+    # -------------------
+    def maybe_compact(self, source: str, background: bool = True):
+        with self._lock:
+            shard = self.shards.get(source)
+            if shard is None or shard.tombstone_ratio < COMPACTION_THRESHOLD or source in self._compacting:
+                return
+            self._compacting.add(source)
+        if background:
+            threading.Thread(target=self._compact, args=(source,), daemon=True).start()
+        else:
+            self._compact(source)
+
+    def _compact(self, source: str):
+        try:
+            self.compact(source)
+        except Exception as e:
+            logger.error(f"Compaction of {source} failed: {e}")
+        finally:
+            with self._lock:
+                self._compacting.discard(source)
+
+    def compact(self, source: str):
+        """Rebuilds a shard from its live vectors (no re-embedding)."""
+        with self._lock:
+            shard = self.shards.get(source)
+            if shard is None:
+                return
+            snapshot = set(shard.tombstones)
+
+        live = [i for i in range(shard.size) if i not in snapshot]
+        if not live:
+            with self._lock:
+                if self.shards.get(source) is shard:
+                    del self.shards[source]
+            logger.info(f"Compaction dropped empty shard {source}")
+            self._persist_if_saved()
+            self._discard(shard)
+            return
+
+        ids = [shard.vectorstore.index_to_docstore_id[i] for i in live]
+        docs = [shard._doc(i) for i in live]
+        vectors = [shard.vectorstore.index.reconstruct(i) for i in live]
+        # Docstore IDs are kept so later delete() calls still find the chunks;
+        # reconstruct() maps projected vectors back, so the projection is reused as is
+        vectorstore = indexing.build_vectorstore_from_vectors(
+            docs, vectors, self.embeddings, index_type=self.index_type,
+            path=self._new_shard_path(source), ids=ids, projection=self.projection or "none"
+        )
+        compacted = Shard.from_vectorstore(source, vectorstore)
+
+        with self._lock:
+            if self.shards.get(source) is not shard:
+                # Replaced while we were rebuilding; our copy is stale
+                self._discard(compacted)
+                return
+            # Carry over chunks deleted during the rebuild
+            late = [shard.vectorstore.index_to_docstore_id[i] for i in shard.tombstones - snapshot]
+            compacted.tombstones.update(compacted.rows_for(late))
+            self.shards[source] = compacted
+        logger.info(f"Compacted shard {source}: {shard.size} -> {compacted.size} vectors")
+        self._persist_if_saved()
+        self._discard(shard)
+
+    def _discard(self, shard: Optional[Shard]):
+        """Removes the sidecar folder of a shard that is no longer referenced."""
+        if shard is not None and shard.path and self.path:
+            shutil.rmtree(shard.path, ignore_errors=True)
+
+    def _persist_if_saved(self):
+        if self.path and is_sharded(self.path):
+            self.save(self.path)
+
+    def _persist_tombstones(self):
+        """
+        Rewrites only the manifest of a saved store, so deletions survive a
+        restart before compaction runs. Shards without a folder of their own
+        (or not written yet) need a full save.
+        """
+        if not (self.path and is_sharded(self.path)):
+            return
+        with self._lock:
+            if not all(shard.saved and shard.path for shard in self.shards.values()):
+                self.save(self.path)
+            else:
+                self._write_manifest(self.path, {source: shard.path for source, shard in self.shards.items()})
+
+    # -------------------
+    # Persistence
+    # -------------------
+    def save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        with self._lock:
+            shard_paths = {}
+            for source, shard in self.shards.items():
+                # mmap shards must be saved where their sidecar files already live
+                shard_paths[source] = shard.path or os.path.join(path, _shard_dirname(source))
+                indexing.save_vectorstore(shard.vectorstore, shard_paths[source])
+                shard.saved = True
+            self._write_manifest(path, shard_paths)
+
+    def _write_manifest(self, path: str, shard_paths: Dict[str, str]):
+        manifest = [
+            {
+                "source": shard.source,
+                "path": os.path.relpath(shard_paths[source], path),
+                "page_ids": shard.page_ids,
+                "tombstones": sorted(shard.tombstones),
+            }
+            for source, shard in self.shards.items()
+        ]
+        with open(os.path.join(path, SHARDS_MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+
+    @classmethod
+    def load(cls, path: str, embeddings):
+        with open(os.path.join(path, SHARDS_MANIFEST), encoding="utf-8") as f:
+            manifest = json.load(f)
+        shards = [
+            Shard(
+                entry["source"],
+                indexing.load_vectorstore(os.path.join(path, entry["path"]), embeddings),
+                entry["page_ids"],
+                entry.get("tombstones")
+            )
+            for entry in manifest
+        ]
+        for shard in shards:
+            shard.saved = True
+        return cls(embeddings, shards, path=path)
+
+
+def is_sharded(path: str) -> bool:
+    return os.path.exists(os.path.join(path, SHARDS_MANIFEST))
+
+
+def build_sharded_vectorstore(documents, embeddings, index_type: str = None, path: str = None, projection: str = None):
+    """
+    Builds one shard per metadata["source"]; mmap docstores go under path.
+
+    projection (default: RAG_PROJECTION env) is fitted once on the whole
+    corpus and shared by every shard.
+    """
+    store = ShardedVectorStore(embeddings, path=path, index_type=index_type)
+    by_source: Dict[str, list] = {}
+    for doc in documents:
+        by_source.setdefault(doc.metadata.get("source", "unknown"), []).append(doc)
+    if not by_source:
+        return store
+
+    ordered = [doc for docs in by_source.values() for doc in docs]
+    vectors = np.asarray(embeddings.embed_documents([doc.page_content for doc in ordered]), dtype="float32")
+    store.projection = indexing.fit_projection(projection or indexing.PROJECTION, vectors)
+
+    start = 0
+    for source, docs in by_source.items():
+        vectorstore = indexing.build_vectorstore_from_vectors(
+            docs, vectors[start:start + len(docs)], embeddings, index_type=index_type,
+            path=store._new_shard_path(source), projection=store.projection or "none"
+        )
+        store.shards[source] = Shard.from_vectorstore(source, vectorstore)
+        start += len(docs)
+    return store
+
+
+def load_any_vectorstore(path: str, embeddings):
+    """Loads a sharded knowledge base or a single-index vector store."""
+    if is_sharded(path):
+        return ShardedVectorStore.load(path, embeddings)
+    return indexing.load_vectorstore(path, embeddings)
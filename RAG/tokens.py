@@ -0,0 +1,23 @@
+from functools import lru_cache
+from transformers import AutoTokenizer
+
+TOKENIZER_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+@lru_cache(maxsize=1)
+def get_tokenizer():
+    return AutoTokenizer.from_pretrained(TOKENIZER_NAME)
+
+
+def count_tokens(text: str) -> int:
+    return len(get_tokenizer().encode(text, add_special_tokens=False))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """First max_tokens tokens of text, cut on the original characters (the tokenizer is uncased)."""
+    if max_tokens <= 0:
+        return ""
+    offsets = get_tokenizer()(text, add_special_tokens=False, return_offsets_mapping=True)["offset_mapping"]
+    if len(offsets) <= max_tokens:
+        return text
+    return text[:offsets[max_tokens - 1][1]]
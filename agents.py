@@ -60,27 +60,66 @@ TASK: Update the plan based on the user's request (status change or structure ch
 # --- AGENTS ---
 # Switched to Groq as per modified optimization logic
 llm_gen = Config.get_gemini_llm()
-llm_disc = Config.get_groq_llm()
+llm_disc = Config.get_routed_llm("discriminator")
 llm_edit = Config.get_groq_llm()
 llm_val = Config.get_groq_llm()
 
-def generator_node(state):
-    prompt = ChatPromptTemplate.from_template(GEN_PROMPT)
-    chain = prompt | llm_gen
-    
+def _generator_inputs(state) -> dict:
     # LOGIC FIX: Check if there is feedback from a previous attempt
     feedback = state.get("feedback")
     feedback_section = ""
     if feedback:
         feedback_section = f"PREVIOUS ATTEMPT CRITIQUE: {feedback}\nFIX THESE ISSUES IN THE NEW PLAN."
 
+    return {
+        "search_context": state.get("search_context", ""),
+        "user_request": state["user_request"],
+        "feedback_section": feedback_section, # Inject feedback
+        "format_instructions": format_instructions
+    }
+
+def _clean_json(raw_content: str) -> str:
+    # cleanup markdown if present
+    return raw_content.replace("```json", "").replace("```", "").strip()
+
+def _fix_inputs(state, error: Exception) -> dict:
+    # LOGIC FIX: Pass 'user_request' so the fixer knows the context
+    return {
+        "error": str(error),
+        "bad_json": state.get("raw_output", ""),
+        "user_request": state.get("user_request", "General Learning Plan"),
+        "format_instructions": format_instructions
+    }
+
+def _discriminator_inputs(state) -> dict:
+    # LOGIC FIX: Pass 'user_request' to ensure relevance
+    return {
+        "current_plan": state["current_plan"],
+        "user_request": state["user_request"]
+    }
+
+def _parse_critique(res_str: str) -> dict:
+    response = json.loads(_clean_json(res_str))
+    return {"feedback": response.get("feedback"), "approved": response.get("approved")}
+
+def _editor_inputs(state) -> dict:
+    # Handle chat history safely
+    history = state.get("messages", [])
+    history_str = "\n".join([f"{msg['role']}: {msg['content']}" for msg in history]) if history else "No history"
+
+    return {
+        "current_plan": state["current_plan"],
+        "user_input": history_str,
+        "selected_node": state.get("ui_selected_node", "None"),
+        "format_instructions": format_instructions
+    }
+
+def generator_node(state):
+    prompt = ChatPromptTemplate.from_template(GEN_PROMPT)
+    chain = prompt | llm_gen
+
     try:
-        response = chain.invoke({
-            "search_context": state.get("search_context", ""),
-            "user_request": state["user_request"],
-            "feedback_section": feedback_section, # Inject feedback
-            "format_instructions": format_instructions
-        })
+        response = chain.invoke(_generator_inputs(state))
         return {
             "raw_output": response.content, 
             "attempt_count": state.get("attempt_count", 0) + 1
@@ -88,36 +127,37 @@ def generator_node(state):
     except Exception as e:
         return {"error": str(e)}
 
-def validator_node(state):
+def _parse_plan(state):
     """
-    Validates and fixes JSON from Generator or Editor.
+    Shared first step of validator_node / avalidator_node:
+    (state update, None) when the raw output parses, else (None, error).
     """
     raw_content = state.get("raw_output", "")
-    
-    # 1. Try to parse immediately
     try:
-        # cleanup markdown if present
-        cleaned = raw_content.replace("```json", "").replace("```", "").strip()
-        parsed_obj = parser.parse(cleaned)
-        return {"current_plan": parsed_obj.dict(), "error": None}
-    
-    # 2. If failure, call LLM to fix
+        parsed_obj = parser.parse(_clean_json(raw_content))
+        return {"current_plan": parsed_obj.dict(), "error": None}, None
     except Exception as e:
         print(f"DEBUG: Parsing failed, attempting fix. Error: {e}")
-        fix_prompt = ChatPromptTemplate.from_template(FIX_PROMPT)
-        fix_chain = fix_prompt | llm_val | parser 
-        
-        try:
-            # LOGIC FIX: Pass 'user_request' so the fixer knows the context
-            fixed_obj = fix_chain.invoke({
-                "error": str(e),
-                "bad_json": raw_content,
-                "user_request": state.get("user_request", "General Learning Plan"),
-                "format_instructions": format_instructions
-            })
-            return {"current_plan": fixed_obj.dict(), "error": None}
-        except Exception as final_e:
-            return {"error": f"CRITICAL FAILURE: {str(final_e)}"}
+        return None, e
+
+def _fix_chain():
+    return ChatPromptTemplate.from_template(FIX_PROMPT) | llm_val | parser
+
+def validator_node(state):
+    """
+    Validates and fixes JSON from Generator or Editor.
+    """
+    # 1. Try to parse immediately
+    parsed, error = _parse_plan(state)
+    if parsed is not None:
+        return parsed
+
+    # 2. If failure, call LLM to fix
+    try:
+        fixed_obj = _fix_chain().invoke(_fix_inputs(state, error))
+        return {"current_plan": fixed_obj.dict(), "error": None}
+    except Exception as final_e:
+        return {"error": f"CRITICAL FAILURE: {str(final_e)}"}
 
 def discriminator_node(state):
     if state.get("error"):
@@ -127,33 +167,61 @@ def discriminator_node(state):
     chain = prompt | llm_disc 
     
     try:
-        # LOGIC FIX: Pass 'user_request' to ensure relevance
-        res_str = chain.invoke({
-            "current_plan": state["current_plan"],
-            "user_request": state["user_request"]
-        }).content
-        
-        res_str = res_str.replace("```json", "").replace("```", "").strip()
-        response = json.loads(res_str)
-        return {"feedback": response.get("feedback"), "approved": response.get("approved")}
+        return _parse_critique(chain.invoke(_discriminator_inputs(state)).content)
     except:
         return {"feedback": "Format Error in Discriminator", "approved": False}
 
 def editor_node(state):
     prompt = ChatPromptTemplate.from_template(EDITOR_PROMPT)
     chain = prompt | llm_edit
-    
-    # Handle chat history safely
-    history = state.get("messages", [])
-    history_str = "\n".join([f"{msg['role']}: {msg['content']}" for msg in history]) if history else "No history"
 
     try:
-        response = chain.invoke({
-            "current_plan": state["current_plan"],
-            "user_input": history_str,
-            "selected_node": state.get("ui_selected_node", "None"),
-            "format_instructions": format_instructions
-        })
+        response = chain.invoke(_editor_inputs(state))
         return {"raw_output": response.content}
     except Exception as e:
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
+
+# --- ASYNC AGENTS (used when the graphs run through ainvoke / astream) ---
+
+async def agenerator_node(state):
+    chain = ChatPromptTemplate.from_template(GEN_PROMPT) | llm_gen
+
+    try:
+        response = await chain.ainvoke(_generator_inputs(state))
+        return {
+            "raw_output": response.content, 
+            "attempt_count": state.get("attempt_count", 0) + 1
+        }
+    except Exception as e:
+        return {"error": str(e)}
+
+async def avalidator_node(state):
+    parsed, error = _parse_plan(state)
+    if parsed is not None:
+        return parsed
+
+    try:
+        fixed_obj = await _fix_chain().ainvoke(_fix_inputs(state, error))
+        return {"current_plan": fixed_obj.dict(), "error": None}
+    except Exception as final_e:
+        return {"error": f"CRITICAL FAILURE: {str(final_e)}"}
+
+async def adiscriminator_node(state):
+    if state.get("error"):
+        return {"approved": False}
+
+    chain = ChatPromptTemplate.from_template(DISC_PROMPT) | llm_disc
+
+    try:
+        return _parse_critique((await chain.ainvoke(_discriminator_inputs(state))).content)
+    except:
+        return {"feedback": "Format Error in Discriminator", "approved": False}
+
+async def aeditor_node(state):
+    chain = ChatPromptTemplate.from_template(EDITOR_PROMPT) | llm_edit
+
+    try:
+        response = await chain.ainvoke(_editor_inputs(state))
+        return {"raw_output": response.content}
+    except Exception as e:
+        return {"error": str(e)}
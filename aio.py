@@ -0,0 +1,42 @@
+import asyncio
+import threading
+from typing import AsyncIterator, Iterator, Optional
+
+# -------------------
+# Process-wide event loop for the async graphs
+# -------------------
+# Streamlit reruns scripts on plain threads. Running every graph on one
+# long-lived loop lets sessions overlap their I/O, and keeps the async HTTP
+# clients of the pooled chat models bound to a single loop (asyncio.run
+# would create and close a new loop per request).
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="graph-event-loop", daemon=True).start()
+        return _loop
+
+
+def run(coro, timeout: Optional[float] = None):
+    """Runs a coroutine on the shared loop and blocks the calling thread for its result."""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop()).result(timeout)
+
+
+def iterate(agen: AsyncIterator) -> Iterator:
+    """
+    Drives an async generator (e.g. graph.astream) on the shared loop and
+    yields its items on the calling thread, so Streamlit can render them.
+    """
+    try:
+        while True:
+            try:
+                yield run(agen.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        run(agen.aclose())
@@ -8,11 +8,17 @@ from streamlit_agraph import agraph, Node, Edge, Config as AgConfig
 from graph import app_graph, editor_graph 
 from state import PlanState
 from chat_graph import study_buddy_graph 
+from config import Config
+import aio
+from roadmap_context import roadmap_version
 import os
 import tempfile
 from RAG.ingest import ingest_pdf
-from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import OllamaEmbeddings
+from RAG.registry import retriever_registry
+from RAG.indexing import new_session_build_path, prune_session_builds
+from RAG.shards import build_sharded_vectorstore
+from RAG.embeddings import get_embeddings
+from RAG.rag import start_background_load
 from chat_tools import summarize_history
 from search_agent import search_with_agent
 import requests
@@ -23,6 +29,10 @@ import time
 UPLOAD_DIR = "RAG/data"
 NOTES_OUTPUT_DIR = "notes_output"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
+
+# Persisted knowledge base loads in the background once per process; queries wait on it
+start_background_load()
+
 # Keep this for browser metadata, but we will add a visible title below
 st.set_page_config(layout="wide", page_title="Student Partner AI", page_icon="🎓")
 
@@ -185,6 +195,8 @@ if "view_mode" not in st.session_state:
     st.session_state.view_mode = "Dashboard"
 if "plan_json" not in st.session_state:
     st.session_state.plan_json = None
+if "plan_version" not in st.session_state:
+    st.session_state.plan_version = None
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
 if "editor_chat_history" not in st.session_state:
@@ -193,10 +205,8 @@ if "clicked_node" not in st.session_state:
     st.session_state.clicked_node = None
 if "uploaded_docs" not in st.session_state:
     st.session_state.uploaded_docs = {}
-if "vectorstore" not in st.session_state:
-    st.session_state.vectorstore = None 
-if "file_vectorstore" not in st.session_state:
-    st.session_state.file_vectorstore = None
+if "session_id" not in st.session_state:
+    st.session_state.session_id = str(uuid.uuid4())
 if "search_query" not in st.session_state:
     st.session_state.search_query = ""
 if "is_searching" not in st.session_state:
@@ -273,8 +283,20 @@ def doc_modal():
     st.markdown("##### 📂 Upload History")
     if st.session_state.uploaded_docs:
         with st.container(height=200, border=True):
-            for filename, meta in st.session_state.uploaded_docs.items():
-                st.markdown(f"📄 **{filename}**")
+            for filename, meta in list(st.session_state.uploaded_docs.items()):
+                name_col, delete_col = st.columns([5, 1])
+                name_col.markdown(f"📄 **{filename}**")
+                if delete_col.button("🗑️", key=f"delete_doc_{filename}", help="Remove from knowledge base"):
+                    # Tombstoned chunks disappear from search at once; shards are compacted in the background
+                    for store in (
+                        retriever_registry.get(st.session_state.session_id),
+                        retriever_registry.get_file_store(st.session_state.session_id)
+                    ):
+                        if store is not None:
+                            store.delete_source(meta["path"])
+                    retriever_registry.mark_changed(st.session_state.session_id)
+                    del st.session_state.uploaded_docs[filename]
+                    st.rerun()
 
                 if meta.get("summary"):
                     with st.expander("🧾 View summary"):
@@ -302,44 +324,66 @@ def doc_modal():
     ):
         with st.spinner("Indexing Knowledge Base..."):
 
-            embeddings = OllamaEmbeddings(model="nomic-embed-text")
+            # Backend from RAG_EMBEDDING_BACKEND; recorded in each index so models are never mixed
+            embeddings = get_embeddings()
 
             chunk_docs = []
             file_docs = []
+            new_files = []
 
             for uploaded_doc in uploaded_docs:
-                if uploaded_doc.name not in st.session_state.uploaded_docs:
-                    file_path = os.path.join(UPLOAD_DIR, uploaded_doc.name)
-                    with open(file_path, "wb") as f:
-                        f.write(uploaded_doc.getbuffer())
-                    st.session_state.uploaded_docs[uploaded_doc.name] = {
-                        "path": file_path,
-                        "summary": None
-                    }
-
-
-            for filename, meta in st.session_state.uploaded_docs.items():
-                file_path = meta["path"]
-
-                chunks, file_summary = ingest_pdf(file_path)
-
-                # Store chunks
-                chunk_docs.extend(chunks)
+                # Re-uploading a file with the same name replaces it in the knowledge base
+                file_path = os.path.join(UPLOAD_DIR, uploaded_doc.name)
+                with open(file_path, "wb") as f:
+                    f.write(uploaded_doc.getbuffer())
+                st.session_state.uploaded_docs[uploaded_doc.name] = {
+                    "path": file_path,
+                    "summary": None
+                }
+                new_files.append(uploaded_doc.name)
 
-                # Store summary as a Document (for vectorstore)
-                if file_summary:
-                    file_docs.append(file_summary)
+            # Pinned so the session is not evicted (and its stores orphaned) while ingestion runs
+            with retriever_registry.pinned(st.session_state.session_id):
+                # Only a fresh knowledge base needs every document; otherwise just the new uploads
+                has_store = retriever_registry.get(st.session_state.session_id) is not None
+                to_ingest = new_files if has_store else list(st.session_state.uploaded_docs)
 
-                    # ✅ THIS IS THE IMPORTANT PART
-                    st.session_state.uploaded_docs[filename]["summary"] = file_summary.page_content
+                for filename in to_ingest:
+                    file_path = st.session_state.uploaded_docs[filename]["path"]
 
+                    chunks, file_summary = ingest_pdf(file_path)
 
-            st.session_state.vectorstore = FAISS.from_documents(
-                chunk_docs, embeddings
-            )
-            st.session_state.file_vectorstore = FAISS.from_documents(
-                file_docs, embeddings
-            )
+                    if has_store:
+                        # Fetched again right before the edit, after the minutes-long ingestion
+                        retriever_registry.get(st.session_state.session_id).replace_source(file_path, chunks)
+                        retriever_registry.get_file_store(st.session_state.session_id).replace_source(
+                            file_path, [file_summary] if file_summary else []
+                        )
+                        retriever_registry.mark_changed(st.session_state.session_id)
+                    else:
+                        # Store chunks
+                        chunk_docs.extend(chunks)
+
+                        # Store summary as a Document (for vectorstore)
+                        if file_summary:
+                            file_docs.append(file_summary)
+
+                    if file_summary:
+                        # ✅ THIS IS THE IMPORTANT PART
+                        st.session_state.uploaded_docs[filename]["summary"] = file_summary.page_content
+
+            if not has_store:
+                # Chunk text goes to memory-mapped sidecar files under a fresh build folder
+                build_path = new_session_build_path(st.session_state.session_id)
+
+                # Registered by session ID so graph nodes can reach it from any thread
+                retriever_registry.register(
+                    st.session_state.session_id,
+                    # One index per document so page/file-specific requests only search that file
+                    build_sharded_vectorstore(chunk_docs, embeddings, path=os.path.join(build_path, "chunks")),
+                    build_sharded_vectorstore(file_docs, embeddings, path=os.path.join(build_path, "files"))
+                )
+                prune_session_builds(st.session_state.session_id, keep=build_path)
 
             st.session_state.kb_indexed = True
 
@@ -449,11 +493,12 @@ with st.sidebar:
                 current_plan={}, feedback=None, search_context="", 
                 ui_selected_node=None, raw_output="", error=None
             )
-            result = app_graph.invoke(initial_state)
+            result = aio.run(app_graph.ainvoke(initial_state))
             if result.get("error"):
                 st.error(f"Error: {result['error']}")
             else:
                 st.session_state.plan_json = result["current_plan"]
+                st.session_state.plan_version = roadmap_version(st.session_state.plan_json)
                 st.session_state.chat_history.append({"role": "ai", "content": "Roadmap Generated Successfully!"})
                 st.rerun()
     
@@ -464,6 +509,7 @@ with st.sidebar:
                 try:
                     uploaded_data = json.load(uploaded_file)
                     st.session_state.plan_json = uploaded_data
+                    st.session_state.plan_version = roadmap_version(uploaded_data)
                     st.session_state.chat_history.append({"role": "ai", "content": f"Loaded plan: {uploaded_file.name}"})
                     st.session_state.last_uploaded_file = uploaded_file.name
                     st.rerun()
@@ -671,11 +717,25 @@ if st.session_state.view_mode == "Dashboard":
                     initial_chat_state = {
                         "user_prompt": user_input, "messages": [], "plan_actions": [], "plan_instructions": [], "research_memory": [],
                         "raw_data_storage": [], "execution_log": [], "validation_errors": [], "refinement_attempts": 0,
-                        "plan_data": st.session_state.plan_json, "selected_milestone_context": selected_ms_text, "conversation_summary": history_context
+                        "plan_data": st.session_state.plan_json, "selected_milestone_context": selected_ms_text, "conversation_summary": history_context,
+                        "plan_version": st.session_state.plan_version, "selected_milestone_id": st.session_state.clicked_node,
+                        "session_id": st.session_state.session_id
                     }
 
+                    # node -> [placeholder, text so far] for answers rendered token by token
+                    live_answers = {}
                     try:
-                        for chunk in study_buddy_graph.stream(initial_chat_state, stream_mode="updates", config={"configurable": {"thread_id": st.session_state.quiz_thread_id}}):
+                        for mode, chunk in aio.iterate(study_buddy_graph.astream(initial_chat_state, stream_mode=["messages", "updates"], config={"configurable": {"thread_id": st.session_state.quiz_thread_id}})):
+                            if mode == "messages":
+                                token, metadata = chunk
+                                if Config.UI_STREAM_TAG in metadata.get("tags", []) and token.content:
+                                    node = metadata.get("langgraph_node")
+                                    if node not in live_answers:
+                                        with chat_container: live_answers[node] = [st.chat_message("ai").empty(), ""]
+                                    live_answers[node][1] += token.content
+                                    live_answers[node][0].markdown(live_answers[node][1] + "▌")
+                                continue
+
                             if "orchestrator" in chunk:
                                 plan = chunk["orchestrator"]
                                 actions = plan.get("plan_actions", [])
@@ -685,7 +745,12 @@ if st.session_state.view_mode == "Dashboard":
                                     with chat_container: st.caption(f"⚙️ Plan: {', '.join(actions)}")
                             if "explain_node" in chunk:
                                 for msg in chunk["explain_node"].get("messages", []):
-                                    with chat_container: st.chat_message("ai").write(msg.content)
+                                    # Streamed answers already have a bubble; cache hits arrive in one piece
+                                    live = live_answers.pop("explain_node", None)
+                                    if live:
+                                        live[0].markdown(msg.content)
+                                    else:
+                                        with chat_container: st.chat_message("ai").write(msg.content)
                                     st.session_state.chat_history.append({"role": "ai", "content": msg.content})
                             if "quiz_generator" in chunk:
                                 quiz_data = chunk["quiz_generator"].get("quiz_output")
@@ -698,7 +763,11 @@ if st.session_state.view_mode == "Dashboard":
                                     st.session_state.chat_history.append({"role": "ai", "content": msg_content})
                             if "summarizer" in chunk:
                                  for msg in chunk["summarizer"].get("messages", []):
-                                    with chat_container: st.chat_message("ai").write(msg.content)
+                                    live = live_answers.pop("summarizer", None)
+                                    if live:
+                                        live[0].markdown(msg.content)
+                                    else:
+                                        with chat_container: st.chat_message("ai").write(msg.content)
                                     st.session_state.chat_history.append({"role": "ai", "content": msg.content})
                     except Exception as e:
                         st.error(f"Connection Error: Ensure Ollama is running. ({str(e)})")
@@ -824,9 +893,10 @@ if st.session_state.view_mode == "Dashboard":
                             ui_selected_node=st.session_state.clicked_node,
                             attempt_count=0, feedback=None, search_context="", raw_output="", error=None
                         )
-                        result = editor_graph.invoke(state_update)
+                        result = aio.run(editor_graph.ainvoke(state_update))
                         if not result.get("error"):
                             st.session_state.plan_json = result["current_plan"]
+                            st.session_state.plan_version = roadmap_version(st.session_state.plan_json)
                             st.session_state.editor_chat_history.append({"role": "ai", "content": "✅ Plan updated successfully!"})
                             st.rerun()
                         else:
@@ -1031,10 +1101,10 @@ elif st.session_state.view_mode == "Take Quiz":
                 )
 
                 with st.spinner("Grading your answers..."):
-                    for event in study_buddy_graph.stream(
+                    for event in aio.iterate(study_buddy_graph.astream(
                         None,
                         config={"configurable": {"thread_id": st.session_state.quiz_thread_id}}
-                    ):
+                    )):
                         if isinstance(event, dict):
                             for node_name, node_output in event.items():
                                 if (
@@ -0,0 +1,94 @@
+import re
+import time
+import hashlib
+from functools import lru_cache
+from typing import Any, List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+# -------------------
+# Deterministic stand-ins for Ollama, used by the benchmarks
+# -------------------
+FAKE_EMBED_DIM = 256
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+@lru_cache(maxsize=200_000)
+def _token_vector(token: str, dimension: int) -> np.ndarray:
+    seed = int(hashlib.sha1(token.encode("utf-8")).hexdigest()[:16], 16)
+    return np.random.default_rng(seed).standard_normal(dimension).astype("float32")
+
+
+class HashEmbeddings(Embeddings):
+    """
+    Bag-of-words embeddings built from hashed token vectors.
+
+    Identical inputs always give identical vectors and texts sharing words
+    land close together, so retrieval quality can be measured without a
+    model. latency / latency_per_text simulate the cost of a real backend.
+    """
+
+    def __init__(self, dimension: int = FAKE_EMBED_DIM, latency: float = 0.0, latency_per_text: float = 0.0):
+        self.dimension = dimension
+        self.latency = latency
+        self.latency_per_text = latency_per_text
+        self.calls = 0
+        # Seconds spent inside embed_documents, including the simulated latency
+        self.elapsed = 0.0
+
+    @property
+    def backend_id(self) -> str:
+        return f"fake:hash{self.dimension}"
+
+    def _embed(self, text: str) -> List[float]:
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        if not tokens:
+            return [0.0] * self.dimension
+        vector = np.sum([_token_vector(token, self.dimension) for token in tokens], axis=0)
+        return (vector / (np.linalg.norm(vector) or 1)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        start = time.perf_counter()
+        self.calls += 1
+        if self.latency or self.latency_per_text:
+            time.sleep(self.latency + self.latency_per_text * len(texts))
+        vectors = [self._embed(text) for text in texts]
+        self.elapsed += time.perf_counter() - start
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class FakeChatOllama(BaseChatModel):
+    """
+    Chat model standing in for ChatOllama.
+
+    Replies with the last summary_words words of the prompt (the content
+    part of the summary prompts) after latency + latency_per_token * words.
+    """
+
+    latency: float = 0.0
+    latency_per_token: float = 0.0
+    summary_words: int = 40
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-ollama"
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        words = str(messages[-1].content).split()
+        reply = " ".join(words[-self.summary_words:])
+        time.sleep(self.latency + self.latency_per_token * len(reply.split()))
+        self.calls += 1
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=reply))])
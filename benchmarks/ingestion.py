@@ -0,0 +1,215 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import contextlib
+from typing import List
+import numpy as np
+from langchain_core.documents import Document
+from RAG import ingest
+from RAG.shards import build_sharded_vectorstore
+from benchmarks.fakes import FakeChatOllama, HashEmbeddings
+from benchmarks.retrieval import run_metadata
+
+# -------------------
+# Ingestion benchmark: per-stage timings of ingest_pdf + indexing, no Ollama needed
+# -------------------
+PAGE_COUNTS = (5, 20)
+KINDS = ("text", "image")
+STAGES = ("extraction", "ocr", "splitting", "summarization", "embedding", "indexing")
+WORDS_PER_PAGE = 350
+LINE_CHARS = 90
+
+VOCABULARY = (
+    "data model learning network layer input output training feature vector matrix function "
+    "gradient error loss value system process method result analysis image text page document "
+    "search index query memory time cost graph node edge tree sort array list set key hash "
+    "algorithm structure pattern signal noise filter sample class label accuracy recall precision "
+    "student course lecture topic chapter section example problem solution theory practice"
+).split()
+
+
+# -------------------
+# Synthetic PDFs
+# -------------------
+def make_pages(num_pages: int, seed: int = 0) -> List[str]:
+    rng = np.random.default_rng(seed)
+    pages = []
+    for _ in range(num_pages):
+        sentences = []
+        words_left = WORDS_PER_PAGE
+        while words_left > 0:
+            length = int(rng.integers(8, 20))
+            sentence = " ".join(rng.choice(VOCABULARY, length))
+            sentences.append(sentence.capitalize() + ".")
+            words_left -= length
+        pages.append(" ".join(sentences))
+    return pages
+
+
+def wrap_lines(text: str, width: int = LINE_CHARS) -> List[str]:
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + len(word) + 1 > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}".strip()
+    if line:
+        lines.append(line)
+    return lines
+
+
+def write_text_pdf(path: str, pages: List[str]):
+    """Minimal PDF with real text objects (Helvetica), readable by PyPDFLoader."""
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled once the page objects are numbered
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for text in pages:
+        lines = [
+            line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            for line in wrap_lines(text)
+        ]
+        stream = "BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(f"({line}) '" for line in lines) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        content_id = len(objects)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>"
+        )
+        page_ids.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {len(page_ids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def write_image_pdf(path: str, pages: List[str]):
+    """Scanned-style PDF: every page is a rendered image without a text layer."""
+    from PIL import Image, ImageDraw, ImageFont
+
+    font = ImageFont.load_default(size=22)
+    images = []
+    for text in pages:
+        image = Image.new("L", (1240, 1754), 255)
+        draw = ImageDraw.Draw(image)
+        for row, line in enumerate(wrap_lines(text, 80)):
+            draw.text((60, 60 + row * 30), line, fill=0, font=font)
+        images.append(image)
+    images[0].save(path, save_all=True, append_images=images[1:], resolution=150)
+
+
+def fake_ocr(pages: List[str], seconds_per_page: float):
+    """Stands in for DocTR when the OCR models are not available."""
+    def extract_text_from_pdf(pdf_path: str):
+        time.sleep(seconds_per_page * len(pages))
+        return [
+            Document(page_content=text, metadata={"source": pdf_path, "page": i + 1, "loader": "doctr_ocr"})
+            for i, text in enumerate(pages)
+        ]
+    return extract_text_from_pdf
+
+
+# -------------------
+# Benchmark
+# -------------------
+def run_case(
+    kind: str,
+    num_pages: int,
+    llm: FakeChatOllama,
+    embeddings: HashEmbeddings,
+    index_type: str = None,
+    ocr_seconds_per_page: float = None
+) -> dict:
+    pages = make_pages(num_pages)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, f"synthetic_{kind}_{num_pages}.pdf")
+        if kind == "text":
+            write_text_pdf(path, pages)
+        else:
+            write_image_pdf(path, pages)
+
+        timings = {}
+        original_llm, original_ocr = ingest.llm, ingest.extract_text_from_pdf
+        ingest.llm = llm
+        if ocr_seconds_per_page is not None:
+            ingest.extract_text_from_pdf = fake_ocr(pages, ocr_seconds_per_page)
+        try:
+            # ingest_pdf prints every chunk and summary; keep the report readable
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                chunks, file_summary = ingest.ingest_pdf(path, timings)
+        finally:
+            ingest.llm, ingest.extract_text_from_pdf = original_llm, original_ocr
+
+        # Same two stores the app builds after an upload
+        embeddings.elapsed = 0.0
+        start = time.perf_counter()
+        build_sharded_vectorstore(chunks, embeddings, index_type=index_type, path=os.path.join(tmpdir, "chunks"))
+        build_sharded_vectorstore([file_summary], embeddings, index_type=index_type, path=os.path.join(tmpdir, "files"))
+        build_s = time.perf_counter() - start
+        timings["embedding"] = embeddings.elapsed
+        timings["indexing"] = build_s - embeddings.elapsed
+
+    total = sum(timings.values())
+    return {
+        "kind": kind,
+        "pages": num_pages,
+        "chunks": len(chunks),
+        "llm_calls": llm.calls,
+        "stages_s": {stage: round(timings.get(stage, 0.0), 4) for stage in STAGES},
+        "total_s": round(total, 4),
+        "pages_per_s": round(num_pages / total, 3) if total else None,
+    }
+
+
+def print_result(result: dict, file=sys.stdout):
+    stages = " ".join(f"{stage}={seconds:.2f}s" for stage, seconds in result["stages_s"].items())
+    print(
+        f"{result['kind']:<6} pages={result['pages']:<4} chunks={result['chunks']:<5} {stages} "
+        f"total={result['total_s']:.2f}s -> {result['pages_per_s']} pages/s",
+        file=file
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Ingestion benchmark with simulated Ollama latency")
+    parser.add_argument("--pages", default=",".join(map(str, PAGE_COUNTS)), help="Comma-separated page counts")
+    parser.add_argument("--kinds", default=",".join(KINDS), help="text (text layer) and/or image (OCR)")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds per chat call")
+    parser.add_argument("--llm-latency-per-token", type=float, default=0.0, help="Extra seconds per generated word")
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="Seconds per embedding request")
+    parser.add_argument("--embed-latency-per-text", type=float, default=0.0, help="Extra seconds per embedded text")
+    parser.add_argument("--index-type", default=None)
+    parser.add_argument("--fake-ocr", type=float, metavar="SECONDS_PER_PAGE", help="Skip DocTR and simulate OCR")
+    parser.add_argument("--out", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    results = []
+    for kind in args.kinds.split(","):
+        for num_pages in (int(p) for p in args.pages.split(",")):
+            llm = FakeChatOllama(latency=args.llm_latency, latency_per_token=args.llm_latency_per_token)
+            embeddings = HashEmbeddings(latency=args.embed_latency, latency_per_text=args.embed_latency_per_text)
+            results.append(run_case(kind, num_pages, llm, embeddings, args.index_type, args.fake_ocr))
+            print_result(results[-1], file=sys.stderr)
+
+    report = json.dumps({"run": run_metadata(), "results": results}, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(report)
+    else:
+        print(report)
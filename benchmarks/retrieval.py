@@ -0,0 +1,269 @@
+import os
+import sys
+import json
+import time
+import platform
+import subprocess
+from typing import Callable, Optional
+import numpy as np
+import faiss
+from langchain_core.documents import Document
+from RAG import indexing
+from RAG.context import FETCH_K, fetch_candidates, merge_adjacent_chunks, pack_context
+from RAG.namespaces import estimate_store_bytes
+from RAG.shards import build_sharded_vectorstore, load_any_vectorstore, ShardedVectorStore
+from benchmarks.fakes import HashEmbeddings
+
+# -------------------
+# Retrieval benchmark: recall@k, MRR, build time, memory, query latency
+# -------------------
+SIZES = (1_000, 10_000, 50_000)
+KS = (1, 5, 10)
+NUM_QUERIES = 200
+NUM_SOURCES = 20
+PAGES_PER_SOURCE = 50
+# Words per synthetic chunk: unique key terms, source topic terms, shared filler
+KEY_WORDS = 8
+TOPIC_WORDS = 12
+FILLER_WORDS = 20
+
+
+# -------------------
+# Synthetic corpus
+# -------------------
+def make_corpus(num_chunks: int, num_queries: int = NUM_QUERIES, num_sources: int = NUM_SOURCES, seed: int = 0):
+    """
+    Returns (documents, queries) where every query targets one chunk.
+
+    Each chunk mixes a few words unique to it with words shared by its
+    source and by the whole corpus, so a query (some key words plus topic
+    words) has exactly one best match but many close distractors.
+    """
+    rng = np.random.default_rng(seed)
+    filler = [f"common{i}" for i in range(500)]
+    topics = [[f"topic{s}x{i}" for i in range(60)] for s in range(num_sources)]
+
+    documents = []
+    keys = []
+    for chunk_id in range(num_chunks):
+        source = chunk_id % num_sources
+        key = [f"key{chunk_id}x{i}" for i in range(KEY_WORDS)]
+        words = (
+            key
+            + list(rng.choice(topics[source], TOPIC_WORDS))
+            + list(rng.choice(filler, FILLER_WORDS))
+        )
+        rng.shuffle(words)
+        text = " ".join(words)
+        documents.append(Document(
+            page_content=text,
+            metadata={
+                "source": f"doc{source:03d}.pdf",
+                "page": str((chunk_id // num_sources) % PAGES_PER_SOURCE + 1),
+                "chunk_id": chunk_id,
+                "original_content": text,
+            }
+        ))
+        keys.append(key)
+
+    queries = []
+    for chunk_id in rng.choice(num_chunks, min(num_queries, num_chunks), replace=False):
+        source = int(chunk_id) % num_sources
+        words = list(rng.choice(keys[chunk_id], 4, replace=False)) + list(rng.choice(topics[source], 2))
+        rng.shuffle(words)
+        queries.append({"query": " ".join(words), "relevant": [int(chunk_id)]})
+    return documents, queries
+
+
+def chunk_key(doc) -> int:
+    return doc.metadata.get("chunk_id")
+
+
+def page_key(doc):
+    source = doc.metadata.get("source", "").replace("\\", "/")
+    return os.path.basename(source), str(doc.metadata.get("page"))
+
+
+# -------------------
+# Build / evaluate
+# -------------------
+def build_store(documents, embeddings, index_type: str, sharded: bool):
+    start = time.perf_counter()
+    if sharded:
+        store = build_sharded_vectorstore(documents, embeddings, index_type=index_type)
+    else:
+        store = indexing.build_vectorstore(documents, embeddings, index_type=index_type)
+    return store, time.perf_counter() - start
+
+
+def evaluate(store, embeddings, queries, relevance: Callable, ks=KS, budget: Optional[int] = None) -> dict:
+    """
+    Runs every query through the retrieval path of RAG/rag.py.
+
+    Without a budget the ranked candidates are scored; with one, the MMR
+    packed and merged context is scored in selection order.
+    """
+    fetch_k = max(FETCH_K, max(ks))
+    latencies = []
+    recalls = {k: [] for k in ks}
+    reciprocal_ranks = []
+
+    for item in queries:
+        start = time.perf_counter()
+        query_vector = embeddings.embed_query(item["query"])
+        candidates = fetch_candidates(store, query_vector, fetch_k, query=item["query"])
+        if budget is None:
+            docs = [doc for doc, _ in candidates]
+        else:
+            docs = merge_adjacent_chunks(pack_context(query_vector, candidates, budget))
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        relevant = {tuple(r) if isinstance(r, list) else r for r in item["relevant"]}
+        ranked = [relevance(doc) for doc in docs]
+        for k in ks:
+            recalls[k].append(len(relevant & set(ranked[:k])) / len(relevant))
+        first = next((rank for rank, key in enumerate(ranked, 1) if key in relevant), None)
+        reciprocal_ranks.append(1 / first if first else 0.0)
+
+    return {
+        **{f"recall@{k}": round(float(np.mean(recalls[k])), 4) for k in ks},
+        "mrr": round(float(np.mean(reciprocal_ranks)), 4),
+        "latency_ms": {
+            "p50": round(float(np.percentile(latencies, 50)), 3),
+            "p95": round(float(np.percentile(latencies, 95)), 3),
+            "p99": round(float(np.percentile(latencies, 99)), 3),
+        },
+    }
+
+
+def describe_store(store) -> str:
+    if isinstance(store, ShardedVectorStore):
+        shards = list(store.shards.values())
+        return f"{len(shards)} shards, " + (shards[0].vectorstore.index_info["description"] if shards else "empty")
+    return store.index_info["description"]
+
+
+def run_case(name, documents, queries, embeddings, relevance, index_type, sharded, ks, budget) -> dict:
+    store, build_s = build_store(documents, embeddings, index_type, sharded)
+    result = {
+        "corpus": name,
+        "chunks": len(documents),
+        "queries": len(queries),
+        "index_type": index_type,
+        "sharded": sharded,
+        "index": describe_store(store),
+        "projection": indexing.PROJECTION,
+        "budget": budget,
+        "build_s": round(build_s, 3),
+        "memory_mb": round(estimate_store_bytes(store) / 1024 / 1024, 3),
+    }
+    result.update(evaluate(store, embeddings, queries, relevance, ks, budget))
+    return result
+
+
+def run_synthetic(sizes=SIZES, index_types=("auto",), sharded: bool = False, ks=KS, budget=None, num_queries=NUM_QUERIES):
+    embeddings = HashEmbeddings()
+    results = []
+    for size in sizes:
+        documents, queries = make_corpus(size, num_queries)
+        for index_type in index_types:
+            results.append(run_case(
+                f"synthetic-{size}", documents, queries, embeddings, chunk_key, index_type, sharded, ks, budget
+            ))
+            print_result(results[-1], file=sys.stderr)
+    return results
+
+
+def run_labeled(store_path: str, queries_path: str, index_types=("auto",), sharded: bool = False, ks=KS, budget=None):
+    """
+    Rebuilds the chunks of a saved store with each index type and scores a
+    labeled query file: [{"query": ..., "relevant": [{"source": ..., "page": ...}]}].
+    Needs the embedding backend the store was built with.
+    """
+    from RAG.embeddings import get_embeddings
+
+    with open(queries_path, encoding="utf-8") as f:
+        labeled = json.load(f)
+    queries = [
+        {"query": item["query"], "relevant": [[r["source"], str(r["page"])] for r in item["relevant"]]}
+        for item in labeled
+    ]
+
+    saved = load_any_vectorstore(store_path, None)
+    indexes = (
+        [shard.vectorstore for shard in saved.shards.values()]
+        if isinstance(saved, ShardedVectorStore) else [saved]
+    )
+    documents = [
+        doc for vectorstore in indexes
+        for doc in (vectorstore.docstore.search(i) for i in vectorstore.index_to_docstore_id.values())
+        if not isinstance(doc, str)
+    ]
+
+    embeddings = get_embeddings()
+    name = os.path.basename(os.path.normpath(queries_path))
+    results = []
+    for index_type in index_types:
+        results.append(run_case(name, documents, queries, embeddings, page_key, index_type, sharded, ks, budget))
+        print_result(results[-1], file=sys.stderr)
+    return results
+
+
+# -------------------
+# Output
+# -------------------
+def run_metadata() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "faiss": faiss.__version__,
+        "machine": platform.machine(),
+    }
+
+
+def print_result(result: dict, file=sys.stdout):
+    recalls = " ".join(f"{key}={value:.3f}" for key, value in result.items() if key.startswith("recall@"))
+    print(
+        f"{result['corpus']:<20} {result['index']:<28} build={result['build_s']:.2f}s "
+        f"mem={result['memory_mb']:.2f}MB {recalls} mrr={result['mrr']:.3f} "
+        f"p50={result['latency_ms']['p50']:.2f}ms p95={result['latency_ms']['p95']:.2f}ms",
+        file=file
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Retrieval quality / speed benchmark")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)), help="Synthetic corpus sizes (chunks)")
+    parser.add_argument("--index-types", default=indexing.INDEX_TYPE, help=f"Comma-separated, from {indexing.INDEX_TYPES} or auto")
+    parser.add_argument("--sharded", action="store_true", help="Build one shard per source")
+    parser.add_argument("--ks", default=",".join(map(str, KS)))
+    parser.add_argument("--budget", type=int, help="Score the MMR-packed context for this token budget")
+    parser.add_argument("--queries", type=int, default=NUM_QUERIES, help="Synthetic queries per corpus")
+    parser.add_argument("--labeled", help="Labeled query file (skips the synthetic corpora)")
+    parser.add_argument("--store", default="RAG/vectorstore", help="Saved store whose chunks the labeled queries target")
+    parser.add_argument("--out", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args()
+
+    index_types = args.index_types.split(",")
+    ks = tuple(int(k) for k in args.ks.split(","))
+    if args.labeled:
+        results = run_labeled(args.store, args.labeled, index_types, args.sharded, ks, args.budget)
+    else:
+        sizes = [int(size) for size in args.sizes.split(",")]
+        results = run_synthetic(sizes, index_types, args.sharded, ks, args.budget, args.queries)
+
+    report = json.dumps({"run": run_metadata(), "results": results}, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(report)
+    else:
+        print(report)
@@ -1,11 +1,12 @@
 # chat_graph.py
 from langgraph.graph import StateGraph, END
+from langchain_core.runnables import RunnableLambda
 from chat_state import AgentState
 from orchestrator import Orchestrator
-from quiz_agent import quiz_node
-from explainer_agent import explainer_node
-from summarizer_agent import summarizer_node # <--- IMPORTED
-from user_summary_node import user_summary_node # <--- IMPORTED
+from quiz_agent import quiz_node, aquiz_node
+from explainer_agent import explainer_node, aexplainer_node
+from summarizer_agent import summarizer_node, asummarizer_node # <--- IMPORTED
+from user_summary_node import user_summary_node, auser_summary_node # <--- IMPORTED
 from langgraph.checkpoint.memory import MemorySaver
 
 
@@ -32,13 +33,13 @@ def create_study_buddy_graph():
     workflow = StateGraph(AgentState)
     orchestrator = Orchestrator()
     
-    # Add Nodes
-    workflow.add_node("orchestrator", orchestrator.build_plan_node)
+    # Add Nodes (blocking implementation for invoke/stream, async one for ainvoke/astream)
+    workflow.add_node("orchestrator", RunnableLambda(orchestrator.build_plan_node, afunc=orchestrator.abuild_plan_node))
     workflow.add_node("scheduler", scheduler)
-    workflow.add_node("quiz_generator", quiz_node)
-    workflow.add_node("explain_node", explainer_node)
-    workflow.add_node("summarizer", summarizer_node) # <--- ADDED NODE
-    workflow.add_node("user_summary_node", user_summary_node) # <--- ADDED NODE
+    workflow.add_node("quiz_generator", RunnableLambda(quiz_node, afunc=aquiz_node))
+    workflow.add_node("explain_node", RunnableLambda(explainer_node, afunc=aexplainer_node))
+    workflow.add_node("summarizer", RunnableLambda(summarizer_node, afunc=asummarizer_node)) # <--- ADDED NODE
+    workflow.add_node("user_summary_node", RunnableLambda(user_summary_node, afunc=auser_summary_node)) # <--- ADDED NODE
     
     # Entry Point
     workflow.set_entry_point("orchestrator")
@@ -60,8 +60,12 @@ class AgentState(TypedDict):
     saved_plan_file: Optional[str]
     
     # --- Context Passing ---
+    session_id: Optional[str]  # Key of the user's knowledge base in RAG.registry
     plan_data: Optional[Dict[str, Any]] 
+    plan_version: Optional[str]  # roadmap_context.roadmap_version of plan_data
+    selected_milestone_id: Optional[str]  # Milestone clicked in the UI
     selected_milestone_context: Optional[str] 
+    prefetched_context: Optional[Dict[str, Dict[str, str]]]  # Batch-retrieved document context by worker, then instruction
     
     # --- CHANGED: Added Summary Field ---
     conversation_summary: Optional[str] # Holds the LLM-summarized history
@@ -1,16 +1,17 @@
 import json
 import os
 import re
+import httpx
 import requests
 from typing import Dict, Any, List, Tuple
 from datetime import datetime
 from chat_state import ProjectPlan
 from langchain_core.messages import HumanMessage
 from langchain_tavily import TavilySearch
-from pydantic import BaseModel, Field, SecretStr
-from langchain_core.tools import tool
+from pydantic import BaseModel, Field
+from langchain_core.tools import StructuredTool
 from config import Config
-from langchain_groq import ChatGroq
+from rate_limiter import Priority
 
 # --- HISTORY SUMMARIZER ---
 
@@ -31,8 +32,8 @@ def summarize_history(chat_history: List[Dict[str, str]]) -> str:
         history_text += f"{role}: {msg['content']}\n"
 
     try:
-        # We use Groq for speed
-        llm = Config.get_ollama_llm()
+        # Fastest healthy provider, see Config.ROUTES
+        llm = Config.get_routed_llm("summarization")
             
         prompt = f"""
         You are a summarization assistant for an AI Orchestrator.
@@ -260,34 +261,81 @@ class OrchestrationTools:
             print(f"  Save error: {e}")
             return OrchestrationTools.send_user_message(error_msg)
 
-@tool
-def web_search_tool(query: str) -> str:
+def _web_search(query: str) -> str:
     """
     Performs a web search using Tavily and summarizes the results.
     Use this when you need current events, documentation, or study material text.
     """
-    print(f"  🔎 [Tool] Web Searching for: {query}")
-    
     try:
         # Perform search with Tavily
-        tavily = TavilySearch(max_results=3)
+        tavily, llm = _web_search_clients(query)
         results = tavily.invoke(query)
         
         # Summarize results with Groq
-        if Config.GROQ_API_KEY:
-            llm = ChatGroq(
-                model="llama-3.3-70b-versatile",
-                api_key=SecretStr(Config.GROQ_API_KEY)
-            )
-            summary = llm.invoke(f"Summarize these search results for the query '{query}': {results}")
-            return f"Web Search Results for '{query}':\n{summary.content}"
-        else:
-            return f"Web Search Results for '{query}':\n{results}"
+        if llm:
+            results = llm.invoke(_summary_prompt(query, results)).content
+        return _format_web_results(query, results)
     except Exception as e:
         return f"Error performing web search: {str(e)}"
 
-@tool
-def youtube_search_tool(query: str) -> str:
+async def _aweb_search(query: str) -> str:
+    try:
+        tavily, llm = _web_search_clients(query)
+        results = await tavily.ainvoke(query)
+        if llm:
+            results = (await llm.ainvoke(_summary_prompt(query, results))).content
+        return _format_web_results(query, results)
+    except Exception as e:
+        return f"Error performing web search: {str(e)}"
+
+
+def _web_search_clients(query: str):
+    """(Tavily client, Groq summarizer or None without a key)."""
+    print(f"  🔎 [Tool] Web Searching for: {query}")
+    tavily = TavilySearch(max_results=3)
+    llm = Config.get_groq_llm(priority=Priority.INTERACTIVE) if Config.GROQ_API_KEY else None
+    return tavily, llm
+
+
+def _summary_prompt(query: str, results) -> str:
+    return f"Summarize these search results for the query '{query}': {results}"
+
+
+def _format_web_results(query: str, results) -> str:
+    return f"Web Search Results for '{query}':\n{results}"
+
+# invoke() runs the blocking version, ainvoke() the async one
+web_search_tool = StructuredTool.from_function(func=_web_search, coroutine=_aweb_search, name="web_search_tool")
+
+YOUTUBE_SEARCH_URL = "https://www.googleapis.com/youtube/v3/search"
+HTTP_TIMEOUT = 15
+
+
+def _youtube_params(search_query: str, youtube_api_key: str) -> dict:
+    return {
+        "part": "snippet",
+        "q": search_query,
+        "maxResults": 3,
+        "type": "video",
+        "key": youtube_api_key
+    }
+
+
+def _youtube_query_prompt(query: str) -> str:
+    return f"Create an optimized YouTube search query for: {query}. Return ONLY the query."
+
+
+def _format_videos(items) -> str:
+    results = []
+    for item in items:
+        title = item["snippet"]["title"]
+        video_id = item["id"]["videoId"]
+        link = f"https://www.youtube.com/watch?v={video_id}"
+        results.append(f"- Title: {title}\n  Link: {link}")
+        
+    return "\n".join(results) if results else "No videos found."
+
+def _youtube_search(query: str) -> str:
     """
     Searches YouTube for videos. 
     Use this when the user asks for videos, visual tutorials, or lectures.
@@ -302,37 +350,41 @@ def youtube_search_tool(query: str) -> str:
     try:
         # Optimize query with Groq if available
         if Config.GROQ_API_KEY:
-            llm = ChatGroq(
-                model="llama-3.3-70b-versatile",
-                api_key=SecretStr(Config.GROQ_API_KEY)
-            )
-            refined = llm.invoke(f"Create an optimized YouTube search query for: {query}. Return ONLY the query.")
+            llm = Config.get_groq_llm(priority=Priority.INTERACTIVE)
+            refined = llm.invoke(_youtube_query_prompt(query))
             search_query = refined.content.strip()
         else:
             search_query = query
 
         # Search YouTube API
-        url = "https://www.googleapis.com/youtube/v3/search"
-        params = {
-            "part": "snippet",
-            "q": search_query,
-            "maxResults": 3,
-            "type": "video",
-            "key": youtube_api_key
-        }
-        
-        response = requests.get(url, params=params)
+        response = requests.get(YOUTUBE_SEARCH_URL, params=_youtube_params(search_query, youtube_api_key))
         response.raise_for_status()
-        items = response.json().get("items", [])
+        return _format_videos(response.json().get("items", []))
         
-        results = []
-        for item in items:
-            title = item["snippet"]["title"]
-            video_id = item["id"]["videoId"]
-            link = f"https://www.youtube.com/watch?v={video_id}"
-            results.append(f"- Title: {title}\n  Link: {link}")
-            
-        return "\n".join(results) if results else "No videos found."
+    except Exception as e:
+        return f"Error searching YouTube: {str(e)}"
+
+async def _ayoutube_search(query: str) -> str:
+    print(f"  🎥 [Tool] YouTube Searching for: {query}")
+    
+    youtube_api_key = os.getenv("YOUTUBE_API_KEY")
+    if not youtube_api_key:
+        return "Error: YOUTUBE_API_KEY not found."
+
+    try:
+        if Config.GROQ_API_KEY:
+            llm = Config.get_groq_llm(priority=Priority.INTERACTIVE)
+            refined = await llm.ainvoke(_youtube_query_prompt(query))
+            search_query = refined.content.strip()
+        else:
+            search_query = query
+
+        async with httpx.AsyncClient(timeout=HTTP_TIMEOUT) as client:
+            response = await client.get(YOUTUBE_SEARCH_URL, params=_youtube_params(search_query, youtube_api_key))
+        response.raise_for_status()
+        return _format_videos(response.json().get("items", []))
         
     except Exception as e:
-        return f"Error searching YouTube: {str(e)}"
\ No newline at end of file
+        return f"Error searching YouTube: {str(e)}"
+
+youtube_search_tool = StructuredTool.from_function(func=_youtube_search, coroutine=_ayoutube_search, name="youtube_search_tool")
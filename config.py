@@ -1,9 +1,14 @@
 import os
+import threading
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_ollama import ChatOllama
+from langchain_core.runnables import Runnable
 from typing import Optional, Dict, Any
 from pydantic import SecretStr
+from llm_cache import LLM_CACHE_ENABLED, CachedChatModel, LLMCache
+from llm_router import LLM_HEDGING_ENABLED, LLM_ROUTING_ENABLED, ProviderRouter
+from rate_limiter import Priority, rate_limited
 
 load_dotenv()
 
@@ -14,7 +19,88 @@ load_dotenv()
 # LANGCHAIN_API_KEY="<your-api-key>"
 # LANGCHAIN_PROJECT="roadmap-agent"
 
+class LLMClientPool:
+    """
+    Process-wide registry of chat clients keyed by provider, model and params.
+
+    LangChain chat models are safe to share between threads, and reusing
+    one keeps its HTTP connection pool and TLS sessions alive instead of
+    rebuilding them on every node / tool call.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients: Dict[tuple, Any] = {}
+        self._created: Dict[tuple, int] = {}
+        self._reused: Dict[tuple, int] = {}
+
+    def get(self, provider: str, model: str, factory, **params):
+        """Returns the shared client for the key, building it with factory() once."""
+        key = (provider, model, tuple(sorted(params.items())))
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._reused[key] += 1
+                return client
+            client = factory()
+            self._clients[key] = client
+            self._created[key] = self._created.get(key, 0) + 1
+            self._reused.setdefault(key, 0)
+            return client
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            created = sum(self._created.values())
+            reused = sum(self._reused.values())
+            return {
+                "clients": len(self._clients),
+                "created": created,
+                "reused": reused,
+                "reuse_ratio": round(reused / (created + reused), 3) if created + reused else 0.0,
+                "per_client": {
+                    self._label(key): {"created": self._created[key], "reused": self._reused[key]}
+                    for key in self._created
+                },
+            }
+
+    @staticmethod
+    def _label(key: tuple) -> str:
+        provider, model, params = key
+        return f"{provider}:{model}" + (f" {dict(params)}" if params else "")
+
+
 class Config:
+    # Process-wide chat client registry, see LLMClientPool
+    client_pool = LLMClientPool()
+
+    # Tag on LLM calls whose tokens the chat UI renders live (stream_mode="messages")
+    UI_STREAM_TAG = "stream_to_ui"
+
+    # Exact-match response cache, see llm_cache.py. Nodes opt in by name;
+    # any_temperature also caches clients that are not temperature 0.
+    llm_cache = LLMCache() if LLM_CACHE_ENABLED else None
+    LLM_CACHE_NODES: Dict[str, Dict[str, Any]] = {
+        "explainer": {"ttl": 7 * 24 * 3600},
+        "summarizer": {"ttl": 7 * 24 * 3600},
+        "discriminator": {"ttl": 24 * 3600, "any_temperature": True},
+        "mcq_feedback": {"ttl": 30 * 24 * 3600, "any_temperature": True},
+    }
+
+    # Latency-aware routing, see llm_router.py. Free-text outputs that do not
+    # depend on one particular model go to the fastest healthy provider;
+    # providers are listed in preference order and skipped when not configured.
+    # Anything that decides a score stays on a fixed client instead.
+    ROUTES: Dict[str, Dict[str, Any]] = {
+        "summarization": {"providers": ("ollama", "groq", "gemini"), "hedge": True, "priority": Priority.INTERACTIVE},
+        "discriminator": {"providers": ("groq", "gemini", "ollama"), "cache_node": "discriminator"},
+        "grading_summary": {"providers": ("ollama", "groq", "gemini")},
+        "grading_feedback": {"providers": ("ollama", "groq", "gemini"), "cache_node": "mcq_feedback", "hedge": True},
+    }
+
     # Google Gemini
     GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
     GEMINI_MODEL = "gemini-2.5-flash"
@@ -27,34 +113,95 @@ class Config:
     OLLAMA_BASE_URL = "http://localhost:11434"
 
     GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+    GROQ_MODEL = "llama-3.3-70b-versatile"
 
     @classmethod
-    def get_groq_llm(cls):
+    def _limited(cls, client, provider: str, model: str, priority: int) -> Runnable:
+        # Shared per provider/model limiter, see rate_limiter.py
+        return rate_limited(client, provider, model, priority)
+
+    @classmethod
+    def _cached(cls, client, provider: str, model: str, cache_node: Optional[str]) -> Runnable:
+        policy = cls.LLM_CACHE_NODES.get(cache_node) if cache_node else None
+        if cls.llm_cache is None or policy is None:
+            return client
+        return CachedChatModel(client, cls.llm_cache, provider, model, cache_node, **policy)
+
+    @classmethod
+    def get_groq_llm(cls, cache_node: Optional[str] = None, priority: int = Priority.NORMAL) -> Runnable:
         from langchain_groq import ChatGroq
         if not cls.GROQ_API_KEY:
             raise ValueError("GROQ_API_KEY not found")
         
         # Wrap the string in SecretStr() to satisfy the type checker
-        return ChatGroq(
-            model="llama-3.3-70b-versatile", 
-            api_key=SecretStr(cls.GROQ_API_KEY) 
+        client = cls.client_pool.get(
+            "groq", cls.GROQ_MODEL,
+            lambda: ChatGroq(
+                model=cls.GROQ_MODEL,
+                api_key=SecretStr(cls.GROQ_API_KEY)
+            )
         )
+        client = cls._limited(client, "groq", cls.GROQ_MODEL, priority)
+        return cls._cached(client, "groq", cls.GROQ_MODEL, cache_node)
     
     @classmethod
-    def get_gemini_llm(cls) -> ChatGoogleGenerativeAI:
+    def get_gemini_llm(cls, cache_node: Optional[str] = None, priority: int = Priority.NORMAL) -> Runnable:
         if not cls.GOOGLE_API_KEY:
             raise ValueError("GOOGLE_API_KEY not found in environment variables")
         
-        return ChatGoogleGenerativeAI(
-            model=cls.GEMINI_MODEL,
-            temperature=cls.GEMINI_TEMPERATURE,
-            google_api_key=cls.GOOGLE_API_KEY
+        client = cls.client_pool.get(
+            "gemini", cls.GEMINI_MODEL,
+            lambda: ChatGoogleGenerativeAI(
+                model=cls.GEMINI_MODEL,
+                temperature=cls.GEMINI_TEMPERATURE,
+                google_api_key=cls.GOOGLE_API_KEY
+            ),
+            temperature=cls.GEMINI_TEMPERATURE
         )
+        client = cls._limited(client, "gemini", cls.GEMINI_MODEL, priority)
+        return cls._cached(client, "gemini", cls.GEMINI_MODEL, cache_node)
     
     @classmethod
-    def get_ollama_llm(cls, models=OLLAMA_MODEL) -> ChatOllama:
-        return ChatOllama(
-            model=models,
+    def get_ollama_llm(
+        cls,
+        models=OLLAMA_MODEL,
+        cache_node: Optional[str] = None,
+        priority: int = Priority.NORMAL,
+        temperature: float = 0.1
+    ) -> Runnable:
+        client = cls.client_pool.get(
+            "ollama", models,
+            lambda: ChatOllama(
+                model=models,
+                base_url=cls.OLLAMA_BASE_URL,
+                temperature=temperature
+            ),
             base_url=cls.OLLAMA_BASE_URL,
-            temperature=0.1
-        )
\ No newline at end of file
+            temperature=temperature
+        )
+        client = cls._limited(client, "ollama", models, priority)
+        return cls._cached(client, "ollama", models, cache_node)
+
+    @classmethod
+    def get_routed_llm(cls, route: str) -> Runnable:
+        """Chat client for a swappable node: a ProviderRouter over every configured provider of the route."""
+        policy = cls.ROUTES[route]
+        getters = {
+            "groq": (cls.get_groq_llm, cls.GROQ_MODEL),
+            "gemini": (cls.get_gemini_llm, cls.GEMINI_MODEL),
+            "ollama": (cls.get_ollama_llm, cls.OLLAMA_MODEL),
+        }
+        providers = []
+        for name in policy["providers"]:
+            getter, model = getters[name]
+            try:
+                client = getter(cache_node=policy.get("cache_node"), priority=policy.get("priority", Priority.NORMAL))
+                providers.append((f"{name}:{model}", client))
+            except ValueError:
+                # Missing API key
+                continue
+        if not providers:
+            raise ValueError(f"No provider configured for route '{route}'")
+        if not LLM_ROUTING_ENABLED:
+            return providers[0][1]
+        return ProviderRouter(providers, hedge=policy.get("hedge", False) and LLM_HEDGING_ENABLED)
\ No newline at end of file
@@ -1,26 +1,100 @@
+import asyncio
 from config import Config
+from rate_limiter import Priority
 from chat_state import AgentState
 from chat_tools import web_search_tool, youtube_search_tool
-from log import prepare_context, universal_debug_log
+from log import prepare_context, aprepare_context, universal_debug_log
 from langchain_core.messages import HumanMessage
-from RAG.rag import get_context_chunks
+from RAG.rag import get_context_chunks, aget_context_chunks, knowledge_base_version
+from RAG.context import NODE_CONTEXT_BUDGETS
+from semantic_cache import semantic_cache
+from prompt_budget import fit_prompt
+from roadmap_context import roadmap_context
 
 def explainer_node(state: AgentState):
     node_name = "EXPLAINER_AGENT"
-    instruction = state["current_instruction"]
-    print("########### EXPLAINER AGENT INSTRUCTION #############\n", instruction)
-    doc_context = get_context_chunks(instruction)
-    print("########### EXPLAINER AGENT DOC CONTEXT #############\n", doc_context)
+    instruction, doc_context = _start(state)
+    if doc_context is None:
+        doc_context = get_context_chunks(instruction, session_id=state.get("session_id"), budget=NODE_CONTEXT_BUDGETS["explainer"])
+
+    knowledge_base, cached = _cached(state, instruction, doc_context)
+    if cached is not None:
+        return explainer_output(instruction, cached)
+
     context = prepare_context(state)
-    milestone_context = state.get("selected_milestone_context", "")
     
     # Logic from your provided Explainer: Search + Explain
     # We use Groq/Gemini as per your architecture in Config
-    llm = Config.get_gemini_llm()
+    llm = Config.get_gemini_llm(cache_node="explainer", priority=Priority.INTERACTIVE)
     
     # Perform internal research if needed
     research = web_search_tool.invoke(instruction)
     
+    prompt = build_prompt(state, instruction, doc_context, research, context)
+    # Tagged so the chat UI renders these tokens as they arrive
+    content = ""
+    for chunk in llm.stream(prompt, config={"tags": [Config.UI_STREAM_TAG]}):
+        content += chunk.content
+    # universal_debug_log(node_name, "OUTPUT", content)
+    return _finish(state, instruction, doc_context, knowledge_base, content)
+
+
+async def aexplainer_node(state: AgentState):
+    """Async explainer_node: web search and history compression run concurrently."""
+    instruction, doc_context = _start(state)
+    if doc_context is None:
+        doc_context = await aget_context_chunks(instruction, session_id=state.get("session_id"), budget=NODE_CONTEXT_BUDGETS["explainer"])
+
+    knowledge_base, cached = await asyncio.to_thread(_cached, state, instruction, doc_context)
+    if cached is not None:
+        return explainer_output(instruction, cached)
+
+    research, context = await asyncio.gather(
+        web_search_tool.ainvoke(instruction),
+        aprepare_context(state)
+    )
+
+    llm = Config.get_gemini_llm(cache_node="explainer", priority=Priority.INTERACTIVE)
+    prompt = build_prompt(state, instruction, doc_context, research, context)
+    content = ""
+    async for chunk in llm.astream(prompt, config={"tags": [Config.UI_STREAM_TAG]}):
+        content += chunk.content
+    return await asyncio.to_thread(_finish, state, instruction, doc_context, knowledge_base, content)
+
+
+def _start(state: AgentState):
+    """(instruction, prefetched document context or None)."""
+    instruction = state["current_instruction"]
+    print("########### EXPLAINER AGENT INSTRUCTION #############\n", instruction)
+    return instruction, (state.get("prefetched_context") or {}).get("explainer", {}).get(instruction)
+
+
+def _cached(state: AgentState, instruction: str, doc_context: str):
+    """(knowledge base version, cached explanation or None)."""
+    print("########### EXPLAINER AGENT DOC CONTEXT #############\n", doc_context)
+
+    # A close paraphrase over the same pages, roadmap and history skips web search and the LLM call
+    knowledge_base = knowledge_base_version(state.get("session_id"))
+    cached = semantic_cache.lookup("explainer", instruction, doc_context, knowledge_base, state) if semantic_cache else None
+    return knowledge_base, cached
+
+
+def _finish(state: AgentState, instruction: str, doc_context: str, knowledge_base: tuple, content: str) -> dict:
+    if semantic_cache:
+        semantic_cache.store("explainer", instruction, doc_context, knowledge_base, state, content)
+    return explainer_output(instruction, content)
+
+
+def build_prompt(state: AgentState, instruction: str, doc_context: str, research: str, context: str) -> str:
+    sections = fit_prompt("explainer", {
+        "instruction": instruction,
+        "document": doc_context,
+        "research": research,
+        "history": context,
+        "roadmap": roadmap_context(state),
+        "milestone": state.get("selected_milestone_context", ""),
+    })
+    doc_context, research = sections["document"], sections["research"]
     prompt = f"""
     You are an expert technical explainer and research assistant.
 
@@ -34,13 +108,13 @@ def explainer_node(state: AgentState):
     {research if research else "No web search was required."}
 
     PRIOR CONVERSATION:
-    {context}
+    {sections["history"]}
 
     ROADMAP CONTEXT:
-    {state.get("plan_data")}
+    {sections["roadmap"]}
 
     SELECTED MILESTONE CONTEXT:
-    {milestone_context}
+    {sections["milestone"]}
 
     --- INSTRUCTIONS ---
     1. Prefer explaining using the DOCUMENT CONTEXT when available.
@@ -54,10 +128,11 @@ def explainer_node(state: AgentState):
     6. Do NOT hallucinate references.
     7. Explain clearly, step-by-step, and concisely.
     """   
-    response = llm.invoke(prompt)
-    # universal_debug_log(node_name, "OUTPUT", response.content)
-    
+    return prompt
+
+
+def explainer_output(instruction: str, content: str) -> dict:
     return {
-        "messages": [HumanMessage(content=response.content, name="Explainer")],
-        "research_memory": [f"Explanation of {instruction}: {response.content}"]
+        "messages": [HumanMessage(content=content, name="Explainer")],
+        "research_memory": [f"Explanation of {instruction}: {content}"]
     }
\ No newline at end of file
@@ -1,7 +1,19 @@
 from langgraph.graph import StateGraph, END
+from langchain_core.runnables import RunnableLambda
 from state import PlanState
-from tools import search_node_func
-from agents import generator_node, discriminator_node, editor_node, validator_node
+from tools import search_node_func, asearch_node_func
+from agents import (
+    generator_node, discriminator_node, editor_node, validator_node,
+    agenerator_node, adiscriminator_node, aeditor_node, avalidator_node
+)
+
+# Each node has a blocking and an async implementation: invoke/stream use
+# the first, ainvoke/astream the second.
+search = RunnableLambda(search_node_func, afunc=asearch_node_func)
+generator = RunnableLambda(generator_node, afunc=agenerator_node)
+validator = RunnableLambda(validator_node, afunc=avalidator_node)
+discriminator = RunnableLambda(discriminator_node, afunc=adiscriminator_node)
+editor = RunnableLambda(editor_node, afunc=aeditor_node)
 
 def should_continue(state):
     if state.get("error"):
@@ -15,10 +27,10 @@ def should_continue(state):
 workflow = StateGraph(PlanState)
 
 # Planner Nodes
-workflow.add_node("search", search_node_func)
-workflow.add_node("generator", generator_node)
-workflow.add_node("validator", validator_node) # <--- New Node
-workflow.add_node("discriminator", discriminator_node)
+workflow.add_node("search", search)
+workflow.add_node("generator", generator)
+workflow.add_node("validator", validator) # <--- New Node
+workflow.add_node("discriminator", discriminator)
 
 # Edges
 workflow.set_entry_point("search")
@@ -40,8 +52,8 @@ app_graph = workflow.compile()
 # --- EDITOR GRAPH ---
 # Create a small subgraph for the editor to ensure validation runs there too
 edit_workflow = StateGraph(PlanState)
-edit_workflow.add_node("editor", editor_node)
-edit_workflow.add_node("validator", validator_node)
+edit_workflow.add_node("editor", editor)
+edit_workflow.add_node("validator", validator)
 
 edit_workflow.set_entry_point("editor")
 edit_workflow.add_edge("editor", "validator")
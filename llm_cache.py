@@ -0,0 +1,285 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+from langchain_core.messages import (
+    AIMessageChunk,
+    BaseMessage,
+    HumanMessage,
+    convert_to_messages,
+    message_chunk_to_message,
+    message_to_dict,
+    messages_from_dict,
+)
+from langchain_core.prompt_values import PromptValue
+from langchain_core.runnables import Runnable, RunnableConfig
+
+# -------------------
+# Exact-match LLM response cache (memory LRU + SQLite)
+# -------------------
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512"))
+DEFAULT_TTL_SECONDS = 24 * 3600
+
+
+def to_messages(prompt) -> List[BaseMessage]:
+    """Same input normalisation as BaseChatModel.invoke (str, PromptValue, message list)."""
+    if isinstance(prompt, str):
+        return [HumanMessage(content=prompt)]
+    if isinstance(prompt, PromptValue):
+        return prompt.to_messages()
+    return convert_to_messages(prompt)
+
+
+def make_key(provider: str, model: str, temperature, prompt, **kwargs) -> str:
+    messages = [message_to_dict(m) for m in to_messages(prompt)]
+    payload = json.dumps(
+        {
+            "provider": provider,
+            "model": model,
+            "temperature": temperature,
+            "messages": messages,
+            "kwargs": kwargs,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Two-tier store of serialized chat responses.
+
+    The LRU dict answers repeated prompts within the process; the SQLite
+    file keeps them across restarts. Every entry carries its own expiry.
+    path=None keeps the cache in memory only.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = LLM_CACHE_PATH,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._db = None
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _connection(self):
+        if self._db is None and self.path:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, node TEXT, value TEXT, created REAL, expires REAL)"
+            )
+            self._db.commit()
+        return self._db
+
+    def _count(self, node: str, field: str):
+        counts = self._stats.setdefault(node, {"memory_hits": 0, "disk_hits": 0, "misses": 0, "skipped": 0})
+        counts[field] += 1
+
+    def _remember(self, key: str, expires: float, value: dict):
+        self._memory[key] = (expires, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str, node: str = "default") -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > now:
+                    self._memory.move_to_end(key)
+                    self._count(node, "memory_hits")
+                    return value
+                del self._memory[key]
+
+            db = self._connection()
+            if db is not None:
+                row = db.execute("SELECT value, expires FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    value, expires = json.loads(row[0]), row[1]
+                    if expires > now:
+                        self._remember(key, expires, value)
+                        self._count(node, "disk_hits")
+                        return value
+                    db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    db.commit()
+
+            self._count(node, "misses")
+            return None
+
+    def put(self, key: str, value: dict, ttl: float = DEFAULT_TTL_SECONDS, node: str = "default"):
+        now = time.time()
+        with self._lock:
+            self._remember(key, now + ttl, value)
+            db = self._connection()
+            if db is not None:
+                db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, node, value, created, expires) VALUES (?, ?, ?, ?, ?)",
+                    (key, node, json.dumps(value), now, now + ttl)
+                )
+                db.commit()
+
+    def skip(self, node: str):
+        with self._lock:
+            self._count(node, "skipped")
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            for key in [k for k, (expires, _) in self._memory.items() if expires <= now]:
+                del self._memory[key]
+            db = self._connection()
+            if db is None:
+                return 0
+            removed = db.execute("DELETE FROM llm_cache WHERE expires <= ?", (now,)).rowcount
+            db.commit()
+            return removed
+
+    def clear(self, node: Optional[str] = None):
+        with self._lock:
+            self._memory.clear()
+            db = self._connection()
+            if db is not None:
+                if node is None:
+                    db.execute("DELETE FROM llm_cache")
+                else:
+                    db.execute("DELETE FROM llm_cache WHERE node = ?", (node,))
+                db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            per_node = {}
+            for node, counts in self._stats.items():
+                hits = counts["memory_hits"] + counts["disk_hits"]
+                lookups = hits + counts["misses"]
+                per_node[node] = {**counts, "hit_rate": round(hits / lookups, 3) if lookups else 0.0}
+            db = self._connection()
+            return {
+                "memory_entries": len(self._memory),
+                "disk_entries": db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] if db is not None else 0,
+                "per_node": per_node,
+            }
+
+
+class CachedChatModel(Runnable):
+    """
+    Wraps a (pooled) chat client for one graph node.
+
+    invoke() is answered from the cache when the same provider, model,
+    temperature and messages were seen before; only temperature-0 clients
+    are cached unless the node sets any_temperature. Other client methods
+    (with_structured_output, bind_tools, ...) are passed through uncached.
+    """
+
+    def __init__(
+        self,
+        llm,
+        cache: LLMCache,
+        provider: str,
+        model: str,
+        node: str,
+        ttl: float = DEFAULT_TTL_SECONDS,
+        any_temperature: bool = False
+    ):
+        self.llm = llm
+        self.cache = cache
+        self.provider = provider
+        self.model = model
+        self.node = node
+        self.ttl = ttl
+        self.any_temperature = any_temperature
+
+    @property
+    def cacheable(self) -> bool:
+        return self.any_temperature or getattr(self.llm, "temperature", None) == 0
+
+    def invoke(self, input, config: Optional[RunnableConfig] = None, **kwargs):
+        if not self.cacheable:
+            self.cache.skip(self.node)
+            return self.llm.invoke(input, config, **kwargs)
+
+        key = make_key(self.provider, self.model, getattr(self.llm, "temperature", None), input, **kwargs)
+        cached = self.cache.get(key, self.node)
+        if cached is not None:
+            return messages_from_dict([cached])[0]
+
+        response = self.llm.invoke(input, config, **kwargs)
+        self.cache.put(key, message_to_dict(response), self.ttl, self.node)
+        return response
+
+    def stream(self, input, config: Optional[RunnableConfig] = None, **kwargs):
+        """Streams from the client on a miss; a hit arrives as one chunk."""
+        if not self.cacheable:
+            self.cache.skip(self.node)
+            yield from self.llm.stream(input, config, **kwargs)
+            return
+
+        key = make_key(self.provider, self.model, getattr(self.llm, "temperature", None), input, **kwargs)
+        cached = self.cache.get(key, self.node)
+        if cached is not None:
+            message = messages_from_dict([cached])[0]
+            yield AIMessageChunk(content=message.content, response_metadata=message.response_metadata)
+            return
+
+        response = None
+        for chunk in self.llm.stream(input, config, **kwargs):
+            response = chunk if response is None else response + chunk
+            yield chunk
+        if response is not None:
+            self.cache.put(key, message_to_dict(message_chunk_to_message(response)), self.ttl, self.node)
+
+    async def ainvoke(self, input, config: Optional[RunnableConfig] = None, **kwargs):
+        if not self.cacheable:
+            self.cache.skip(self.node)
+            return await self.llm.ainvoke(input, config, **kwargs)
+
+        key = make_key(self.provider, self.model, getattr(self.llm, "temperature", None), input, **kwargs)
+        cached = self.cache.get(key, self.node)
+        if cached is not None:
+            return messages_from_dict([cached])[0]
+
+        response = await self.llm.ainvoke(input, config, **kwargs)
+        self.cache.put(key, message_to_dict(response), self.ttl, self.node)
+        return response
+
+    async def astream(self, input, config: Optional[RunnableConfig] = None, **kwargs):
+        if not self.cacheable:
+            self.cache.skip(self.node)
+            async for chunk in self.llm.astream(input, config, **kwargs):
+                yield chunk
+            return
+
+        key = make_key(self.provider, self.model, getattr(self.llm, "temperature", None), input, **kwargs)
+        cached = self.cache.get(key, self.node)
+        if cached is not None:
+            message = messages_from_dict([cached])[0]
+            yield AIMessageChunk(content=message.content, response_metadata=message.response_metadata)
+            return
+
+        response = None
+        async for chunk in self.llm.astream(input, config, **kwargs):
+            response = chunk if response is None else response + chunk
+            yield chunk
+        if response is not None:
+            self.cache.put(key, message_to_dict(message_chunk_to_message(response)), self.ttl, self.node)
+
+    def __getattr__(self, name):
+        if name == "llm":
+            raise AttributeError(name)
+        return getattr(self.llm, name)
@@ -0,0 +1,229 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from langchain_core.runnables import Runnable, RunnableConfig
+
+# -------------------
+# Latency-aware provider routing with hedged requests
+# -------------------
+LLM_ROUTING_ENABLED = os.getenv("LLM_ROUTING_ENABLED", "true").lower() == "true"
+# Routes configured with hedge=True only hedge while this is on
+LLM_HEDGING_ENABLED = os.getenv("LLM_HEDGING_ENABLED", "true").lower() == "true"
+LATENCY_WINDOW = 50
+# Samples needed before a provider's p90 is trusted as the hedge delay
+MIN_SAMPLES = 5
+DEFAULT_HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "2.0"))
+# Consecutive failures that take a provider out of rotation, and for how long
+MAX_FAILURES = 3
+COOLDOWN_SECONDS = int(os.getenv("LLM_ROUTER_COOLDOWN_SECONDS", "30"))
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyTracker:
+    """Rolling call latencies and health per provider label (e.g. "groq:llama-3.3-70b-versatile")."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, deque] = {}
+        self._failures: Dict[str, int] = {}
+        self._down_until: Dict[str, float] = {}
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    def _counter(self, label: str) -> Dict[str, int]:
+        return self._counts.setdefault(label, {"calls": 0, "errors": 0, "hedges": 0, "hedge_wins": 0})
+
+    def record(self, label: str, seconds: float):
+        with self._lock:
+            self._latencies.setdefault(label, deque(maxlen=self.window)).append(seconds)
+            self._failures[label] = 0
+            self._down_until.pop(label, None)
+            self._counter(label)["calls"] += 1
+
+    def record_latency(self, label: str, seconds: float):
+        """A latency sample only, for calls that neither succeeded nor failed (cancelled hedge losers)."""
+        with self._lock:
+            self._latencies.setdefault(label, deque(maxlen=self.window)).append(seconds)
+
+    def record_failure(self, label: str):
+        with self._lock:
+            self._failures[label] = self._failures.get(label, 0) + 1
+            self._counter(label)["errors"] += 1
+            if self._failures[label] >= MAX_FAILURES:
+                self._down_until[label] = time.monotonic() + COOLDOWN_SECONDS
+
+    def record_hedge(self, label: str, won: bool):
+        with self._lock:
+            counter = self._counter(label)
+            counter["hedges"] += 1
+            counter["hedge_wins"] += int(won)
+
+    def healthy(self, label: str) -> bool:
+        with self._lock:
+            return self._down_until.get(label, 0.0) <= time.monotonic()
+
+    def _percentile(self, label: str, q: float) -> Optional[float]:
+        samples = self._latencies.get(label)
+        return float(np.percentile(samples, q)) if samples else None
+
+    def percentile(self, label: str, q: float) -> Optional[float]:
+        with self._lock:
+            return self._percentile(label, q)
+
+    def samples(self, label: str) -> int:
+        with self._lock:
+            return len(self._latencies.get(label, ()))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            labels = set(self._counts) | set(self._latencies)
+            return {
+                label: {
+                    **self._counter(label),
+                    "p50_s": self._percentile(label, 50),
+                    "p90_s": self._percentile(label, 90),
+                    "healthy": self._down_until.get(label, 0.0) <= now,
+                }
+                for label in sorted(labels)
+            }
+
+
+# Shared by every router so all routes learn from each call
+latency_tracker = LatencyTracker()
+
+
+class ProviderRouter(Runnable):
+    """
+    Sends each call to the fastest healthy provider of a route.
+
+    providers is a preference-ordered list of (label, chat client). Providers
+    without latency samples are tried first so each gets measured; after
+    that the rolling p50 decides. A failing provider falls through to the
+    next one. With hedge=True, ainvoke sends a duplicate to the runner-up
+    once the primary exceeds its p90; whichever answers first wins and the
+    other task is cancelled. invoke never hedges: a blocking call running in
+    a worker thread cannot be cancelled, so the loser would keep holding a
+    connection and its rate-limit slot.
+    """
+
+    def __init__(
+        self,
+        providers: List[Tuple[str, Any]],
+        hedge: bool = False,
+        tracker: LatencyTracker = latency_tracker
+    ):
+        if not providers:
+            raise ValueError("ProviderRouter needs at least one provider")
+        self.providers = providers
+        self.hedge = hedge
+        self.tracker = tracker
+
+    def ranked(self) -> List[Tuple[str, Any]]:
+        def rank(item):
+            position, (label, _) = item
+            p50 = self.tracker.percentile(label, 50)
+            return (not self.tracker.healthy(label), p50 if p50 is not None else 0.0, position)
+        return [provider for _, provider in sorted(enumerate(self.providers), key=rank)]
+
+    def hedge_delay(self, label: str) -> float:
+        if self.tracker.samples(label) < MIN_SAMPLES:
+            return DEFAULT_HEDGE_DELAY
+        return self.tracker.percentile(label, 90)
+
+    # -------------------
+    # Blocking (failover only)
+    # -------------------
+    def _call(self, provider, input, config, kwargs):
+        label, client = provider
+        start = time.perf_counter()
+        try:
+            response = client.invoke(input, config, **kwargs)
+        except Exception:
+            self.tracker.record_failure(label)
+            raise
+        self.tracker.record(label, time.perf_counter() - start)
+        return response
+
+    def invoke(self, input, config: Optional[RunnableConfig] = None, **kwargs):
+        error = None
+        for provider in self.ranked():
+            try:
+                return self._call(provider, input, config, kwargs)
+            except Exception as e:
+                logger.warning(f"{provider[0]} failed, trying the next provider: {e}")
+                error = e
+        raise error
+
+    # -------------------
+    # Async (failover + hedging)
+    # -------------------
+    async def _acall(self, provider, input, config, kwargs):
+        label, client = provider
+        start = time.perf_counter()
+        try:
+            response = await client.ainvoke(input, config, **kwargs)
+        except asyncio.CancelledError:
+            # A hedge loser: its elapsed time is a lower bound, but without
+            # it a provider that always loses would never lose its rank. It
+            # never answered, so its health is left as it was.
+            self.tracker.record_latency(label, time.perf_counter() - start)
+            raise
+        except Exception:
+            self.tracker.record_failure(label)
+            raise
+        self.tracker.record(label, time.perf_counter() - start)
+        return response
+
+    async def _ahedged(self, primary, backup, input, config, kwargs):
+        """
+        (response, error, providers tried). The backup only counts as tried
+        when the primary was still running at the hedge delay; a primary
+        that fails fast leaves it to the normal failover.
+        """
+        first = asyncio.create_task(self._acall(primary, input, config, kwargs))
+        done, _ = await asyncio.wait({first}, timeout=self.hedge_delay(primary[0]))
+        if done:
+            return (first.result(), None, 1) if first.exception() is None else (None, first.exception(), 1)
+
+        logger.info(f"Hedging {primary[0]} with {backup[0]}")
+        second = asyncio.create_task(self._acall(backup, input, config, kwargs))
+        pending = {first, second}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self.tracker.record_hedge(backup[0], won=task is second)
+                        return task.result(), None, 2
+                    error = task.exception()
+        finally:
+            # Cancels the loser (or both, if this call is cancelled itself)
+            for task in pending:
+                task.cancel()
+        self.tracker.record_hedge(backup[0], won=False)
+        return None, error, 2
+
+    async def ainvoke(self, input, config: Optional[RunnableConfig] = None, **kwargs):
+        ranked = self.ranked()
+        error = None
+        if self.hedge and len(ranked) > 1:
+            response, error, tried = await self._ahedged(ranked[0], ranked[1], input, config, kwargs)
+            if error is None:
+                return response
+            logger.warning(f"Hedged call failed, trying the next provider: {error}")
+            ranked = ranked[tried:]
+        for provider in ranked:
+            try:
+                return await self._acall(provider, input, config, kwargs)
+            except Exception as e:
+                logger.warning(f"{provider[0]} failed, trying the next provider: {e}")
+                error = e
+        raise error
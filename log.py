@@ -36,6 +36,21 @@ def prepare_context(state: AgentState) -> str:
     if word_count < TOKEN_THRESHOLD:
         return f"ORIGINAL USER REQUEST: {original_prompt}\n\nRAW HISTORY:\n{raw_history}"
 
-    llm = Config.get_ollama_llm()
+    llm = Config.get_routed_llm("summarization")
     summary_res = llm.invoke(f"Provide a high-density summary of this research: {raw_history}")
+    return f"ORIGINAL USER REQUEST: {original_prompt}\n\nCOMPRESSED RESEARCH CONTEXT: {summary_res.content}"
+
+@traceable(name="Context Preparation")
+async def aprepare_context(state: AgentState) -> str:
+    """Async prepare_context."""
+    raw_history = "\n".join(state.get("research_memory", []))
+    word_count = len(raw_history.split())
+    original_prompt = state.get("user_prompt", "")
+    TOKEN_THRESHOLD = 150 
+
+    if word_count < TOKEN_THRESHOLD:
+        return f"ORIGINAL USER REQUEST: {original_prompt}\n\nRAW HISTORY:\n{raw_history}"
+
+    llm = Config.get_routed_llm("summarization")
+    summary_res = await llm.ainvoke(f"Provide a high-density summary of this research: {raw_history}")
     return f"ORIGINAL USER REQUEST: {original_prompt}\n\nCOMPRESSED RESEARCH CONTEXT: {summary_res.content}"
\ No newline at end of file
@@ -2,12 +2,22 @@ from typing import List, Literal
 from pydantic import BaseModel, Field
 from langchain_core.prompts import ChatPromptTemplate
 from config import Config
+from rate_limiter import Priority
 from chat_state import AgentState 
 from log import universal_debug_log 
+from RAG.rag import get_context_batch, aget_context_batch
+from RAG.context import NODE_CONTEXT_BUDGETS
 
 # --- UPDATED: Added "summarizer" to valid nodes ---
 NodeName = Literal["quiz_generator", "explain_node", "summarizer", "END"]
 
+# Worker nodes that use document context -> their NODE_CONTEXT_BUDGETS key
+RAG_WORKERS = {
+    "quiz_generator": "quiz",
+    "explain_node": "explainer",
+    "summarizer": "summarizer",
+}
+
 class OrchestratorPlan(BaseModel):
     """The plan containing the sequence of nodes and their instructions."""
     actions: List[NodeName] = Field(..., description="The sequence of worker nodes to call.")
@@ -15,15 +25,93 @@ class OrchestratorPlan(BaseModel):
 
 class Orchestrator:
     def __init__(self):
-        self.llm = Config.get_ollama_llm() 
+        self.llm = Config.get_ollama_llm(priority=Priority.INTERACTIVE)
 
     def build_plan_node(self, state: AgentState) -> dict:
+        plan: OrchestratorPlan = self._plan_chain().invoke(self._plan_inputs(state))
+        self._log_plan(plan)
+        rag_steps = self._rag_steps(plan)
+        prefetched_context = {}
+        if rag_steps:
+            # Retrieve document context for every RAG worker in the plan in one batch
+            try:
+                contexts = get_context_batch(**self._batch_request(state, rag_steps))
+                prefetched_context = self._by_worker(rag_steps, contexts)
+            except Exception as e:
+                self._batch_failed(e)
+        
+        return self._plan_output(plan, prefetched_context)
+
+    async def abuild_plan_node(self, state: AgentState) -> dict:
+        """Async build_plan_node."""
+        plan: OrchestratorPlan = await self._plan_chain().ainvoke(self._plan_inputs(state))
+        self._log_plan(plan)
+        rag_steps = self._rag_steps(plan)
+        prefetched_context = {}
+        if rag_steps:
+            try:
+                contexts = await aget_context_batch(**self._batch_request(state, rag_steps))
+                prefetched_context = self._by_worker(rag_steps, contexts)
+            except Exception as e:
+                self._batch_failed(e)
+
+        return self._plan_output(plan, prefetched_context)
+
+    @staticmethod
+    def _plan_inputs(state: AgentState) -> dict:
+        return {
+            "input": state["user_prompt"],
+            "history_summary": state.get("conversation_summary", "No previous context."),
+            "milestone_context": state.get("selected_milestone_context", "No specific milestone selected.")
+        }
+
+    @staticmethod
+    def _log_plan(plan: OrchestratorPlan):
         node_name = "ORCHESTRATOR"
-        user_input = state["user_prompt"]
+        universal_debug_log(node_name, "PLAN_GENERATED", plan.dict())
         
-        history_summary = state.get("conversation_summary", "No previous context.")
-        milestone_context = state.get("selected_milestone_context", "No specific milestone selected.")
+        print(f"📋 PLAN: {list(zip(plan.actions, plan.instructions))}")
+
+    @staticmethod
+    def _rag_steps(plan: OrchestratorPlan) -> list:
+        return [
+            (RAG_WORKERS[action], instruction)
+            for action, instruction in zip(plan.actions, plan.instructions)
+            if action in RAG_WORKERS
+        ]
+
+    @staticmethod
+    def _batch_request(state: AgentState, rag_steps: list) -> dict:
+        return {
+            "queries": [instruction for _, instruction in rag_steps],
+            "session_id": state.get("session_id"),
+            "budgets": [NODE_CONTEXT_BUDGETS[worker] for worker, _ in rag_steps],
+        }
+
+    @staticmethod
+    def _batch_failed(error: Exception):
+        # Workers fall back to retrieving their own context
+        print(f"⚠️ Batch retrieval failed: {error}")
+
+    @staticmethod
+    def _by_worker(rag_steps: list, contexts: List[str]) -> dict:
+        # Keyed by worker too: explain and quiz on the same topic need
+        # context packed for different budgets
+        prefetched_context = {}
+        for (worker, instruction), context in zip(rag_steps, contexts):
+            prefetched_context.setdefault(worker, {})[instruction] = context
+        return prefetched_context
 
+    @staticmethod
+    def _plan_output(plan: OrchestratorPlan, prefetched_context: dict) -> dict:
+        return {
+            "plan_actions": plan.actions,
+            "plan_instructions": plan.instructions,
+            "prefetched_context": prefetched_context,
+            "next": "scheduler" 
+        }
+
+    def _plan_chain(self):
         system_prompt = """You are the Orchestrator for a Study Buddy AI.
         
         AVAILABLE WORKERS:
@@ -82,19 +170,4 @@ class Orchestrator:
             ("human", "{input}")
         ])
         
-        chain = prompt | structured_llm
-        plan: OrchestratorPlan = chain.invoke({
-            "input": user_input,
-            "history_summary": history_summary,
-            "milestone_context": milestone_context
-        })
-        
-        universal_debug_log(node_name, "PLAN_GENERATED", plan.dict())
-        
-        print(f"📋 PLAN: {list(zip(plan.actions, plan.instructions))}")
-        
-        return {
-            "plan_actions": plan.actions,
-            "plan_instructions": plan.instructions,
-            "next": "scheduler" 
-        }
\ No newline at end of file
+        return prompt | structured_llm
\ No newline at end of file
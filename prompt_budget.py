@@ -0,0 +1,90 @@
+import logging
+import threading
+from typing import Any, Dict
+from RAG.tokens import count_tokens, truncate_tokens
+
+# -------------------
+# Per-node prompt token budgets
+# -------------------
+# total caps the variable sections of a node's prompt (the instructions
+# template is not counted). When over, sections are cut in trim_order,
+# first listed first, down to their floor; if that is still not enough a
+# second pass cuts them further. Sections not in trim_order are never cut.
+PROMPT_BUDGETS: Dict[str, Dict[str, Any]] = {
+    "quiz": {
+        "total": 6000,
+        "trim_order": ("roadmap", "research", "milestone", "document"),
+        "floors": {"document": 800, "milestone": 200},
+    },
+    "explainer": {
+        "total": 7000,
+        "trim_order": ("roadmap", "history", "research", "milestone", "document"),
+        "floors": {"document": 800, "history": 200, "milestone": 200},
+    },
+}
+
+TRIM_MARKER = "\n[... trimmed to fit the prompt budget ...]"
+
+logger = logging.getLogger(__name__)
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, Dict[str, Any]] = {}
+
+
+def fit_prompt(node: str, sections: Dict[str, str]) -> Dict[str, str]:
+    """
+    Returns sections trimmed to the node's budget and logs the tokens each
+    one used. Missing sections come back as empty strings.
+    """
+    policy = PROMPT_BUDGETS[node]
+    sections = {name: text or "" for name, text in sections.items()}
+    used = {name: count_tokens(text) if text else 0 for name, text in sections.items()}
+    requested = dict(used)
+    excess = sum(used.values()) - policy["total"]
+
+    for use_floors in (True, False):
+        for name in policy["trim_order"]:
+            if excess <= 0:
+                break
+            floor = policy["floors"].get(name, 0) if use_floors else 0
+            cut = min(excess, used.get(name, 0) - floor)
+            if cut <= 0:
+                continue
+            keep = used[name] - cut
+            sections[name] = truncate_tokens(sections[name], keep) + TRIM_MARKER if keep else ""
+            used[name] = keep
+            excess -= cut
+
+    trimmed = {name: requested[name] - used[name] for name in used if used[name] < requested[name]}
+    logger.info(
+        f"[{node}] prompt tokens {sum(used.values())}/{policy['total']} | "
+        + ", ".join(f"{name}={used[name]}" for name in used)
+        + (f" | trimmed {trimmed}" if trimmed else "")
+    )
+    _record(node, requested, trimmed)
+    return sections
+
+
+def _record(node: str, requested: Dict[str, int], trimmed: Dict[str, int]):
+    with _stats_lock:
+        stats = _stats.setdefault(node, {"prompts": 0, "trimmed_prompts": 0, "requested": {}, "trimmed": {}})
+        stats["prompts"] += 1
+        stats["trimmed_prompts"] += int(bool(trimmed))
+        for name, tokens in requested.items():
+            stats["requested"][name] = stats["requested"].get(name, 0) + tokens
+        for name, tokens in trimmed.items():
+            stats["trimmed"][name] = stats["trimmed"].get(name, 0) + tokens
+
+
+def budget_stats() -> Dict[str, Any]:
+    """Average requested and trimmed tokens per section, per node, for tuning PROMPT_BUDGETS."""
+    with _stats_lock:
+        return {
+            node: {
+                "prompts": stats["prompts"],
+                "trimmed_prompts": stats["trimmed_prompts"],
+                "avg_requested": {name: round(tokens / stats["prompts"]) for name, tokens in stats["requested"].items()},
+                "avg_trimmed": {name: round(tokens / stats["prompts"]) for name, tokens in stats["trimmed"].items()},
+            }
+            for node, stats in _stats.items()
+        }
@@ -1,9 +1,13 @@
+import asyncio
 from config import Config
 from chat_state import AgentState, Quiz
 from chat_tools import web_search_tool
 from log import prepare_context, universal_debug_log
 from langchain_core.messages import HumanMessage
-from RAG.rag import get_context_chunks
+from RAG.rag import get_context_chunks, aget_context_chunks
+from RAG.context import NODE_CONTEXT_BUDGETS
+from prompt_budget import fit_prompt
+from roadmap_context import roadmap_context
 import json
 from pathlib import Path
 
@@ -14,7 +18,9 @@ def quiz_node(state: AgentState):
     context = prepare_context(state)
     milestone_context = state.get("selected_milestone_context", "")
 
-    document_context = get_context_chunks(instruction)
+    document_context = (state.get("prefetched_context") or {}).get("quiz", {}).get(instruction)
+    if document_context is None:
+        document_context = get_context_chunks(instruction, session_id=state.get("session_id"), budget=NODE_CONTEXT_BUDGETS["quiz"])
 
     if document_context:
         research = ""
@@ -33,6 +39,48 @@ def quiz_node(state: AgentState):
     
     # print("########### DOCUMENT CONTEXT #############\n", document_context)
 
+    prompt = build_prompt(state, instruction, document_context, research, milestone_context)
+    
+    quiz_output = llm.invoke(prompt)
+    # universal_debug_log(node_name, "QUIZ_GENERATED", quiz_output.dict())
+    save_quiz(quiz_output)
+
+    return quiz_result(instruction, quiz_output)
+
+
+async def aquiz_node(state: AgentState):
+    """
+    Async quiz_node. The prompt does not use the compressed history, so
+    unlike the blocking version it skips prepare_context.
+    """
+    instruction = state["current_instruction"]
+    milestone_context = state.get("selected_milestone_context", "")
+
+    document_context = (state.get("prefetched_context") or {}).get("quiz", {}).get(instruction)
+    if document_context is None:
+        document_context = await aget_context_chunks(instruction, session_id=state.get("session_id"), budget=NODE_CONTEXT_BUDGETS["quiz"])
+
+    research = ""
+    if not document_context:
+        research = await web_search_tool.ainvoke(f"quiz questions and answers about {instruction}")
+
+    llm = Config.get_groq_llm().with_structured_output(Quiz)
+    prompt = build_prompt(state, instruction, document_context, research, milestone_context)
+    quiz_output = await llm.ainvoke(prompt)
+    await asyncio.to_thread(save_quiz, quiz_output)
+
+    return quiz_result(instruction, quiz_output)
+
+
+def build_prompt(state: AgentState, instruction: str, document_context: str, research: str, milestone_context: str) -> str:
+    sections = fit_prompt("quiz", {
+        "instruction": instruction,
+        "document": document_context,
+        "research": research,
+        "roadmap": roadmap_context(state),
+        "milestone": milestone_context,
+    })
+    document_context, research = sections["document"], sections["research"]
     prompt = f"""
     You are an expert educator and assessment designer.
 
@@ -49,10 +97,10 @@ def quiz_node(state: AgentState):
     {research if research else "Web search not required."}
 
     ROADMAP CONTEXT:
-    {state.get("plan_data")}
+    {sections["roadmap"]}
 
     SELECTED MILESTONE CONTEXT:
-    {milestone_context}
+    {sections["milestone"]}
 
     --- RULES ---
     1. Base the quiz primarily on the DOCUMENT CONTEXT when available.
@@ -65,9 +113,10 @@ def quiz_node(state: AgentState):
     - The correct answer must be one of the provided options
     - Article questions
     """    
-    
-    quiz_output = llm.invoke(prompt)
-    # universal_debug_log(node_name, "QUIZ_GENERATED", quiz_output.dict())
+    return prompt
+
+
+def save_quiz(quiz_output):
     SUBMISSION_DIR = Path(
     "/teamspace/studios/this_studio/NTI-Graduation-Project/quiz_submissions"
     )
@@ -86,6 +135,7 @@ def quiz_node(state: AgentState):
         )
 
 
+def quiz_result(instruction: str, quiz_output) -> dict:
     return {
         "quiz_output": quiz_output,
         "messages": [HumanMessage(content=f"Generated quiz for {quiz_output.topic}", name="QuizAgent")],
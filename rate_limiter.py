@@ -0,0 +1,499 @@
+import os
+import time
+import heapq
+import asyncio
+import itertools
+import logging
+import threading
+from collections import deque
+from enum import IntEnum
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.runnables import Runnable, RunnableConfig
+from llm_cache import to_messages
+
+# -------------------
+# Per-provider rate limiting (token buckets + AIMD concurrency)
+# -------------------
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+# Times a call is re-queued after a 429 before the error reaches the caller
+RATE_LIMIT_RETRIES = int(os.getenv("RATE_LIMIT_RETRIES", "2"))
+# Pause after a 429 that came without a Retry-After header
+DEFAULT_BACKOFF_SECONDS = 2.0
+# Completion tokens assumed when debiting the token bucket up front
+OUTPUT_TOKEN_ESTIMATE = 512
+# AIMD: halve on 429, shrink gently when a call takes LATENCY_TOLERANCE x
+# the rolling median, otherwise grow by about one slot per window of calls
+DECREASE_FACTOR = 0.5
+LATENCY_DECREASE_FACTOR = 0.9
+LATENCY_TOLERANCE = 2.0
+LATENCY_WINDOW = 50
+MIN_SAMPLES = 5
+# Longest a queued call sleeps before re-checking (it is normally woken earlier)
+MAX_POLL_SECONDS = 1.0
+
+# Free-tier defaults; RATE_LIMIT_<PROVIDER>_RPM / _TPM / _CONCURRENCY override them.
+# A single Ollama server serves every model, so it gets one limiter per instance.
+PROVIDER_LIMITS: Dict[str, Dict[str, Any]] = {
+    "groq": {"rpm": 30, "tpm": 12_000, "concurrency": 4, "max_concurrency": 8, "per_model": True},
+    "gemini": {"rpm": 10, "tpm": 250_000, "concurrency": 2, "max_concurrency": 4, "per_model": True},
+    "ollama": {"rpm": None, "tpm": None, "concurrency": 1, "max_concurrency": 4, "per_model": False},
+}
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Queue order when a provider is saturated; lower goes first."""
+    INTERACTIVE = 0  # a user is waiting on the chat answer
+    NORMAL = 1
+    BACKGROUND = 2  # ingestion
+
+
+class TokenBucket:
+    """Refills per_minute units evenly over a minute, holding at most one minute's worth."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self.level -= min(amount, self.capacity)
+
+
+class _Ticket:
+    """A queued call; notify() wakes its waiter from any thread."""
+
+    def __init__(self, priority: int, tokens: int, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.priority = priority
+        self.tokens = tokens
+        self.cancelled = False
+        self.loop = loop
+        self.event = asyncio.Event() if loop else threading.Event()
+
+    def notify(self):
+        if self.loop is None:
+            self.event.set()
+            return
+        try:
+            self.loop.call_soon_threadsafe(self.event.set)
+        except RuntimeError:
+            # Loop already closed
+            pass
+
+
+class AdaptiveLimiter:
+    """
+    Admits calls to one provider (or model) in priority order.
+
+    A call starts when it heads the queue, fewer than `limit` calls are in
+    flight and both the request and token buckets can cover it. `limit` is
+    adapted AIMD-style from 429s and latency between 1 and max_concurrency.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rpm: Optional[int] = None,
+        tpm: Optional[int] = None,
+        concurrency: int = 4,
+        max_concurrency: int = 8
+    ):
+        self.name = name
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.limit = float(concurrency)
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._queue = []
+        self._seq = itertools.count()
+        self._paused_until = 0.0
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._stats = {"granted": 0, "throttled": 0, "waited_s": 0.0}
+
+    # -------------------
+    # Admission
+    # -------------------
+    def _enqueue(self, ticket: _Ticket):
+        with self._lock:
+            heapq.heappush(self._queue, (ticket.priority, next(self._seq), ticket))
+
+    def _try_grant(self, ticket: _Ticket) -> Optional[float]:
+        """None once the ticket is admitted, else seconds to sleep before re-checking."""
+        now = time.monotonic()
+        with self._lock:
+            while self._queue and self._queue[0][2].cancelled:
+                heapq.heappop(self._queue)
+            if self._queue[0][2] is not ticket:
+                return MAX_POLL_SECONDS
+            if now < self._paused_until:
+                return self._paused_until - now
+            if self.in_flight >= max(1, int(self.limit)):
+                return MAX_POLL_SECONDS
+
+            wait = 0.0
+            if self.requests:
+                self.requests.refill(now)
+                wait = max(wait, self.requests.wait_time(1))
+            if self.tokens:
+                self.tokens.refill(now)
+                wait = max(wait, self.tokens.wait_time(ticket.tokens))
+            if wait > 0:
+                return wait
+
+            heapq.heappop(self._queue)
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(ticket.tokens)
+            self.in_flight += 1
+            self._stats["granted"] += 1
+            self._notify_head()
+            return None
+
+    def _notify_head(self):
+        if self._queue:
+            self._queue[0][2].notify()
+
+    def acquire(self, tokens: int, priority: int = Priority.NORMAL):
+        ticket = _Ticket(priority, tokens)
+        self._enqueue(ticket)
+        start = time.perf_counter()
+        while (wait := self._try_grant(ticket)) is not None:
+            ticket.event.wait(wait)
+            ticket.event.clear()
+        self._stats["waited_s"] += time.perf_counter() - start
+
+    async def aacquire(self, tokens: int, priority: int = Priority.NORMAL):
+        ticket = _Ticket(priority, tokens, asyncio.get_running_loop())
+        self._enqueue(ticket)
+        start = time.perf_counter()
+        try:
+            while (wait := self._try_grant(ticket)) is not None:
+                try:
+                    await asyncio.wait_for(ticket.event.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                ticket.event.clear()
+        except asyncio.CancelledError:
+            with self._lock:
+                ticket.cancelled = True
+                self._notify_head()
+            raise
+        self._stats["waited_s"] += time.perf_counter() - start
+
+    # -------------------
+    # Feedback
+    # -------------------
+    def release(
+        self,
+        tokens: int,
+        latency: Optional[float] = None,
+        used: Optional[int] = None,
+        throttled: bool = False,
+        retry_after: Optional[float] = None
+    ):
+        """
+        latency is None for calls that failed for other reasons, so they do
+        not steer the concurrency limit. used replaces the token estimate
+        once the provider reports real usage.
+        """
+        with self._lock:
+            self.in_flight -= 1
+            if self.tokens and used is not None:
+                self.tokens.level -= used - min(tokens, self.tokens.capacity)
+            if throttled:
+                self._stats["throttled"] += 1
+                self.limit = max(1.0, self.limit * DECREASE_FACTOR)
+                self._paused_until = time.monotonic() + (retry_after or DEFAULT_BACKOFF_SECONDS)
+                if self.requests:
+                    self.requests.level = 0.0
+                logger.warning(f"{self.name} rate limited, concurrency limit now {self.limit:.2f}")
+            elif latency is not None:
+                self._adapt(latency)
+            self._notify_head()
+
+    def _adapt(self, latency: float):
+        slow = (
+            len(self._latencies) >= MIN_SAMPLES
+            and latency > LATENCY_TOLERANCE * float(np.median(self._latencies))
+        )
+        self._latencies.append(latency)
+        if slow:
+            self.limit = max(1.0, self.limit * LATENCY_DECREASE_FACTOR)
+        else:
+            self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "queued": sum(not ticket.cancelled for *_, ticket in self._queue),
+            }
+
+
+def _setting(provider: str, name: str, default):
+    value = os.getenv(f"RATE_LIMIT_{provider.upper()}_{name.upper()}")
+    return default if value is None else int(value)
+
+
+class RateLimiterRegistry:
+    """One AdaptiveLimiter per provider and model, shared by every caller in the process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._limiters: Dict[Tuple[str, str], AdaptiveLimiter] = {}
+
+    def get(self, provider: str, model: str) -> AdaptiveLimiter:
+        limits = PROVIDER_LIMITS.get(provider, {"concurrency": 4, "max_concurrency": 8, "per_model": True})
+        key = (provider, model if limits.get("per_model", True) else "*")
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                limiter = AdaptiveLimiter(
+                    f"{provider}:{key[1]}",
+                    rpm=_setting(provider, "rpm", limits.get("rpm")),
+                    tpm=_setting(provider, "tpm", limits.get("tpm")),
+                    concurrency=_setting(provider, "concurrency", limits["concurrency"]),
+                    max_concurrency=limits["max_concurrency"],
+                )
+                self._limiters[key] = limiter
+            return limiter
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            limiters = list(self._limiters.values())
+        return {limiter.name: limiter.stats() for limiter in limiters}
+
+
+rate_limits = RateLimiterRegistry()
+
+
+def estimate_tokens(prompt) -> int:
+    """Rough prompt size (4 characters a token) plus the expected completion."""
+    try:
+        chars = sum(len(str(message.content)) for message in to_messages(prompt))
+    except Exception:
+        chars = len(str(prompt))
+    return chars // 4 + OUTPUT_TOKEN_ESTIMATE
+
+
+def used_tokens(response) -> Optional[int]:
+    usage = getattr(response, "usage_metadata", None)
+    return usage.get("total_tokens") if usage else None
+
+
+def rate_limit_info(error: Exception) -> Tuple[bool, Optional[float]]:
+    """(is a 429 / quota error, Retry-After seconds) across the Groq, Gemini and Ollama clients."""
+    response = getattr(error, "response", None)
+    status = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    text = str(error).lower()
+    throttled = (
+        status == 429
+        or type(error).__name__ in ("RateLimitError", "ResourceExhausted")
+        or "rate limit" in text
+        or "resource exhausted" in text
+    )
+    if not throttled:
+        return False, None
+    try:
+        retry_after = float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        retry_after = None
+    return True, retry_after
+
+
+class RateLimitedChatModel(Runnable):
+    """
+    Wraps a (pooled) chat client so every call goes through its provider's
+    AdaptiveLimiter. A 429 shrinks the limiter and the call is re-queued up
+    to RATE_LIMIT_RETRIES times (streams only before the first chunk).
+    """
+
+    def __init__(self, llm, limiter: AdaptiveLimiter, priority: int = Priority.NORMAL):
+        self.llm = llm
+        self.limiter = limiter
+        self.priority = priority
+
+    def invoke(self, input, config: Optional[RunnableConfig] = None, **kwargs):
+        tokens = estimate_tokens(input)
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            self.limiter.acquire(tokens, self.priority)
+            start = time.perf_counter()
+            try:
+                response = self.llm.invoke(input, config, **kwargs)
+            except Exception as e:
+                throttled, retry_after = rate_limit_info(e)
+                self.limiter.release(tokens, throttled=throttled, retry_after=retry_after)
+                if throttled and attempt < RATE_LIMIT_RETRIES:
+                    continue
+                raise
+            self.limiter.release(tokens, time.perf_counter() - start, used_tokens(response))
+            return response
+
+    async def ainvoke(self, input, config: Optional[RunnableConfig] = None, **kwargs):
+        tokens = estimate_tokens(input)
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            await self.limiter.aacquire(tokens, self.priority)
+            start = time.perf_counter()
+            try:
+                response = await self.llm.ainvoke(input, config, **kwargs)
+            except Exception as e:
+                throttled, retry_after = rate_limit_info(e)
+                self.limiter.release(tokens, throttled=throttled, retry_after=retry_after)
+                if throttled and attempt < RATE_LIMIT_RETRIES:
+                    continue
+                raise
+            except asyncio.CancelledError:
+                # e.g. the loser of a hedged request
+                self.limiter.release(tokens)
+                raise
+            self.limiter.release(tokens, time.perf_counter() - start, used_tokens(response))
+            return response
+
+    def stream(self, input, config: Optional[RunnableConfig] = None, **kwargs):
+        tokens = estimate_tokens(input)
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            self.limiter.acquire(tokens, self.priority)
+            start = time.perf_counter()
+            used, started = None, False
+            try:
+                for chunk in self.llm.stream(input, config, **kwargs):
+                    started = True
+                    used = used_tokens(chunk) or used
+                    yield chunk
+            except Exception as e:
+                throttled, retry_after = rate_limit_info(e)
+                self.limiter.release(tokens, throttled=throttled, retry_after=retry_after)
+                if throttled and not started and attempt < RATE_LIMIT_RETRIES:
+                    continue
+                raise
+            except GeneratorExit:
+                self.limiter.release(tokens)
+                raise
+            self.limiter.release(tokens, time.perf_counter() - start, used)
+            return
+
+    async def astream(self, input, config: Optional[RunnableConfig] = None, **kwargs):
+        tokens = estimate_tokens(input)
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            await self.limiter.aacquire(tokens, self.priority)
+            start = time.perf_counter()
+            used, started = None, False
+            try:
+                async for chunk in self.llm.astream(input, config, **kwargs):
+                    started = True
+                    used = used_tokens(chunk) or used
+                    yield chunk
+            except Exception as e:
+                throttled, retry_after = rate_limit_info(e)
+                self.limiter.release(tokens, throttled=throttled, retry_after=retry_after)
+                if throttled and not started and attempt < RATE_LIMIT_RETRIES:
+                    continue
+                raise
+            except (GeneratorExit, asyncio.CancelledError):
+                self.limiter.release(tokens)
+                raise
+            self.limiter.release(tokens, time.perf_counter() - start, used)
+            return
+
+    def with_structured_output(self, *args, **kwargs):
+        """Structured calls stay behind the same limiter."""
+        return RateLimitedChatModel(self.llm.with_structured_output(*args, **kwargs), self.limiter, self.priority)
+
+    def bind_tools(self, *args, **kwargs):
+        return RateLimitedChatModel(self.llm.bind_tools(*args, **kwargs), self.limiter, self.priority)
+
+    def __getattr__(self, name):
+        if name == "llm":
+            raise AttributeError(name)
+        return getattr(self.llm, name)
+
+
+class RateLimitedEmbeddings(Embeddings):
+    """
+    Puts an embeddings client behind its server's AdaptiveLimiter, so
+    embedding traffic counts against the same Ollama slots as chat calls.
+    Documents are sent in batches of batch_size so a large ingestion never
+    holds a slot for long. Embedding latencies are not fed back: they are
+    far shorter than chat calls and would make every chat call look slow.
+    """
+
+    def __init__(self, embeddings, limiter: AdaptiveLimiter, batch_size: int = 32):
+        self.embeddings = embeddings
+        self.limiter = limiter
+        self.batch_size = batch_size
+
+    def _batches(self, texts):
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start:start + self.batch_size]
+            yield batch, sum(len(text) for text in batch) // 4 + 1
+
+    def embed_documents(self, texts):
+        vectors = []
+        for batch, tokens in self._batches(texts):
+            self.limiter.acquire(tokens, Priority.BACKGROUND)
+            try:
+                vectors.extend(self.embeddings.embed_documents(batch))
+            finally:
+                self.limiter.release(tokens)
+        return vectors
+
+    def embed_query(self, text):
+        tokens = len(text) // 4 + 1
+        self.limiter.acquire(tokens, Priority.INTERACTIVE)
+        try:
+            return self.embeddings.embed_query(text)
+        finally:
+            self.limiter.release(tokens)
+
+    async def aembed_documents(self, texts):
+        vectors = []
+        for batch, tokens in self._batches(texts):
+            await self.limiter.aacquire(tokens, Priority.BACKGROUND)
+            try:
+                vectors.extend(await self.embeddings.aembed_documents(batch))
+            finally:
+                self.limiter.release(tokens)
+        return vectors
+
+    async def aembed_query(self, text):
+        tokens = len(text) // 4 + 1
+        await self.limiter.aacquire(tokens, Priority.INTERACTIVE)
+        try:
+            return await self.embeddings.aembed_query(text)
+        finally:
+            self.limiter.release(tokens)
+
+    def __getattr__(self, name):
+        if name == "embeddings":
+            raise AttributeError(name)
+        return getattr(self.embeddings, name)
+
+
+def rate_limited(llm, provider: str, model: str, priority: int = Priority.NORMAL):
+    """llm behind the shared limiter of its provider / model, or llm itself when RATE_LIMIT_ENABLED is off."""
+    if not RATE_LIMIT_ENABLED:
+        return llm
+    return RateLimitedChatModel(llm, rate_limits.get(provider, model), priority)
+
+
+def rate_limited_embeddings(embeddings, provider: str, model: str):
+    """Embeddings counterpart of rate_limited."""
+    if not RATE_LIMIT_ENABLED:
+        return embeddings
+    return RateLimitedEmbeddings(embeddings, rate_limits.get(provider, model))
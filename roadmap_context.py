@@ -0,0 +1,83 @@
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# -------------------
+# Compact roadmap projection for prompts
+# -------------------
+# (plan version, selected milestone) -> projection, shared by all sessions
+ROADMAP_CACHE_SIZE = 64
+
+NO_ROADMAP = "No roadmap generated yet."
+
+_cache: "OrderedDict[tuple, str]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def roadmap_version(plan: Optional[Dict[str, Any]]) -> Optional[str]:
+    """
+    Content hash of a roadmap dict. The app stores it as plan_version
+    whenever plan_json changes, so nodes never re-hash the plan.
+    """
+    if not plan:
+        return None
+    payload = json.dumps(plan, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def project_roadmap(
+    plan: Optional[Dict[str, Any]],
+    selected_milestone_id: Optional[str] = None,
+    version: Optional[str] = None
+) -> str:
+    """
+    The goal, one line per milestone and the tasks (with resources) of the
+    selected milestone only, so prompt size stays flat as roadmaps grow.
+    """
+    if not plan:
+        return NO_ROADMAP
+
+    key = (version or roadmap_version(plan), selected_milestone_id)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    projection = _project(plan, selected_milestone_id)
+    with _cache_lock:
+        _cache[key] = projection
+        if len(_cache) > ROADMAP_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return projection
+
+
+def _project(plan: Dict[str, Any], selected_milestone_id: Optional[str]) -> str:
+    lines = [f"GOAL: {plan.get('goal', 'N/A')}" + (f" ({plan['duration']})" if plan.get("duration") else "")]
+    lines.append("MILESTONES:")
+    selected = None
+    for milestone in plan.get("milestones", []):
+        marker = ""
+        if selected_milestone_id and milestone.get("id") == selected_milestone_id:
+            selected, marker = milestone, "  <- selected"
+        lines.append(
+            f"- {milestone.get('id', '?')}: {milestone.get('title', '')} "
+            f"[{milestone.get('status', 'todo')}]{marker}"
+        )
+
+    if selected:
+        lines.append(f"SELECTED MILESTONE ({selected.get('id')}): {selected.get('title', '')}")
+        lines.append(selected.get("description", ""))
+        for task in selected.get("tasks", []):
+            lines.append(f"- {task.get('name', '')}: {task.get('description', '')}")
+            if task.get("resources"):
+                lines.append(f"  Reading: {task['resources']}")
+            if task.get("youtube"):
+                lines.append(f"  Video: {task['youtube']}")
+    return "\n".join(lines)
+
+
+def roadmap_context(state) -> str:
+    """project_roadmap for an AgentState."""
+    return project_roadmap(state.get("plan_data"), state.get("selected_milestone_id"), state.get("plan_version"))
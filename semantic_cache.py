@@ -0,0 +1,174 @@
+import os
+import time
+import hashlib
+import logging
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+import numpy as np
+from RAG.context import context_sources
+from roadmap_context import roadmap_version
+
+# -------------------
+# Semantic response cache for explanations / summaries
+# -------------------
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+# Cosine similarity between instructions needed to reuse a stored response
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "256"))
+SEMANTIC_CACHE_TTL_SECONDS = 24 * 3600
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=256)
+def _embed(text: str) -> np.ndarray:
+    from RAG.embeddings import get_embeddings
+
+    vector = np.asarray(get_embeddings().embed_query(text), dtype="float32")
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def context_identity(doc_context: str, state) -> Optional[str]:
+    """
+    Everything besides the instruction that the prompt is built from: the
+    (file, page) set of the document context (paraphrased instructions
+    usually retrieve the same pages even when chunk order or packing
+    differs), the selected milestone, the roadmap version and the history.
+    None when there is no document context, which is never cached.
+    """
+    if not doc_context:
+        return None
+    sources = context_sources(doc_context)
+    parts = (
+        sources or doc_context,
+        state.get("selected_milestone_id"),
+        state.get("plan_version") or roadmap_version(state.get("plan_data")),
+        state.get("user_prompt", ""),
+        state.get("research_memory", []),
+    )
+    return hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()
+
+
+class SemanticCache:
+    """
+    Serves a stored response when a new instruction is close enough to a
+    previous one for the same node and the same context identity.
+
+    Entries are scoped to a knowledge base (session, version) as returned by
+    RAG.rag.knowledge_base_version; once that version moves on, every entry
+    of the old one is dropped. max_entries bounds all sessions together.
+    """
+
+    def __init__(
+        self,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+        ttl: float = SEMANTIC_CACHE_TTL_SECONDS
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # (node, knowledge base session) -> entries, oldest first
+        self._entries: Dict[tuple, List[dict]] = {}
+        self._versions: Dict[str, int] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, node: str, field: str, n: int = 1):
+        counts = self._stats.setdefault(node, {"hits": 0, "misses": 0, "invalidated": 0})
+        counts[field] += n
+
+    def _check_version(self, knowledge_base: tuple):
+        session, version = knowledge_base
+        if self._versions.get(session, version) != version:
+            for key in [key for key in self._entries if key[1] == session]:
+                self._count(key[0], "invalidated", len(self._entries.pop(key)))
+        self._versions[session] = version
+
+    def _prune(self, now: float):
+        """Drops expired entries, then the oldest ones over max_entries, then versions of emptied sessions."""
+        for entries in self._entries.values():
+            entries[:] = [entry for entry in entries if entry["expires"] > now]
+        excess = sum(len(entries) for entries in self._entries.values()) - self.max_entries
+        for _ in range(max(excess, 0)):
+            oldest = min((entries for entries in self._entries.values() if entries), key=lambda entries: entries[0]["expires"])
+            oldest.pop(0)
+        for key in [key for key, entries in self._entries.items() if not entries]:
+            del self._entries[key]
+        live = {session for _, session in self._entries}
+        for session in [session for session in self._versions if session not in live]:
+            del self._versions[session]
+
+    def lookup(self, node: str, instruction: str, doc_context: str, knowledge_base: tuple, state) -> Optional[str]:
+        identity = context_identity(doc_context, state)
+        if identity is None:
+            return None
+        try:
+            vector = _embed(instruction)
+        except Exception as e:
+            logger.warning(f"Semantic cache lookup skipped: {e}")
+            return None
+
+        now = time.time()
+        with self._lock:
+            self._check_version(knowledge_base)
+            entries = self._entries.get((node, knowledge_base[0]), [])
+            entries[:] = [entry for entry in entries if entry["expires"] > now]
+            best, best_score = None, self.threshold
+            for entry in entries:
+                if entry["identity"] != identity:
+                    continue
+                score = float(vector @ entry["vector"])
+                if score >= best_score:
+                    best, best_score = entry, score
+            if best is None:
+                self._count(node, "misses")
+                return None
+            self._count(node, "hits")
+            logger.info(f"Semantic cache hit for {node} (similarity={best_score:.3f}): {best['instruction']!r}")
+            return best["response"]
+
+    def store(self, node: str, instruction: str, doc_context: str, knowledge_base: tuple, state, response: str):
+        identity = context_identity(doc_context, state)
+        if identity is None:
+            return
+        try:
+            vector = _embed(instruction)
+        except Exception as e:
+            logger.warning(f"Semantic cache store skipped: {e}")
+            return
+
+        now = time.time()
+        with self._lock:
+            self._check_version(knowledge_base)
+            self._entries.setdefault((node, knowledge_base[0]), []).append({
+                "instruction": instruction,
+                "vector": vector,
+                "identity": identity,
+                "response": response,
+                "expires": now + self.ttl,
+            })
+            self._prune(now)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            per_node = {}
+            for node, counts in self._stats.items():
+                lookups = counts["hits"] + counts["misses"]
+                per_node[node] = {**counts, "hit_rate": round(counts["hits"] / lookups, 3) if lookups else 0.0}
+            return {
+                "entries": sum(len(entries) for entries in self._entries.values()),
+                "threshold": self.threshold,
+                "per_node": per_node,
+            }
+
+
+# Shared instance used by the explainer and summarizer nodes
+semantic_cache = SemanticCache() if SEMANTIC_CACHE_ENABLED else None
@@ -1,23 +1,86 @@
+import asyncio
 from config import Config
+from rate_limiter import Priority
 from chat_state import AgentState
-from log import prepare_context, universal_debug_log
+from log import prepare_context, aprepare_context, universal_debug_log
 from langchain_core.messages import HumanMessage
-from RAG.rag import get_context_chunks
+from RAG.rag import get_context_chunks, aget_context_chunks, knowledge_base_version
+from RAG.context import NODE_CONTEXT_BUDGETS
+from semantic_cache import semantic_cache
 
 def summarizer_node(state: AgentState):
     node_name = "SUMMARIZER_AGENT"
     instruction = state["current_instruction"]
     
     # 1. Get RAG Context (crucial for "summarize page 5" requests)
-    doc_context = get_context_chunks(instruction)
+    doc_context = _prefetched(state, instruction)
+    if doc_context is None:
+        doc_context = get_context_chunks(instruction, session_id=state.get("session_id"), budget=NODE_CONTEXT_BUDGETS["summarizer"])
+
+    knowledge_base, cached = _cached(state, instruction, doc_context)
+    if cached is not None:
+        return summarizer_output(instruction, cached)
     
     # 2. Get Conversation History
     context = prepare_context(state)
     
     # 3. Initialize the LLM
-    llm = Config.get_gemini_llm()
+    llm = Config.get_gemini_llm(cache_node="summarizer", priority=Priority.INTERACTIVE)
     
     # 4. Construct Prompt
+    prompt = build_prompt(instruction, doc_context, context)
+    
+    # 5. Invoke LLM
+    # Tagged so the chat UI renders these tokens as they arrive
+    content = ""
+    for chunk in llm.stream(prompt, config={"tags": [Config.UI_STREAM_TAG]}):
+        content += chunk.content
+    
+    # 6. Return Output
+    return _finish(state, instruction, doc_context, knowledge_base, content)
+
+
+async def asummarizer_node(state: AgentState):
+    """Async summarizer_node."""
+    instruction = state["current_instruction"]
+
+    doc_context = _prefetched(state, instruction)
+    if doc_context is None:
+        doc_context = await aget_context_chunks(instruction, session_id=state.get("session_id"), budget=NODE_CONTEXT_BUDGETS["summarizer"])
+
+    knowledge_base, cached = await asyncio.to_thread(_cached, state, instruction, doc_context)
+    if cached is not None:
+        return summarizer_output(instruction, cached)
+
+    context = await aprepare_context(state)
+
+    llm = Config.get_gemini_llm(cache_node="summarizer", priority=Priority.INTERACTIVE)
+    prompt = build_prompt(instruction, doc_context, context)
+    content = ""
+    async for chunk in llm.astream(prompt, config={"tags": [Config.UI_STREAM_TAG]}):
+        content += chunk.content
+
+    return await asyncio.to_thread(_finish, state, instruction, doc_context, knowledge_base, content)
+
+
+def _prefetched(state: AgentState, instruction: str):
+    return (state.get("prefetched_context") or {}).get("summarizer", {}).get(instruction)
+
+
+def _cached(state: AgentState, instruction: str, doc_context: str):
+    """(knowledge base version, cached summary or None)."""
+    knowledge_base = knowledge_base_version(state.get("session_id"))
+    cached = semantic_cache.lookup("summarizer", instruction, doc_context, knowledge_base, state) if semantic_cache else None
+    return knowledge_base, cached
+
+
+def _finish(state: AgentState, instruction: str, doc_context: str, knowledge_base: tuple, content: str) -> dict:
+    if semantic_cache:
+        semantic_cache.store("summarizer", instruction, doc_context, knowledge_base, state, content)
+    return summarizer_output(instruction, content)
+
+
+def build_prompt(instruction: str, doc_context: str, context: str) -> str:
     prompt = f"""
     You are an expert Summarizer and Simplifier.
     
@@ -40,12 +103,11 @@ def summarizer_node(state: AgentState):
     {context}
     
     """
-    
-    # 5. Invoke LLM
-    response = llm.invoke(prompt)
-    
-    # 6. Return Output
+    return prompt
+
+
+def summarizer_output(instruction: str, content: str) -> dict:
     return {
-        "messages": [HumanMessage(content=response.content, name="Summarizer")],
+        "messages": [HumanMessage(content=content, name="Summarizer")],
         "research_memory": [f"Summary generated for: {instruction}"]
-    }
\ No newline at end of file
+    }
@@ -1,9 +1,12 @@
 import os
+import asyncio
+import httpx
 import requests
 from dotenv import load_dotenv, find_dotenv
 from langchain_community.tools import DuckDuckGoSearchRun
 from langchain_community.tools import TavilySearchResults
 from googleapiclient.discovery import build
+from chat_tools import HTTP_TIMEOUT, YOUTUBE_SEARCH_URL
 
 # 1. Load Environment Variables
 load_dotenv(find_dotenv(), override=True)
@@ -37,25 +40,38 @@ def run_tavily_search(query: str):
         results = tavily.invoke(query)
         
         # 2. Process & Deduplicate
-        seen_urls = set()
-        formatted_results = []
-        
-        for res in results:
-            url = res['url']
-            content = res['content']
-            
-            # Skip duplicates or empty content
-            if url in seen_urls or len(content) < 50:
-                continue
-                
-            seen_urls.add(url)
-            formatted_results.append(f"- {content[:300]}... (Source: {url})")
-            
-        return "\n".join(formatted_results) if formatted_results else "No relevant web results found."
+        return format_tavily_results(results)
 
     except Exception as e:
         return f"Web search error: {str(e)}"
 
+async def arun_tavily_search(query: str):
+    """Async run_tavily_search."""
+    try:
+        tavily = TavilySearchResults(max_results=10)
+        results = await tavily.ainvoke(query)
+        return format_tavily_results(results)
+
+    except Exception as e:
+        return f"Web search error: {str(e)}"
+
+def format_tavily_results(results) -> str:
+    seen_urls = set()
+    formatted_results = []
+    
+    for res in results:
+        url = res['url']
+        content = res['content']
+        
+        # Skip duplicates or empty content
+        if url in seen_urls or len(content) < 50:
+            continue
+            
+        seen_urls.add(url)
+        formatted_results.append(f"- {content[:300]}... (Source: {url})")
+        
+    return "\n".join(formatted_results) if formatted_results else "No relevant web results found."
+
 def run_youtube_search(query: str):
     """
     Searches YouTube using the Official API.
@@ -78,20 +94,42 @@ def run_youtube_search(query: str):
         )
         response = request.execute()
         
-        results = []
-        for item in response.get('items', []):
-            title = item['snippet']['title']
-            channel = item['snippet']['channelTitle']
-            video_id = item['id']['videoId']
-            url = f"https://www.youtube.com/watch?v={video_id}"
-            
-            results.append(f"- [VIDEO] {title} by {channel}: {url}")
-            
-        return "\n".join(results) if results else "No videos found."
+        return format_youtube_results(response)
+
+    except Exception as e:
+        return f"YouTube search error: {str(e)}"
+
+async def arun_youtube_search(query: str):
+    """
+    Async run_youtube_search. googleapiclient has no async transport, so
+    the same search.list call goes to the REST endpoint with httpx.
+    """
+    try:
+        api_key = os.environ.get("YOUTUBE_API_KEY")
+        if not api_key:
+            return "Error: YouTube API Key missing."
+
+        params = {"q": query, "part": "snippet", "type": "video", "maxResults": 5, "key": api_key}
+        async with httpx.AsyncClient(timeout=HTTP_TIMEOUT) as client:
+            response = await client.get(YOUTUBE_SEARCH_URL, params=params)
+        response.raise_for_status()
+        return format_youtube_results(response.json())
 
     except Exception as e:
         return f"YouTube search error: {str(e)}"
 
+def format_youtube_results(response: dict) -> str:
+    results = []
+    for item in response.get('items', []):
+        title = item['snippet']['title']
+        channel = item['snippet']['channelTitle']
+        video_id = item['id']['videoId']
+        url = f"https://www.youtube.com/watch?v={video_id}"
+        
+        results.append(f"- [VIDEO] {title} by {channel}: {url}")
+        
+    return "\n".join(results) if results else "No videos found."
+
 # --- UPDATED GRAPH NODE ---
 
 def search_node_func(state):
@@ -100,6 +138,26 @@ def search_node_func(state):
     This prepares the 'Context' that the AI reads.
     Updated to use Tavily and YouTube API.
     """
+    base_query, search_query = build_search_query(state)
+    
+    # 4. Run BOTH searches (The optimized logic)
+    web_data = run_tavily_search(search_query)
+    video_data = run_youtube_search(search_query)
+    
+    return {"search_context": format_search_context(base_query, web_data, video_data)}
+
+async def asearch_node_func(state):
+    """Async search_node_func: the web and video searches run concurrently."""
+    base_query, search_query = build_search_query(state)
+    
+    web_data, video_data = await asyncio.gather(
+        arun_tavily_search(search_query),
+        arun_youtube_search(search_query)
+    )
+    
+    return {"search_context": format_search_context(base_query, web_data, video_data)}
+
+def build_search_query(state):
     # 1. Get the user's base topic
     base_query = state["user_request"]
     
@@ -112,11 +170,9 @@ def search_node_func(state):
     search_query = f"how to learn {base_query} roadmap tutorial"
     
     print(f"🔍 Searching for: {search_query}") 
-    
-    # 4. Run BOTH searches (The optimized logic)
-    web_data = run_tavily_search(search_query)
-    video_data = run_youtube_search(search_query)
-    
+    return base_query, search_query
+
+def format_search_context(base_query: str, web_data: str, video_data: str) -> str:
     # 5. Combine into one big block of text for the AI
     final_context = f"""
     The user wants to learn '{base_query}'. Use these resources to build the roadmap:
@@ -128,5 +184,4 @@ def search_node_func(state):
     {video_data}
     """
     
-    # Return to the graph state
-    return {"search_context": final_context}
\ No newline at end of file
+    return final_context
\ No newline at end of file
@@ -1,3 +1,4 @@
+import asyncio
 from langchain_core.messages import SystemMessage
 from config import Config
 import json
@@ -56,8 +57,8 @@ def parse_llm_json(response: str) -> dict:
 # LLM helpers
 # --------------------------------------------------
 
-def grade_article(llm, question: str, model_answer: str, user_answer: str):
-    prompt = f"""
+def grade_article_prompt(question: str, model_answer: str, user_answer: str) -> str:
+    return f"""
 You are an educational evaluator.
 
 Your task:
@@ -87,9 +88,19 @@ Return ONLY valid JSON:
 }}
 """
 
-    response = llm.invoke(prompt).content.strip()
+
+def grade_article(llm, question: str, model_answer: str, user_answer: str):
+    response = llm.invoke(grade_article_prompt(question, model_answer, user_answer)).content.strip()
     # debug(f"LLM response for grading article:\n{response}")
+    return parse_article_grade(response)
+
+
+async def agrade_article(llm, question: str, model_answer: str, user_answer: str):
+    response = (await llm.ainvoke(grade_article_prompt(question, model_answer, user_answer))).content.strip()
+    return parse_article_grade(response)
 
+
+def parse_article_grade(response: str):
     try:
         data = parse_llm_json(response)
         score = max(0, min(3, int(data.get("score", 0))))
@@ -102,8 +113,8 @@ Return ONLY valid JSON:
     return score, reasoning
 
 
-def mcq_wrong_reasoning(llm, question, correct_key, options, user_key):
-    prompt = f"""
+def mcq_wrong_reasoning_prompt(question, correct_key, options, user_key) -> str:
+    return f"""
 You are an educational assistant providing feedback to a student's wrong answer.
 
 Rules:
@@ -123,11 +134,19 @@ User's incorrect answer:
 
 Provide feedback explaining why the correct answer is right.
 """
-    return llm.invoke(prompt).content.strip()
 
 
-def performance_summary(llm, score, total, strong, weak):
-    prompt = f"""
+def mcq_wrong_reasoning(llm, question, correct_key, options, user_key):
+    return llm.invoke(mcq_wrong_reasoning_prompt(question, correct_key, options, user_key)).content.strip()
+
+
+async def amcq_wrong_reasoning(llm, question, correct_key, options, user_key):
+    response = await llm.ainvoke(mcq_wrong_reasoning_prompt(question, correct_key, options, user_key))
+    return response.content.strip()
+
+
+def performance_summary_prompt(score, total, strong, weak) -> str:
+    return f"""
 User quiz results:
 
 Score: {score}/{total}
@@ -144,26 +163,51 @@ Generate a concise learning summary with:
 - Weaknesses
 - Clear recommendations
 """
-    return llm.invoke(prompt).content.strip()
 
 
-# --------------------------------------------------
-# Main Node
-# --------------------------------------------------
+def performance_summary(llm, score, total, strong, weak):
+    return llm.invoke(performance_summary_prompt(score, total, strong, weak)).content.strip()
 
-def user_summary_node(state):
 
-    llm = Config.get_ollama_llm()
+async def aperformance_summary(llm, score, total, strong, weak):
+    return (await llm.ainvoke(performance_summary_prompt(score, total, strong, weak))).content.strip()
 
+
+# --------------------------------------------------
+# Grading
+# --------------------------------------------------
+
+def load_submission(state):
     submission = state.get("user_submission")
     if not submission:
         raise ValueError("No user submission found in AgentState")
 
-    quiz = merge_user_answers(
+    return merge_user_answers(
         submission["quiz"],
         submission["user_answers"]
     )
 
+
+def wrong_mcqs(quiz):
+    """(index, question, correct key, user key) of answered MCQs that need feedback."""
+    for i, q in enumerate(quiz.get("mcq_questions", [])):
+        correct_key = normalize_mcq_key(q["correct_answer"])
+        user_key = normalize_mcq_key(q.get("user_answer"))
+        if user_key and user_key != correct_key:
+            yield i, q, correct_key, user_key
+
+
+def answered_articles(quiz):
+    for i, q in enumerate(quiz.get("article_questions", [])):
+        if q.get("user_answer"):
+            yield i, q
+
+
+def score_quiz(quiz, mcq_reasoning: dict, article_grades: dict):
+    """
+    Scores the quiz from the LLM outputs collected per question index.
+    Returns (results, earned_points, total_points, strong, weak).
+    """
     results = {
         "mcq_results": [],
         "article_results": [],
@@ -178,7 +222,7 @@ def user_summary_node(state):
     # -------------------------
     # MCQ grading (1 point)
     # -------------------------
-    for q in quiz.get("mcq_questions", []):
+    for i, q in enumerate(quiz.get("mcq_questions", [])):
         total_points += 1
 
         correct_key = normalize_mcq_key(q["correct_answer"])
@@ -194,38 +238,19 @@ def user_summary_node(state):
             })
         else:
             weak.append(q["skill"])
-            reasoning = None
-            if user_key:
-                reasoning = mcq_wrong_reasoning(
-                    llm,
-                    q["question"],
-                    correct_key,
-                    q["options"],
-                    user_key
-                )
-
             results["mcq_results"].append({
                 "question": q["question"],
                 "is_correct": False,
-                "reasoning": reasoning
+                "reasoning": mcq_reasoning.get(i)
             })
 
     # -------------------------
     # Article grading (3 points)
     # -------------------------
-    for q in quiz.get("article_questions", []):
+    for i, q in enumerate(quiz.get("article_questions", [])):
         total_points += 3
 
-        user = q.get("user_answer")
-        if not user:
-            score, reasoning = 0, "No answer submitted."
-        else:
-            score, reasoning = grade_article(
-                llm,
-                q["question"],
-                q["model_answer"],
-                user
-            )
+        score, reasoning = article_grades.get(i, (0, "No answer submitted."))
 
         earned_points += score
 
@@ -241,13 +266,10 @@ def user_summary_node(state):
             "reasoning": reasoning
         })
 
-    # -------------------------
-    # Summary
-    # -------------------------
-    summary_text = performance_summary(
-        llm, earned_points, total_points, strong, weak
-    )
+    return results, earned_points, total_points, strong, weak
 
+
+def grader_output(results, earned_points, total_points, strong, weak, summary_text):
     accuracy = round((earned_points / total_points) * 100, 2)
 
     results["summary"] = {
@@ -270,4 +292,64 @@ def user_summary_node(state):
         "messages": [
             SystemMessage(content="Quiz graded successfully")
         ]
-    }
\ No newline at end of file
+    }
+
+
+# --------------------------------------------------
+# Main Node
+# --------------------------------------------------
+
+def user_summary_node(state):
+
+    # Points must not depend on which provider answered: article scoring
+    # stays on one deterministic client, only the free text is routed
+    scoring_llm = Config.get_ollama_llm(temperature=0)
+    summary_llm = Config.get_routed_llm("grading_summary")
+    # Same wrong answer to the same question gets the same feedback
+    feedback_llm = Config.get_routed_llm("grading_feedback")
+
+    quiz = load_submission(state)
+
+    mcq_reasoning = {
+        i: mcq_wrong_reasoning(feedback_llm, q["question"], correct_key, q["options"], user_key)
+        for i, q, correct_key, user_key in wrong_mcqs(quiz)
+    }
+    article_grades = {
+        i: grade_article(scoring_llm, q["question"], q["model_answer"], q["user_answer"])
+        for i, q in answered_articles(quiz)
+    }
+    results, earned_points, total_points, strong, weak = score_quiz(quiz, mcq_reasoning, article_grades)
+
+    # -------------------------
+    # Summary
+    # -------------------------
+    summary_text = performance_summary(
+        summary_llm, earned_points, total_points, strong, weak
+    )
+
+    return grader_output(results, earned_points, total_points, strong, weak, summary_text)
+
+
+async def auser_summary_node(state):
+    """Async user_summary_node: every per-question LLM call runs concurrently."""
+    scoring_llm = Config.get_ollama_llm(temperature=0)
+    summary_llm = Config.get_routed_llm("grading_summary")
+    feedback_llm = Config.get_routed_llm("grading_feedback")
+
+    quiz = load_submission(state)
+
+    mcqs = list(wrong_mcqs(quiz))
+    articles = list(answered_articles(quiz))
+    outputs = await asyncio.gather(
+        *(amcq_wrong_reasoning(feedback_llm, q["question"], correct_key, q["options"], user_key)
+          for _, q, correct_key, user_key in mcqs),
+        *(agrade_article(scoring_llm, q["question"], q["model_answer"], q["user_answer"])
+          for _, q in articles)
+    )
+    mcq_reasoning = {i: output for (i, *_), output in zip(mcqs, outputs[:len(mcqs)])}
+    article_grades = {i: output for (i, _), output in zip(articles, outputs[len(mcqs):])}
+    results, earned_points, total_points, strong, weak = score_quiz(quiz, mcq_reasoning, article_grades)
+
+    summary_text = await aperformance_summary(summary_llm, earned_points, total_points, strong, weak)
+
+    return await asyncio.to_thread(grader_output, results, earned_points, total_points, strong, weak, summary_text)